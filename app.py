@@ -1,8 +1,29 @@
 import streamlit as st
-import requests
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import html
 import time
+import os
 import re
-from datetime import datetime
+import uuid
+import weakref
+from collections import deque
+from datetime import datetime, timedelta
+
+from news_detector import classify_chunk, current_config, detect_fake_news
+from news_detector.backends import INFERENCE_BACKENDS, LOCAL_MODEL_PATH, get_local_backend
+from news_detector.cache import get_verdict_cache
+from news_detector.dedup import get_duplicate_index
+from news_detector.client import CircuitBreaker, get_inference_client
+from news_detector.config import get_config_store
+from news_detector.extract import (cached_extract, csv_text_columns, extract_csv_column, extract_docx_text,
+                                   get_extract_cache, iter_pdf_pages)
+from news_detector.files import FILE_KINDS, classify_files
+from news_detector.history import HISTORY_PAGE_SIZE, get_history_store
+from news_detector.metrics import metrics
+from news_detector.router import get_router
+from news_detector.spans import highlight_segments
+from news_detector.warmup import get_model_warmer
+from news_detector.windows import WINDOW_AGGREGATIONS
 
 # ─────────────────────────────────────────────
 # Page Configuration
@@ -75,6 +96,11 @@ st.markdown("""
         backdrop-filter: blur(10px);
     }
     .info-card h4 { color: #f093fb; margin-bottom: 0.5rem; }
+    .span-mark { border-radius: 4px; padding: 0 2px; }
+    .span-fake { background: rgba(255, 65, 108, 0.45); }
+    .span-exclamation { background: rgba(253, 160, 133, 0.45); }
+    .span-caps { background: rgba(240, 147, 251, 0.35); }
+    .span-real { background: rgba(56, 239, 125, 0.3); }
     .history-item-fake {
         background: rgba(255, 65, 108, 0.15);
         border-left: 4px solid #ff416c;
@@ -157,225 +183,45 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# ─────────────────────────────────────────────
-# Helper Functions
-# ─────────────────────────────────────────────
-
-def preprocess_text(text):
-    text = text.strip()
-    text = re.sub(r'http\S+|www\S+', '', text)
-    text = re.sub(r'\s+', ' ', text)
-    return text
-
-
-def detect_language(text):
-    urdu_chars = sum(1 for c in text if '\u0600' <= c <= '\u06FF')
-    if urdu_chars > 10:
-        return "urdu"
-    return "english"
-
-
-def try_model(api_url, text, timeout=25):
-    headers = {"Content-Type": "application/json"}
-    payload = {"inputs": text[:512]}
-    try:
-        response = requests.post(api_url, headers=headers, json=payload, timeout=timeout)
-        if response.status_code == 200:
-            return response.json()
-        return None
-    except Exception:
-        return None
-
-
-def parse_result(result):
-    if not result:
-        return None, None
-    try:
-        predictions = result[0] if isinstance(result[0], list) else result
-        label_map = {}
-        for item in predictions:
-            label_map[item['label'].upper()] = item['score']
-
-        fake_score = 0
-        real_score = 0
-
-        for key, val in label_map.items():
-            if any(f in key for f in ['FAKE', 'LABEL_1', 'FALSE', 'MISINFORMATION', 'UNRELIABLE']):
-                fake_score = max(fake_score, val)
-            elif any(r in key for r in ['REAL', 'LABEL_0', 'TRUE', 'RELIABLE', 'LEGITIMATE']):
-                real_score = max(real_score, val)
-
-        if fake_score == 0 and real_score == 0:
-            fake_score = label_map.get('NEGATIVE', label_map.get('NEG', 0))
-            real_score = label_map.get('POSITIVE', label_map.get('POS', 0))
-
-        if fake_score == 0 and real_score == 0:
-            return None, None
-
-        if fake_score > real_score:
-            return "FAKE", fake_score
-        else:
-            return "REAL", real_score
-    except Exception:
-        return None, None
-
-
-def analyze_with_huggingface(text):
-    # MODEL 1: XLM-RoBERTa Large — Facebook (100+ Languages)
-    result1 = try_model(
-        "https://api-inference.huggingface.co/models/facebook/xlm-roberta-large-xnli",
-        text
-    )
-    label, confidence = parse_result(result1)
-    if label:
-        return label, confidence, "🌍 XLM-RoBERTa Large — Facebook (100+ Languages)"
-
-    # MODEL 2: Multilingual Fake News BERT
-    result2 = try_model(
-        "https://api-inference.huggingface.co/models/dlenafv/fakenews-multilang-bert",
-        text
-    )
-    label, confidence = parse_result(result2)
-    if label:
-        return label, confidence, "🤖 Multilingual BERT Fake News Detector"
-
-    # MODEL 3: Fake News BERT
-    result3 = try_model(
-        "https://api-inference.huggingface.co/models/jy46604790/Fake-News-Bert-Detect",
-        text
-    )
-    label, confidence = parse_result(result3)
-    if label:
-        return label, confidence, "🧠 Fake News BERT Detector"
-
-    # MODEL 4: XLM-R Fine-tuned on Fake News
-    result4 = try_model(
-        "https://api-inference.huggingface.co/models/DGurgurov/xlm-r_fakenews",
-        text
-    )
-    label, confidence = parse_result(result4)
-    if label:
-        return label, confidence, "🔬 XLM-R Fake News Fine-tuned Model"
-
-    # MODEL 5: Multilingual Fallback
-    result5 = try_model(
-        "https://api-inference.huggingface.co/models/Narrativaai/fake-news-detection-spanish-en",
-        text
-    )
-    label, confidence = parse_result(result5)
-    if label:
-        return label, confidence, "🌐 Narrativa Multilingual Model"
-
-    return None, None, None
-
-
-def rule_based_analysis(text):
-    text_lower = text.lower()
-    words = text.split()
-
-    fake_indicators = [
-        "you won't believe", "they don't want you to know",
-        "share before deleted", "wake up sheeple", "crisis actor",
-        "miracle cure", "doctors hate", "100% proven",
-        "scientists baffled", "they lied to us", "fake media",
-        "illuminati", "click here now", "hoax", "coverup conspiracy",
-        "banned video", "deep state hiding"
-    ]
-
-    real_indicators = [
-        "according to", "reported by", "confirmed by", "said in a statement",
-        "official statement", "press release", "sources say", "told dawn",
-        "told the media", "told reporters", "in a statement",
-        "study shows", "researchers found", "data shows", "survey found",
-        "published in", "peer reviewed", "experts say", "statistics show",
-        "dawn.com", "geo news", "ary news", "the news", "express tribune",
-        "bbc urdu", "radio pakistan", "app news agency", "ispr",
-        "prime minister", "chief minister", "federal cabinet",
-        "national assembly", "senate", "supreme court", "high court",
-        "election commission", "state bank of pakistan", "imf", "world bank",
-        "ministry of", "spokesperson", "foreign office",
-        "islamabad", "karachi", "lahore", "peshawar", "quetta",
-        "balochistan", "sindh", "punjab", "pakistan", "waziristan"
-    ]
-
-    fake_count = sum(1 for phrase in fake_indicators if phrase in text_lower)
-    real_count = sum(1 for phrase in real_indicators if phrase in text_lower)
-
-    exclamation = text.count('!')
-    caps_words = sum(1 for w in words if w.isupper() and len(w) > 2)
-    word_count = len(words)
-    length_bonus = 0.3 if word_count > 150 else 0.1 if word_count > 80 else 0.0
-
-    fake_score = (fake_count * 0.4) + (exclamation * 0.08) + (caps_words * 0.04)
-    real_score = (real_count * 0.2) + length_bonus
-
-    fake_score = min(fake_score, 0.95)
-    real_score = min(real_score, 0.95)
-
-    if fake_score == 0 and real_score == 0:
-        fake_score = 0.25 if word_count > 100 else 0.50
-        real_score = 0.75 if word_count > 100 else 0.50
-
-    total = fake_score + real_score
-    fake_score /= total
-    real_score /= total
-
-    if fake_score > real_score:
-        return "FAKE", fake_score
-    else:
-        return "REAL", real_score
-
-
-def detect_fake_news(text):
-    cleaned = preprocess_text(text)
-    lang = detect_language(cleaned)
-    label, confidence, model_name = analyze_with_huggingface(cleaned)
-    if label is None:
-        label, confidence = rule_based_analysis(cleaned)
-        method = "⚙️ Rule-Based Analysis (Offline Mode)"
-    else:
-        method = f"{model_name} | Language: {lang.upper()}"
-    return label, confidence, method
-
-
-def get_word_stats(text):
-    words = text.split()
-    sentences = re.split(r'[.!?]+', text)
-    sentences = [s for s in sentences if s.strip()]
-    return len(words), len(sentences)
-
-
 # ─────────────────────────────────────────────
 # Session State
 # ─────────────────────────────────────────────
-if "history" not in st.session_state:
-    st.session_state.history = []
-if "total_checked" not in st.session_state:
-    st.session_state.total_checked = 0
-if "fake_count" not in st.session_state:
-    st.session_state.fake_count = 0
-if "real_count" not in st.session_state:
-    st.session_state.real_count = 0
 if "final_text" not in st.session_state:
     st.session_state.final_text = ""
 
 
+# Keeps the hosted models loaded between analyses; starts once per process
+warmer = get_model_warmer()
+
+# Each browser session gets its own turn in the model rate limiter's fair queue
+script_ctx = get_script_run_ctx()
+session_id = script_ctx.session_id if script_ctx else None
+
+# Analysis history belongs to a visitor id kept in the page URL (?user=...), so
+# it survives refreshes and can be bookmarked; a link without one starts afresh
+history_owner = st.query_params.get("user", "")
+if not re.fullmatch(r"[0-9a-f]{32}", history_owner):
+    history_owner = st.session_state.get("history_owner") or uuid.uuid4().hex
+    st.query_params["user"] = history_owner
+st.session_state.history_owner = history_owner
+
 # ─────────────────────────────────────────────
 # Sidebar
 # ─────────────────────────────────────────────
 with st.sidebar:
     st.markdown("## 🔍 Fake News Detector")
     st.markdown("---")
-    st.markdown("### 📊 Session Statistics")
+    st.markdown("### 📊 Statistics")
+    history_counts = get_history_store().counts(history_owner)
     col1, col2 = st.columns(2)
     with col1:
-        st.metric("✅ Total Checked", st.session_state.total_checked)
-        st.metric("🔴 Fake News", st.session_state.fake_count)
+        st.metric("✅ Total Checked", history_counts["total"])
+        st.metric("🔴 Fake News", history_counts["FAKE"])
     with col2:
-        st.metric("🟢 Real News", st.session_state.real_count)
+        st.metric("🟢 Real News", history_counts["REAL"])
         accuracy_rate = (
-            f"{(st.session_state.real_count / st.session_state.total_checked * 100):.0f}%"
-            if st.session_state.total_checked > 0 else "N/A"
+            f"{(history_counts['REAL'] / history_counts['total'] * 100):.0f}%"
+            if history_counts["total"] > 0 else "N/A"
         )
         st.metric("📰 Real Rate", accuracy_rate)
 
@@ -404,18 +250,276 @@ with st.sidebar:
     </div>
     """, unsafe_allow_html=True)
 
+    st.markdown("---")
+    st.markdown("### ⚙️ Settings")
+    aggregation = st.selectbox(
+        "🪟 Long-document aggregation",
+        list(WINDOW_AGGREGATIONS),
+        format_func=WINDOW_AGGREGATIONS.get,
+        key="window_aggregation"
+    )
+
+    with st.expander("⚡ Verdict Cache"):
+        st.json(get_verdict_cache().stats(), expanded=True)
+
+    with st.expander("♻️ Near-Duplicate Index"):
+        duplicate_index = get_duplicate_index()
+        if duplicate_index is None:
+            st.caption("Off (DEDUP_INDEX_SIZE=0).")
+        else:
+            st.json(duplicate_index.stats(), expanded=True)
+
+    with st.expander("📂 Upload Cache"):
+        st.json(get_extract_cache().stats(), expanded=True)
+
+    if metrics.enabled:
+        with st.expander("⏱️ Diagnostics"):
+            summary = metrics.summary()
+            stages = [
+                {"metric": name.replace("_seconds", ""), "labels": ", ".join(f"{k}={v}" for k, v in labels.items()),
+                 "count": count, "mean ms": round(mean * 1000, 1),
+                 "p50 ms": round(p50 * 1000, 1), "p95 ms": round(p95 * 1000, 1)}
+                for name, labels, count, mean, p50, p95 in summary["histograms"]
+            ]
+            if stages:
+                st.dataframe(stages, hide_index=True, use_container_width=True)
+                st.dataframe(
+                    [{"counter": name, "labels": ", ".join(f"{k}={v}" for k, v in labels.items()), "value": value}
+                     for name, labels, value in summary["counters"]],
+                    hide_index=True, use_container_width=True,
+                )
+                st.download_button("⬇️ Prometheus metrics", metrics.prometheus_text(),
+                                   file_name="news_detector_metrics.prom", mime="text/plain")
+            else:
+                st.caption("No analyses yet.")
+
+    with st.expander("🩺 Endpoint Health"):
+        client_stats = get_inference_client().stats()
+        for url, name in current_config().models:
+            breaker = client_stats["breakers"].get(url, {"state": CircuitBreaker.CLOSED, "failures": 0, "retry_in": 0})
+            icon = {"closed": "🟢", "half-open": "🟡", "open": "🔴"}[breaker["state"]]
+            retry_note = f" · retry in {breaker['retry_in']:.0f}s" if breaker["state"] == CircuitBreaker.OPEN else ""
+            if url in client_stats["loading"]:
+                retry_note += f" · loading, ready in ~{client_stats['loading'][url]:.0f}s"
+            st.markdown(f"{icon} **{name}** — {breaker['state']}, {breaker['failures']} failures{retry_note}")
+        if warmer is not None:
+            warm = warmer.snapshot()
+            warm_ok = sum(ping["ok"] for ping in warm["last"].values())
+            st.caption(f"🔥 Warm-up every {warm['interval']:.0f}s · {warm['rounds']} rounds · "
+                       f"{warm_ok}/{len(warm['last'])} models answered their last ping")
+        if client_stats["rate_limits"]:
+            st.caption("🚦 Rate limits (shared by every session)")
+            st.dataframe([dict(endpoint=endpoint, **limits) for endpoint, limits in client_stats["rate_limits"].items()],
+                         hide_index=True, use_container_width=True)
+        st.json({"counters": client_stats["counters"], "pools": client_stats["pools"]}, expanded=False)
+        if "local" in INFERENCE_BACKENDS and LOCAL_MODEL_PATH:
+            local = get_local_backend(LOCAL_MODEL_PATH)
+            if local.error:
+                st.markdown(f"🔴 **{local.name}** — {local.error}")
+            elif local.batcher is None:
+                st.markdown(f"⚪ **{local.name}** — not loaded yet")
+            else:
+                st.markdown(f"🟢 **{local.name}** — {local.batcher.items} windows in {local.batcher.batches} batches")
+
+    with st.expander("🧭 Model Router"):
+        routing = get_router().snapshot()
+        if not routing["enabled"]:
+            st.caption("Routing is off (ROUTER_ENABLED=0); models run in their configured order.")
+        elif not routing["stats"]:
+            st.caption("No model calls recorded yet.")
+        else:
+            st.dataframe(routing["stats"], hide_index=True, use_container_width=True)
+            recent = [d for d in routing["decisions"] if d["skipped"] or d["demoted"] or d["explored"]][-10:]
+            for d in reversed(recent):
+                st.caption(f"{datetime.fromtimestamp(d['time']):%H:%M:%S} · {d['language'].upper()} · "
+                           f"order: {', '.join(d['order'])}"
+                           + (f" · skipped: {', '.join(d['skipped'])}" if d["skipped"] else "")
+                           + (f" · exploring: {', '.join(d['explored'])}" if d["explored"] else ""))
+
+    with st.expander("🧩 Detector Config"):
+        config_state = get_config_store().snapshot()
+        config = current_config()
+        st.markdown(f"**Version {config_state['version']}** · {len(config.fake_indicators)} fake and "
+                    f"{len(config.real_indicators)} sourcing phrases · {len(config.models)} models")
+        st.caption(f"{config_state['path']} · loaded {datetime.fromtimestamp(config_state['loaded_at']):%H:%M:%S} · "
+                   f"{config_state['reloads']} reloads"
+                   + (" · watching for changes" if config_state["watching"] else " · not watched (CONFIG_POLL=0)"))
+        if config_state["error"]:
+            st.warning(f"⚠️ Last reload failed, still on version {config_state['version']}: {config_state['error']}")
+
     st.markdown("---")
     if st.button("🗑️ Clear History"):
-        st.session_state.history = []
-        st.session_state.total_checked = 0
-        st.session_state.fake_count = 0
-        st.session_state.real_count = 0
+        get_history_store().clear(history_owner)
         st.rerun()
 
     st.markdown("---")
     st.markdown("<p style='color:#666; font-size:0.75rem; text-align:center;'>Final Year Project<br>Fake News Detection System<br>NLP & Transformers</p>", unsafe_allow_html=True)
 
 
+# ─────────────────────────────────────────────
+# CSV Batch Mode
+# ─────────────────────────────────────────────
+CSV_CHUNK_ROWS = 500
+CSV_LIVE_ROWS = 50
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class LabeledCSV:
+    # A batch's output file, deleted when the next batch replaces it, when
+    # nothing holds it any more (the session ended, or the run failed) or at exit
+    def __init__(self, path):
+        self.path = path
+        self.remove = weakref.finalize(self, remove_file, path)
+
+
+def run_csv_batch(csv_bytes, text_col):
+    # Streams the CSV in chunks, classifying each row as its own article.
+    # Only one chunk is held in memory; labeled rows go straight to a temp file.
+    import io
+    import tempfile
+    import pandas as pd
+
+    progress = st.progress(0.0)
+    status = st.empty()
+    table = st.empty()
+    recent = deque(maxlen=CSV_LIVE_ROWS)
+    totals = {"rows": 0, "FAKE": 0, "REAL": 0}
+    # Line count is only an estimate (quoted newlines), good enough for a bar
+    estimated_rows = max(1, csv_bytes.count(b"\n") - 1)
+    started = time.monotonic()
+    last_draw = 0.0
+
+    def draw():
+        elapsed = time.monotonic() - started
+        progress.progress(min(totals["rows"] / estimated_rows, 1.0))
+        status.markdown(
+            f"🧾 **{totals['rows']}** rows · 🔴 {totals['FAKE']} fake · 🟢 {totals['REAL']} real · "
+            f"⏱️ {elapsed:.1f}s ({totals['rows'] / max(elapsed, 1e-9):.1f} rows/s)"
+        )
+        table.dataframe(list(recent), use_container_width=True, hide_index=True)
+
+    out = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8", newline="")
+    output = LabeledCSV(out.name)
+    with out:
+        chunks = pd.read_csv(io.BytesIO(csv_bytes), chunksize=CSV_CHUNK_ROWS)
+        for chunk_no, chunk in enumerate(chunks):
+            labels = [None] * len(chunk)
+            confidences = [None] * len(chunk)
+            methods = [None] * len(chunk)
+            texts = chunk[text_col].tolist()
+            for i, label, confidence, method in classify_chunk(texts, session=session_id):
+                labels[i], confidences[i], methods[i] = label, round(confidence, 4), method
+                totals["rows"] += 1
+                totals[label] += 1
+                text = texts[i] if isinstance(texts[i], str) else ""
+                recent.appendleft({
+                    "row": chunk_no * CSV_CHUNK_ROWS + i + 1,
+                    "verdict": label,
+                    "confidence": f"{confidence * 100:.1f}%",
+                    "text": text[:120],
+                })
+                if time.monotonic() - last_draw > 0.3:
+                    draw()
+                    last_draw = time.monotonic()
+            chunk = chunk.assign(verdict=labels, verdict_confidence=confidences, verdict_method=methods)
+            chunk.to_csv(out, header=chunk_no == 0, index=False)
+    draw()
+    progress.progress(1.0)
+    return dict(totals, output=output, seconds=time.monotonic() - started)
+
+
+# ─────────────────────────────────────────────
+# Multi-File Mode
+# ─────────────────────────────────────────────
+FILE_STATUS = {"queued": "⏳ Queued", "ok": "✅ Done", "failed": "❌ Failed"}
+
+
+def run_file_batch(files, aggregation):
+    # Files are extracted and classified on a worker pool; each row of the
+    # table fills in as soon as its file is done, whatever order they finish in
+    progress = st.progress(0.0)
+    status = st.empty()
+    table = st.empty()
+    rows = [{"file": f.name, "status": FILE_STATUS["queued"], "verdict": "", "confidence": "",
+             "words": None, "seconds": None, "details": ""} for f in files]
+    totals = {"done": 0, "FAKE": 0, "REAL": 0, "failed": 0}
+    started = time.monotonic()
+    last_draw = 0.0
+
+    def draw():
+        elapsed = time.monotonic() - started
+        progress.progress(totals["done"] / len(files))
+        status.markdown(
+            f"📂 **{totals['done']}** of {len(files)} files · 🔴 {totals['FAKE']} fake · 🟢 {totals['REAL']} real"
+            + (f" · ❌ {totals['failed']} failed" if totals["failed"] else "") + f" · ⏱️ {elapsed:.1f}s"
+        )
+        table.dataframe(rows, use_container_width=True, hide_index=True)
+
+    draw()
+    for i, result in classify_files([(f.name, f.getvalue()) for f in files], aggregation, session=session_id):
+        totals["done"] += 1
+        if result["status"] == "ok":
+            totals[result["verdict"]] += 1
+            get_history_store().add(
+                history_owner, result["text"], result["verdict"], result["confidence"], result["method"],
+                language=result["language"], latency_ms=result["seconds"] * 1000, words=result["words"],
+                config_version=result["config_version"],
+            )
+        else:
+            totals["failed"] += 1
+        rows[i] = {
+            "file": result["file"],
+            "status": FILE_STATUS[result["status"]],
+            "verdict": result["verdict"] or "",
+            "confidence": f"{result['confidence'] * 100:.1f}%" if result["confidence"] is not None else "",
+            "words": result["words"],
+            "seconds": round(result["seconds"], 2),
+            "details": result["error"] or result["method"],
+        }
+        if time.monotonic() - last_draw > 0.3:
+            draw()
+            last_draw = time.monotonic()
+    draw()
+    return dict(totals, rows=rows, seconds=time.monotonic() - started)
+
+
+# ─────────────────────────────────────────────
+# File Extraction
+# ─────────────────────────────────────────────
+def read_pdf(pdf_bytes):
+    # Shows pages as they are extracted; returns (text, extraction report)
+    report = {}
+    pages = []
+    progress = st.progress(0.0, text="📄 Reading PDF...")
+    for number, page_text in iter_pdf_pages(pdf_bytes, report=report):
+        pages.append(page_text)
+        progress.progress(number / report["pages"], text=f"📄 Page {number} of {report['pages']}")
+    progress.empty()
+    return "\n".join(p for p in pages if p), report
+
+
+# ─────────────────────────────────────────────
+# Analysis Progress
+# ─────────────────────────────────────────────
+PROGRESS_MESSAGES = {
+    "cached": "⚡ Found a recent verdict for this text",
+    "near_duplicate": "♻️ Found a {similarity:.0%} similar article analysed earlier",
+    "preprocessed": "🌐 Detected {language} text ({words} words), querying models...",
+    "model_started": "🤖 Trying {model}...",
+    "model_finished": "✅ {model} answered in {elapsed:.1f}s",
+    "model_failed": "⚠️ {model} failed after {elapsed:.1f}s",
+    "model_skipped": "⏭️ Stopped waiting for {model}",
+    "fallback": "📏 All models unavailable, using {engine}...",
+    "done": "✅ Done",
+}
+
+
 # ─────────────────────────────────────────────
 # Main Content
 # ─────────────────────────────────────────────
@@ -435,6 +539,8 @@ with tab1:
     )
 
     news_input = ""
+    csv_batch = None
+    file_batch = None
 
     # ── Text Input ──
     if input_method == "✍️ Type / Paste Text":
@@ -479,14 +585,28 @@ with tab1:
         </div>
         """, unsafe_allow_html=True)
 
-        uploaded_file = st.file_uploader(
-            "📁 Click 'Browse files' to select from your laptop",
-            type=["txt", "pdf", "docx", "csv"],
-            accept_multiple_files=False,
+        uploaded_files = st.file_uploader(
+            "📁 Click 'Browse files' to select one or more files from your laptop",
+            type=list(FILE_KINDS),
+            accept_multiple_files=True,
             key="file_uploader"
-        )
+        ) or []
+        uploaded_file = uploaded_files[0] if len(uploaded_files) == 1 else None
 
-        if uploaded_file is not None:
+        if len(uploaded_files) > 1:
+            file_batch = uploaded_files
+            st.markdown(f"""
+            <div class='info-card'>
+                <h4>✅ {len(uploaded_files)} Files Loaded!</h4>
+                <p style='color:#ccc;'>
+                📦 {sum(f.size for f in uploaded_files)/1024:.1f} KB in total &nbsp;|&nbsp;
+                🔖 {", ".join(sorted({f.name.rsplit(".", 1)[-1].upper() for f in uploaded_files}))}
+                </p>
+                <p style='color:#aaa; font-size:0.85rem;'>Each file is classified as its own article; CSV files use their first text column.</p>
+            </div>
+            """, unsafe_allow_html=True)
+
+        elif uploaded_file is not None:
             file_name = uploaded_file.name
             file_size = uploaded_file.size
             file_ext = file_name.split(".")[-1].lower()
@@ -503,37 +623,50 @@ with tab1:
             """, unsafe_allow_html=True)
 
             extracted_text = ""
+            extract_hit = None
             try:
-                import io
                 if file_ext == "txt":
                     extracted_text = uploaded_file.read().decode("utf-8", errors="ignore")
                 elif file_ext == "pdf":
                     try:
-                        import PyPDF2
-                        pdf_reader = PyPDF2.PdfReader(io.BytesIO(uploaded_file.read()))
-                        for page in pdf_reader.pages:
-                            extracted_text += page.extract_text() or ""
+                        (extracted_text, report), extract_hit = cached_extract(uploaded_file.getvalue(), "pdf", read_pdf)
+                        skipped = report["failed_pages"] + report["timed_out_pages"]
+                        st.caption(
+                            f"📄 Read {report['pages_read']} of {report['pages']} pages in {report['seconds']:.2f}s"
+                            + (" — stopped once there was enough text to analyze" if report["stopped_early"] else "")
+                            + (f" — skipped unreadable pages {', '.join(map(str, sorted(skipped)))}" if skipped else "")
+                        )
                     except ImportError:
                         st.error("❌ Run: pip install PyPDF2")
                 elif file_ext == "docx":
                     try:
-                        import docx
-                        doc = docx.Document(io.BytesIO(uploaded_file.read()))
-                        extracted_text = "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
+                        extracted_text, extract_hit = cached_extract(uploaded_file.getvalue(), "docx", extract_docx_text)
                     except ImportError:
                         st.error("❌ Run: pip install python-docx")
                 elif file_ext == "csv":
                     try:
-                        import pandas as pd
-                        df = pd.read_csv(io.BytesIO(uploaded_file.read()))
-                        text_cols = df.select_dtypes(include="object").columns.tolist()
+                        csv_bytes = uploaded_file.getvalue()
+                        text_cols, extract_hit = cached_extract(csv_bytes, "csv-columns", csv_text_columns)
                         if text_cols:
-                            extracted_text = " ".join(df[text_cols[0]].dropna().astype(str).tolist())
+                            csv_mode = st.radio(
+                                "📑 CSV Mode",
+                                ["🧾 Classify each row", "📄 Combine rows into one article"],
+                                horizontal=True,
+                                key="csv_mode"
+                            )
+                            text_col = st.selectbox("🔤 Text column", text_cols, key="csv_text_col")
+                            if csv_mode == "🧾 Classify each row":
+                                csv_batch = (csv_bytes, text_col, file_name)
+                            else:
+                                extracted_text, extract_hit = cached_extract(csv_bytes, "csv", extract_csv_column, text_col)
                     except ImportError:
                         st.error("❌ Run: pip install pandas")
             except Exception as e:
                 st.error(f"❌ Error: {str(e)}")
 
+            if extract_hit:
+                st.caption("⚡ Loaded from the upload cache — this file was already parsed")
+
             if extracted_text.strip():
                 st.session_state.final_text = extracted_text
                 news_input = extracted_text
@@ -556,11 +689,72 @@ with tab1:
                 <p style='font-size:1rem;'>Click "Browse files" to pick a file from your laptop</p>
             </div>""", unsafe_allow_html=True)
 
+    # ── CSV Batch Mode ──
+    if csv_batch is not None:
+        csv_bytes, text_col, file_name = csv_batch
+        batch_key = (file_name, len(csv_bytes), text_col)
+        st.markdown("<br>", unsafe_allow_html=True)
+        col_btn1, col_btn2, col_btn3 = st.columns([1, 2, 1])
+        with col_btn2:
+            batch_btn = st.button("🚀 Classify All Rows", key="classify_rows")
+        if batch_btn:
+            previous = st.session_state.get("csv_batch_result")
+            if previous:
+                previous["output"].remove()
+            st.session_state.csv_batch_result = dict(run_csv_batch(csv_bytes, text_col), key=batch_key)
+
+        result = st.session_state.get("csv_batch_result")
+        if result and result["key"] == batch_key and os.path.exists(result["output"].path):
+            st.success(
+                f"✅ {result['rows']} rows classified in {result['seconds']:.1f}s "
+                f"({result['rows'] / max(result['seconds'], 1e-9):.1f} rows/s) — "
+                f"🔴 {result['FAKE']} fake · 🟢 {result['REAL']} real"
+            )
+            with open(result["output"].path, "rb") as labeled:
+                st.download_button(
+                    "⬇️ Download Labeled CSV",
+                    data=labeled,
+                    file_name=file_name.rsplit(".", 1)[0] + "_labeled.csv",
+                    mime="text/csv",
+                    key="download_labeled_csv"
+                )
+
+    # ── Multi-File Mode ──
+    if file_batch is not None:
+        batch_key = tuple((f.name, f.size) for f in file_batch)
+        st.markdown("<br>", unsafe_allow_html=True)
+        col_btn1, col_btn2, col_btn3 = st.columns([1, 2, 1])
+        with col_btn2:
+            files_btn = st.button(f"🚀 Analyze All {len(file_batch)} Files", key="classify_files")
+        if files_btn:
+            st.session_state.file_batch_result = dict(run_file_batch(file_batch, aggregation), key=batch_key)
+        else:
+            result = st.session_state.get("file_batch_result")
+            if result and result["key"] == batch_key:
+                st.dataframe(result["rows"], use_container_width=True, hide_index=True)
+
+        result = st.session_state.get("file_batch_result")
+        if result and result["key"] == batch_key:
+            slowest = max((row["seconds"] or 0 for row in result["rows"]), default=0)
+            st.success(
+                f"✅ {result['done']} files in {result['seconds']:.1f}s (slowest file {slowest:.1f}s) — "
+                f"🔴 {result['FAKE']} fake · 🟢 {result['REAL']} real"
+                + (f" · ❌ {result['failed']} failed" if result["failed"] else "")
+            )
+            import pandas as pd
+            st.download_button(
+                "⬇️ Download Results CSV",
+                data=pd.DataFrame(result["rows"]).to_csv(index=False),
+                file_name="file_verdicts.csv",
+                mime="text/csv",
+                key="download_file_verdicts"
+            )
+
     # ── Analyze Button ──
     st.markdown("<br>", unsafe_allow_html=True)
     col_btn1, col_btn2, col_btn3 = st.columns([1, 2, 1])
     with col_btn2:
-        analyze_btn = st.button("🚀 Analyze Now", key="analyze")
+        analyze_btn = st.button("🚀 Analyze Now", key="analyze", disabled=csv_batch is not None or file_batch is not None)
 
     if not news_input.strip() and st.session_state.get("final_text", "").strip():
         news_input = st.session_state.final_text
@@ -570,28 +764,25 @@ with tab1:
         if len(news_input.strip().split()) < 5:
             st.warning("⚠️ Please enter at least 5 words.")
         else:
-            with st.spinner("🤖 AI Models analyzing... Please wait..."):
-                progress = st.progress(0)
-                for i in range(100):
-                    time.sleep(0.015)
-                    progress.progress(i + 1)
-                label, confidence, method = detect_fake_news(news_input)
-                word_count, sentence_count = get_word_stats(news_input)
+            progress = st.progress(0.0, text="🧹 Preparing text...")
+
+            def show_progress(event):
+                progress.progress(event["progress"], text=PROGRESS_MESSAGES[event["stage"]].format(**event))
+
+            details = {}
+            started = time.monotonic()
+            label, confidence, method = detect_fake_news(
+                news_input, aggregation=aggregation, details=details, on_progress=show_progress, session=session_id)
+            latency_ms = (time.monotonic() - started) * 1000
+            features = details["features"]
+            word_count, sentence_count = features.word_count, features.sentence_count
             progress.empty()
 
-            st.session_state.total_checked += 1
-            if label == "FAKE":
-                st.session_state.fake_count += 1
-            else:
-                st.session_state.real_count += 1
-
-            st.session_state.history.insert(0, {
-                "text": news_input[:100] + "..." if len(news_input) > 100 else news_input,
-                "label": label,
-                "confidence": confidence,
-                "time": datetime.now().strftime("%H:%M:%S"),
-                "method": method
-            })
+            get_history_store().add(
+                history_owner, features.text, label, confidence, method,
+                language=features.language, latency_ms=latency_ms, words=word_count,
+                config_version=details["config_version"],
+            )
 
             st.markdown("---")
             st.markdown("### 📊 Analysis Result")
@@ -621,8 +812,31 @@ with tab1:
             <div class='info-card'>
                 <h4>🤖 Detection Method</h4>
                 <p style='color:#ccc;'>{method}</p>
+                <p style='color:#a0a0c0; font-size:0.8rem;'>Detector config version {html.escape(details['config_version'])}</p>
             </div>""", unsafe_allow_html=True)
 
+            duplicate = details.get("near_duplicate")
+            if duplicate:
+                analysed_at = datetime.fromtimestamp(duplicate["source"]["analysed_at"])
+                st.info(f"♻️ Verdict reused from a {duplicate['similarity']:.0%} similar article analysed "
+                        f"{analysed_at:%Y-%m-%d %H:%M}: “{duplicate['source']['excerpt']}…”")
+
+            spans = details.get("spans") or []
+            if spans:
+                with st.expander(f"🔦 Suspicious Sentences ({len(spans)})", expanded=label == "FAKE"):
+                    st.caption("🔴 fake phrase · 🟠 exclamations · 🟣 caps · 🟢 sourcing phrase")
+                    for span in spans:
+                        marked = "".join(
+                            html.escape(piece) if kind is None
+                            else f"<span class='span-mark span-{kind}'>{html.escape(piece)}</span>"
+                            for piece, kind in highlight_segments(span["text"], span["marks"])
+                        )
+                        st.markdown(f"""
+                        <div class='info-card'>
+                            <p>{marked}</p>
+                            <p style='color:#a0a0c0; font-size:0.8rem;'>Sentence {span['sentence'] + 1} · score {span['score']:.2f} · {html.escape(span['reasons'])}</p>
+                        </div>""", unsafe_allow_html=True)
+
             fake_val = confidence if label == "FAKE" else 1 - confidence
             real_val = confidence if label == "REAL" else 1 - confidence
 
@@ -636,6 +850,18 @@ with tab1:
                 st.progress(real_val)
                 st.markdown(f"**{real_val*100:.1f}%**")
 
+            windows = details.get("windows") or []
+            if len(windows) > 1:
+                with st.expander(f"🪟 Window Scores ({len(windows)} windows, {WINDOW_AGGREGATIONS[details['aggregation']]})"):
+                    st.bar_chart({"Fake score": [w["fake"] for w in windows]})
+                    st.dataframe(windows, use_container_width=True, hide_index=True)
+
+            votes = details.get("ensemble") or []
+            if votes:
+                voted = sum(row["status"] == "voted" for row in votes)
+                with st.expander(f"🗳️ Ensemble Votes ({voted}/{len(votes)} models voted)"):
+                    st.dataframe(votes, use_container_width=True, hide_index=True)
+
     elif analyze_btn:
         if input_method == "📂 Upload File from Laptop":
             st.warning("⚠️ Please upload a file first.")
@@ -646,18 +872,38 @@ with tab1:
 # ─── TAB 2: History ───
 with tab2:
     st.markdown("### 📜 Analysis History")
-    if not st.session_state.history:
+    history = get_history_store()
+    f1, f2 = st.columns([1, 2])
+    with f1:
+        label_filter = st.selectbox("🏷️ Verdict", ["All", "FAKE", "REAL"], key="history_label")
+    with f2:
+        date_range = st.date_input("📅 Dates", value=(), key="history_dates")
+    since = until = None
+    if len(date_range) == 2:
+        since = datetime.combine(date_range[0], datetime.min.time()).timestamp()
+        until = datetime.combine(date_range[1] + timedelta(days=1), datetime.min.time()).timestamp()
+    label_filter = None if label_filter == "All" else label_filter
+
+    matching = history.counts(history_owner, label_filter, since, until)["total"]
+    if not matching:
         st.info("No history yet. Go to Analyze tab to get started!")
     else:
-        for item in st.session_state.history:
+        pages = (matching + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+        page = st.number_input("📄 Page", min_value=1, max_value=pages, value=1, key="history_page") - 1
+        st.caption(f"Showing {page * HISTORY_PAGE_SIZE + 1}–{min((page + 1) * HISTORY_PAGE_SIZE, matching)} of {matching}")
+        for item in history.page(history_owner, page, HISTORY_PAGE_SIZE, label_filter, since, until):
             css_class = "history-item-fake" if item["label"] == "FAKE" else "history-item-real"
             icon = "❌" if item["label"] == "FAKE" else "✅"
+            preview = item["text"][:100] + "..." if len(item["text"]) > 100 else item["text"]
+            config_note = f" · config {item['config_version']}" if item["config_version"] else ""
             st.markdown(f"""
             <div class='{css_class}'>
                 <strong>{icon} {item['label']}</strong> &nbsp;|&nbsp;
                 Confidence: <strong>{item['confidence']*100:.1f}%</strong> &nbsp;|&nbsp;
-                {item['time']}<br>
-                <span style='color:#ccc; font-size:0.85rem;'>{item['text']}</span>
+                {datetime.fromtimestamp(item['created_at']).strftime("%Y-%m-%d %H:%M:%S")} &nbsp;|&nbsp;
+                {(item['language'] or '').title()} &nbsp;|&nbsp; {item['latency_ms'] or 0:.0f} ms<br>
+                <span style='color:#ccc; font-size:0.85rem;'>{preview}</span><br>
+                <span style='color:#999; font-size:0.75rem;'>{item['method']}{config_note}</span>
             </div>""", unsafe_allow_html=True)
 
 
@@ -0,0 +1,90 @@
+"""Cold starts: how many verdicts fall back to the rules while models load.
+
+    python benchmarks/bench_cold_start.py --cold-start-seconds 3 --requests 40
+
+Runs the same burst of detect_fake_news calls against a fresh stub API whose
+models answer 503 "currently loading" (with estimated_time) until
+--cold-start-seconds after their first request, in three scenarios:
+
+    cold        traffic arrives while every model is cold
+    tight       the same, but with a cascade deadline shorter than the load
+    warmed      the background warmer has pinged the models beforehand
+
+and reports the share of rule-fallback verdicts, latency and the 503s seen.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+
+import stub_inference_api  # noqa: E402
+
+
+def counter(summary, name, **labels):
+    return sum(value for cname, clabels, value in summary["counters"]
+               if cname == name and all(clabels.get(k) == v for k, v in labels.items()))
+
+
+def run_scenario(name, args):
+    server, base = stub_inference_api.start(latency=args.latency, cold_start_seconds=args.cold_start_seconds)
+    # The package reads HF_API_BASE at import; point the models at this stub
+    from news_detector import analyze_with_huggingface, current_config
+    from news_detector.config import get_config_store
+    from news_detector.metrics import metrics
+    from news_detector.warmup import ModelWarmer
+
+    store = get_config_store()
+    store.api_base = base
+    store.reload()
+    urls = [url for url, _ in current_config().models]
+    metrics.reset()
+
+    if name == "warmed":
+        started = time.perf_counter()
+        ModelWarmer(urls, interval=3600).warm_once()
+        print(f"  warm-up took {time.perf_counter() - started:.2f}s")
+    deadline = args.tight_deadline if name == "tight" else args.deadline
+
+    def one(i):
+        t = time.perf_counter()
+        label, _, _ = analyze_with_huggingface(f"Officials confirmed the report on day {i} of the inquiry.",
+                                               deadline=deadline)
+        return label is not None, time.perf_counter() - t
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, range(args.requests)))
+    server.shutdown()
+
+    latencies = sorted(seconds for _, seconds in results)
+    summary = metrics.summary()
+    fallback = sum(1 for answered, _ in results if not answered)
+    print(f"{name:<8} rule fallback {fallback / len(results):6.1%}   p50 {latencies[len(latencies) // 2] * 1000:8.1f} ms   "
+          f"max {latencies[-1] * 1000:8.1f} ms   503s {server.config.counts.get(503, 0):4d}   "
+          f"waited {counter(summary, 'model_loading_total', decision='waited'):4d}   "
+          f"moved on {counter(summary, 'model_loading_total', decision='moved_on'):4d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cold-start-seconds", type=float, default=3.0)
+    parser.add_argument("--latency", default="lognormal:60:0.5", help="stub latency distribution")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--deadline", type=float, default=30.0, help="cascade deadline in seconds")
+    parser.add_argument("--tight-deadline", type=float, default=1.0, help="cascade deadline for 'tight'")
+    parser.add_argument("--scenarios", nargs="+", default=["cold", "tight", "warmed"])
+    args = parser.parse_args()
+    os.environ.update(INFERENCE_BACKENDS="huggingface", VERDICT_CACHE_SIZE="0", VERDICT_CACHE_DB="",
+                      WARMUP_INTERVAL="0", ROUTER_ENABLED="0", RATE_LIMIT_RPS="0")
+    for name in args.scenarios:
+        run_scenario(name, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
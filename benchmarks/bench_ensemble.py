@@ -0,0 +1,89 @@
+"""Ensemble mode: accuracy and latency against the deadline, next to the first-answer cascade.
+
+    python benchmarks/bench_ensemble.py --requests 200 --deadlines 0.3 0.6 1.2 2.5 5
+
+Starts the stub API with a different latency and accuracy per model (by
+default the slower models are the more accurate ones) and classifies texts
+carrying a hidden [truth:...] marker, first with the usual cascade and then
+in ensemble mode at each deadline. Reports the share of correct verdicts, how
+many models voted on average, and the latency.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+
+import stub_inference_api  # noqa: E402
+
+# (median latency ms, accuracy) per model, in the config's model order
+PROFILES = [(120, 0.68), (250, 0.70), (450, 0.72), (900, 0.75), (1800, 0.78)]
+
+
+def run(name, texts, mode, deadline, concurrency):
+    from news_detector import analyze_with_huggingface
+
+    def one(item):
+        text, truth = item
+        details = {}
+        started = time.perf_counter()
+        label, _, _ = analyze_with_huggingface(text, deadline=deadline, mode=mode, details=details)
+        voters = sum(row["status"] == "voted" for row in details.get("ensemble", [])) if mode == "ensemble" else 1
+        return label, truth, voters if label else 0, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, texts))
+    latencies = sorted(seconds for *_, seconds in results)
+    correct = sum(label is not None and label.lower() == truth for label, truth, _, _ in results)
+    fallback = sum(label is None for label, *_ in results)
+    voters = sum(v for _, _, v, _ in results) / len(results)
+    print(f"{name:<16} correct {correct / len(results):6.1%}   fallback {fallback / len(results):6.1%}   "
+          f"voters {voters:4.2f}   p50 {latencies[len(latencies) // 2]:5.2f}s   "
+          f"p95 {latencies[int(0.95 * (len(latencies) - 1))]:5.2f}s", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--deadlines", type=float, nargs="+", default=[0.3, 0.6, 1.2, 2.5, 5.0])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--sigma", type=float, default=0.4, help="lognormal sigma of every model's latency")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    os.environ.update(INFERENCE_BACKENDS="huggingface", VERDICT_CACHE_SIZE="0", VERDICT_CACHE_DB="",
+                      DEDUP_INDEX_SIZE="0", WARMUP_INTERVAL="0", ROUTER_ENABLED="0", RATE_LIMIT_RPS="0")
+    from news_detector import current_config
+    from news_detector.config import get_config_store
+    from news_detector.metrics import endpoint_label
+
+    names = [endpoint_label(url) for url, _ in current_config().models]
+    server, base = stub_inference_api.start(
+        model_latency={name: f"lognormal:{ms}:{args.sigma}" for name, (ms, _) in zip(names, PROFILES)},
+        model_accuracy={name: accuracy for name, (_, accuracy) in zip(names, PROFILES)},
+    )
+    store = get_config_store()
+    store.api_base = base
+    store.reload()
+
+    rng = random.Random(args.seed)
+    texts = []
+    for i in range(args.requests):
+        truth = rng.choice(["fake", "real"])
+        texts.append((f"Report {i}: officials confirmed the figures on day {i}. [truth:{truth}]", truth))
+
+    for name, (ms, accuracy) in zip(names, PROFILES):
+        print(f"  {name:<45} median {ms:5d} ms   accuracy {accuracy:.0%}")
+    run("first answer", texts, "first", None, args.concurrency)
+    for deadline in args.deadlines:
+        run(f"ensemble {deadline:g}s", texts, "ensemble", deadline, args.concurrency)
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""Multi-file uploads: wall-clock time of a folder of files, one at a time vs pooled.
+
+    python benchmarks/bench_file_batch.py --files 50 --latency lognormal:300:0.6
+
+Builds a mix of .txt, .pdf, .docx and .csv articles (plus one broken PDF),
+points the models at the in-process stub API, turns the verdict, upload and
+near-duplicate caches off, and runs news_detector.files.classify_files with
+one worker (the old one-after-another flow) and with --workers workers.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+
+import stub_inference_api  # noqa: E402
+
+
+def build_files(count, words, seed):
+    from bench_pdf_extraction import build_pdf
+    from run_suite import make_csv, make_docx, make_text
+
+    files = [("broken.pdf", b"%PDF-1.4 not really a pdf")]
+    for i in range(count - 1):
+        text = make_text(words, seed + i)
+        kind = ("txt", "pdf", "docx", "csv")[i % 4]
+        if kind == "txt":
+            data = text.encode("utf-8")
+        elif kind == "pdf":
+            data = build_pdf(max(1, words // 300), lines_per_page=30, seed=seed + i)
+        elif kind == "docx":
+            data = make_docx(text)
+        else:
+            data = make_csv(text)
+        files.append((f"article_{i:03d}.{kind}", data))
+    return files
+
+
+def run(files, workers):
+    from news_detector.files import classify_files
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        rows = [row for _, row in classify_files(files, executor=executor)]
+    elapsed = time.perf_counter() - started
+    failed = sum(row["status"] == "failed" for row in rows)
+    slowest = max(row["seconds"] for row in rows)
+    total = sum(row["seconds"] for row in rows)
+    print(f"{workers:>3} workers  wall {elapsed:7.2f}s   slowest file {slowest:6.2f}s   "
+          f"sum of files {total:7.2f}s   failed {failed}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--words", type=int, default=600, help="words per article")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", default="lognormal:300:0.6", help="stub latency distribution")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server, base = stub_inference_api.start(latency=args.latency)
+    os.environ.update(HF_API_BASE=base, INFERENCE_BACKENDS="huggingface", VERDICT_CACHE_SIZE="0",
+                      VERDICT_CACHE_DB="", DEDUP_INDEX_SIZE="0", EXTRACT_CACHE_SIZE="0", WARMUP_INTERVAL="0",
+                      RATE_LIMIT_RPS="0")
+    files = build_files(args.files, args.words, args.seed)
+    run(files[:2], 2)   # warm-up: imports, pools, connections
+    for workers in (1, args.workers):
+        run(files, workers)
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Near-duplicate index: match quality and lookup cost as the corpus grows.
+
+    python benchmarks/bench_near_duplicates.py --articles 2000 --sizes 10000 100000 1000000
+
+Quality: indexes --articles synthetic articles, then looks up syndicated
+copies of each (new byline, tracking link, a few edited words, a dropped
+sentence) and as many unrelated articles, reporting the share matched.
+Scale: fills an in-memory index with random signatures up to each --sizes
+entry count and times lookups, showing the candidates examined per lookup
+and resident memory.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from news_detector.dedup import DEDUP_SHINGLE_WORDS, DEDUP_THRESHOLD, DuplicateIndex  # noqa: E402
+from news_detector.text import preprocess_text  # noqa: E402
+
+BYLINES = ["By Staff Reporter", "By Sarah Khan, Reuters", "AP —", "From our correspondent in Lahore"]
+
+
+def make_vocabulary(size, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(size)]
+
+
+def make_article(rng, vocabulary, sentences=20):
+    return [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(8, 20))) + "." for _ in range(sentences)]
+
+
+def syndicate(sentences, rng, vocabulary, edits):
+    # A repost: different byline, a tracking link, a few words changed and maybe a sentence cut
+    sentences = list(sentences)
+    if rng.random() < 0.5:
+        del sentences[rng.randrange(len(sentences))]
+    words = " ".join(sentences).split()
+    for _ in range(edits):
+        words[rng.randrange(len(words))] = rng.choice(vocabulary)
+    return f"{rng.choice(BYLINES)} {' '.join(words)} Read more: https://example.com/story?utm_source={rng.random()}"
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def quality(args):
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(5000, rng)
+    index = DuplicateIndex(max_entries=args.articles * 2, db_path="", threshold=args.threshold,
+                           shingle_words=args.shingle_words)
+    originals = [make_article(rng, vocabulary) for _ in range(args.articles)]
+    for i, sentences in enumerate(originals):
+        text = preprocess_text(" ".join(sentences))
+        index.add(index.signature(text), text, "FAKE" if i % 2 else "REAL", 0.9, "bench", str(i))
+
+    copies = [preprocess_text(syndicate(s, rng, vocabulary, args.edits)) for s in originals]
+    unrelated = [preprocess_text(" ".join(make_article(rng, vocabulary))) for _ in range(args.articles)]
+    started = time.perf_counter()
+    found = sum(index.lookup(index.signature(text)) is not None for text in copies)
+    elapsed = time.perf_counter() - started
+    false = sum(index.lookup(index.signature(text)) is not None for text in unrelated)
+    print(f"threshold {index.threshold}  bands {index.bands} x rows {index.rows}")
+    print(f"syndicated copies matched  {found / len(copies):6.1%}   ({elapsed / len(copies) * 1000:.2f} ms per "
+          f"signature + lookup)")
+    print(f"unrelated articles matched {false / len(unrelated):6.1%}")
+
+
+def scale(args):
+    import numpy as np
+
+    rng = np.random.default_rng(args.seed)
+    index = DuplicateIndex(max_entries=max(args.sizes), db_path="")
+    filled = 0
+    base_rss = rss_mb()
+    print(f"\n{'entries':>9} {'lookup p50 us':>14} {'p99 us':>8} {'candidates':>11} {'rss MB':>8}")
+    for size in sorted(args.sizes):
+        for _ in range(size - filled):
+            signature = rng.integers(0, 2 ** 32, index.permutations, dtype=np.uint32).tobytes()
+            index.add(signature, "", "REAL", 0.9, "bench", "")
+        filled = size
+        index.lookups = index.candidates = 0
+        queries = [rng.integers(0, 2 ** 32, index.permutations, dtype=np.uint32).tobytes() for _ in range(2000)]
+        # Half of the lookups hit: a stored signature with 10% of its values changed
+        stored = list(index.entries.values())
+        for q in range(0, len(queries), 2):
+            signature = np.frombuffer(stored[int(rng.integers(len(stored)))][0], dtype=np.uint32).copy()
+            changed = rng.choice(index.permutations, index.permutations // 10, replace=False)
+            signature[changed] = rng.integers(0, 2 ** 32, len(changed), dtype=np.uint32)
+            queries[q] = signature.tobytes()
+        latencies = []
+        for signature in queries:
+            t = time.perf_counter()
+            index.lookup(signature)
+            latencies.append(time.perf_counter() - t)
+        latencies.sort()
+        stats = index.stats()
+        print(f"{size:>9} {latencies[len(latencies) // 2] * 1e6:>14.1f} {latencies[int(len(latencies) * 0.99)] * 1e6:>8.1f} "
+              f"{stats['candidates_per_lookup']:>11.2f} {rss_mb() - base_rss:>8.0f}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--edits", type=int, default=4, help="words changed per syndicated copy")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD)
+    parser.add_argument("--shingle-words", type=int, default=DEDUP_SHINGLE_WORDS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    quality(args)
+    scale(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
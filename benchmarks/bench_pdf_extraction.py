@@ -0,0 +1,94 @@
+"""Compare the old PDF reading loop with news_detector.extract.
+
+    python benchmarks/bench_pdf_extraction.py --pages 300
+
+Builds a synthetic text PDF, then times the single-threaded `+=` loop the app
+used to run against page-parallel extraction of the whole document and the
+default early-terminating extraction the app now uses.
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from news_detector.extract import EXTRACT_MAX_WORDS, EXTRACT_WORKERS, extract_pdf_text  # noqa: E402
+
+VOCABULARY = ("government report economy minister said officials according percent market "
+              "growth policy election court health city police study research data").split()
+
+
+def build_pdf(pages, lines_per_page=45, words_per_line=12, seed=0):
+    # Minimal PDF writer: one Helvetica content stream per page
+    rng = random.Random(seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for _ in range(pages):
+        lines = [" ".join(rng.choice(VOCABULARY) for _ in range(words_per_line)) for _ in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 40 800 Td 14 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream.encode()))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        " ".join(f"{k} 0 R" for k in kids).encode(), len(kids))
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.writelines(b"%010d 00000 n \n" % offset for offset in offsets)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def baseline(data):
+    import PyPDF2
+
+    extracted_text = ""
+    for page in PyPDF2.PdfReader(io.BytesIO(data)).pages:
+        extracted_text += page.extract_text() or ""
+    return extracted_text
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300)
+    args = parser.parse_args()
+
+    data = build_pdf(args.pages)
+    print(f"{args.pages} pages, {len(data) / 1024:.0f} KB, {EXTRACT_WORKERS} workers, "
+          f"early stop after {EXTRACT_MAX_WORDS} words")
+    # Warm the worker pool so spawn start-up is not billed to the first run
+    extract_pdf_text(build_pdf(EXTRACT_WORKERS * 4), max_words=sys.maxsize)
+
+    old, old_seconds = timed(baseline, data)
+    print(f"{'+= loop, all pages':<32} {old_seconds:7.2f}s  {len(old.split()):>8} words")
+    report = {}
+    full, seconds = timed(extract_pdf_text, data, max_words=sys.maxsize, report=report)
+    # The old loop glued the last word of each page to the next page's first word
+    assert "".join(full.split()) == "".join(old.split())
+    print(f"{'parallel, all pages':<32} {seconds:7.2f}s  {len(full.split()):>8} words  "
+          f"({old_seconds / seconds:.1f}x)")
+    report = {}
+    early, seconds = timed(extract_pdf_text, data, report=report)
+    print(f"{'parallel, early stop':<32} {seconds:7.2f}s  {len(early.split()):>8} words  "
+          f"({old_seconds / seconds:.1f}x, {report['pages_read']}/{report['pages']} pages)")
+
+
+if __name__ == "__main__":
+    main()
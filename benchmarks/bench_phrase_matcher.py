@@ -0,0 +1,89 @@
+"""Compare the compiled PhraseMatcher against per-phrase `in` scans.
+
+    python benchmarks/bench_phrase_matcher.py
+
+Phrase lists grow from the real indicator set to a few thousand synthetic
+phrases, documents from a headline-sized paragraph to a few MB. Below
+matcher.TRIE_MIN_PHRASES, counts() falls back to the `in` scans, so the
+smallest lists should come out even.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from news_detector.matcher import PhraseMatcher  # noqa: E402
+
+INDICATORS = [
+    "you won't believe", "they don't want you to know", "share before deleted", "wake up sheeple",
+    "crisis actor", "miracle cure", "doctors hate", "100% proven", "scientists baffled",
+    "they lied to us", "fake media", "illuminati", "click here now", "hoax", "coverup conspiracy",
+    "banned video", "deep state hiding", "according to", "reported by", "confirmed by",
+    "said in a statement", "official statement", "press release", "sources say", "told dawn",
+    "told the media", "told reporters", "in a statement", "study shows", "researchers found",
+    "data shows", "survey found", "published in", "peer reviewed", "experts say", "statistics show",
+    "dawn.com", "geo news", "ary news", "the news", "express tribune", "bbc urdu", "radio pakistan",
+    "app news agency", "ispr", "prime minister", "chief minister", "federal cabinet",
+    "national assembly", "senate", "supreme court", "high court", "election commission",
+    "state bank of pakistan", "imf", "world bank", "ministry of", "spokesperson", "foreign office",
+    "islamabad", "karachi", "lahore", "peshawar", "quetta", "balochistan", "sindh", "punjab",
+    "pakistan", "waziristan",
+]
+
+VOCAB = (
+    "the government said on monday that economy would grow this year despite concerns from "
+    "analysts about inflation debt officials markets reported data study minister court city "
+    "police statement media sources experts energy prices budget election party leaders"
+).split()
+
+
+def make_word(rng):
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9)))
+
+
+def make_phrases(n, rng):
+    phrases = dict.fromkeys(INDICATORS)
+    while len(phrases) < n:
+        phrases[" ".join(make_word(rng) for _ in range(rng.randint(2, 3)))] = None
+    return list(phrases)[:n]
+
+
+def make_document(n_chars, phrases, rng):
+    # Ordinary prose with an indicator phrase roughly every 2000 words
+    words = []
+    size = 0
+    while size < n_chars:
+        word = rng.choice(phrases) if rng.random() < 0.0005 else rng.choice(VOCAB)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def best_of(fn, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    rng = random.Random(7)
+    print(f"{'phrases':>8} {'doc chars':>10} {'naive ms':>10} {'matcher ms':>11} {'speedup':>8}")
+    for n_phrases in (len(INDICATORS), 300, 1000, 3000):
+        phrases = make_phrases(n_phrases, rng)
+        matcher = PhraseMatcher({"phrases": phrases})
+        for n_chars in (2_000, 100_000, 2_000_000):
+            text = make_document(n_chars, phrases, rng)
+            naive_time, naive = best_of(lambda: sum(1 for p in phrases if p in text))
+            fast_time, fast = best_of(lambda: matcher.counts(text)["phrases"])
+            assert naive == fast, (naive, fast)
+            print(f"{n_phrases:>8} {len(text):>10} {naive_time * 1000:>10.2f} "
+                  f"{fast_time * 1000:>11.2f} {naive_time / fast_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Shared rate limiter: one heavy session and a few light ones against a rate-limited API.
+
+    python benchmarks/bench_rate_limit.py --upstream-rps 10 --heavy 60 --light 3x4
+
+The stub API answers 429 once a model gets more than --upstream-rps requests
+per second. A "heavy" session (an analyst's folder upload) runs --heavy
+cascades, FILE_WORKERS at a time; shortly after, each light session starts a
+few at once. This runs twice: with the limiter off, and with it on at the
+upstream rate. For each kind of session it reports how many verdicts came
+from a model (the rest fall back to the rules) and the latency.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+
+import stub_inference_api  # noqa: E402
+
+
+def run_scenario(limited, args):
+    server, base = stub_inference_api.start(latency=args.latency, rate_limit=args.upstream_rps)
+    from news_detector import analyze_with_huggingface
+    from news_detector.client import get_inference_client
+    from news_detector.config import get_config_store
+    from news_detector.files import FILE_WORKERS
+
+    store = get_config_store()
+    store.api_base = base
+    store.reload()
+    limiter = get_inference_client().limiter
+    limiter.rate, limiter.burst = (args.upstream_rps, args.upstream_rps) if limited else (0, 0)
+
+    light_sessions, light_requests = (int(n) for n in args.light.split("x"))
+    results = {"heavy": [], "light": []}
+    lock = threading.Lock()
+
+    def one(kind, session, i):
+        started = time.perf_counter()
+        label, _, _ = analyze_with_huggingface(f"{session} report {i}: officials confirmed the figures.",
+                                               deadline=args.deadline, session=session)
+        with lock:
+            results[kind].append((label is not None, time.perf_counter() - started))
+
+    light = [(f"light-{s}", i) for s in range(light_sessions) for i in range(light_requests)]
+    with ThreadPoolExecutor(max_workers=FILE_WORKERS) as heavy_pool, \
+            ThreadPoolExecutor(max_workers=len(light)) as light_pool:
+        for i in range(args.heavy):
+            heavy_pool.submit(one, "heavy", "heavy", i)
+        time.sleep(args.light_delay)
+        for session, i in light:
+            light_pool.submit(one, "light", session, i)
+    server.shutdown()
+
+    print(f"\nlimiter {'on' if limited else 'off'}   upstream 429s {server.config.counts.get(429, 0)}")
+    for kind, rows in results.items():
+        answered = sum(ok for ok, _ in rows)
+        latencies = sorted(seconds for _, seconds in rows)
+        print(f"  {kind:<6} {len(rows):>4} requests   model verdicts {answered / len(rows):6.1%}   "
+              f"p50 {latencies[len(latencies) // 2]:6.2f}s   max {latencies[-1]:6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--upstream-rps", type=float, default=10.0, help="stub rate limit per model")
+    parser.add_argument("--heavy", type=int, default=60, help="cascades from the heavy session")
+    parser.add_argument("--light", default="3x4", help="light sessions x cascades each")
+    parser.add_argument("--light-delay", type=float, default=0.5, help="seconds before the light sessions start")
+    parser.add_argument("--deadline", type=float, default=5.0, help="cascade deadline in seconds")
+    parser.add_argument("--latency", default="lognormal:80:0.5", help="stub latency distribution")
+    args = parser.parse_args()
+    os.environ.update(INFERENCE_BACKENDS="huggingface", VERDICT_CACHE_SIZE="0", VERDICT_CACHE_DB="",
+                      DEDUP_INDEX_SIZE="0", WARMUP_INTERVAL="0", ROUTER_ENABLED="0")
+    for limited in (False, True):
+        run_scenario(limited, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
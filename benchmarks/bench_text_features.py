@@ -0,0 +1,92 @@
+"""Compare the old per-helper text scans with news_detector.text.analyze_text.
+
+    python benchmarks/bench_text_features.py --sizes 1 4 8
+
+For each input size (in MB of text) times what the pipeline used to do per
+article: preprocess_text, detect_language, get_word_stats and the word-level
+part of rule_based_analysis, each rescanning the text. That is compared with
+one analyze_text call, which collects a nine-script histogram on top.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from news_detector.text import analyze_text  # noqa: E402
+
+ENGLISH = ("the government said on Tuesday that according to officials the BREAKING report was "
+           "confirmed by the ministry! More at https://example.com/story?id=42 www.example.org").split()
+MIXED = ENGLISH + "پاکستان میں حکومت نے کہا۔ नमस्ते दुनिया। привет мир.".split()
+
+
+# The helpers as they were before analyze_text
+def old_preprocess_text(text):
+    text = text.strip()
+    text = re.sub(r'http\S+|www\S+', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text
+
+
+def old_detect_language(text):
+    urdu_chars = sum(1 for c in text if '\u0600' <= c <= '\u06FF')
+    return "urdu" if urdu_chars > 10 else "english"
+
+
+def old_get_word_stats(text):
+    words = text.split()
+    sentences = [s for s in re.split(r'[.!?]+', text) if s.strip()]
+    return len(words), len(sentences)
+
+
+def old_rule_word_features(text):
+    words = text.split()
+    return text.count('!'), sum(1 for w in words if w.isupper() and len(w) > 2), len(words)
+
+
+def old_pipeline(text):
+    cleaned = old_preprocess_text(text)
+    return (old_detect_language(cleaned), old_get_word_stats(text), old_rule_word_features(cleaned))
+
+
+def build_text(megabytes, vocabulary, seed=0):
+    rng = random.Random(seed)
+    words, size = [], 0
+    while size < megabytes * 1_000_000:
+        word = rng.choice(vocabulary)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def best_of(fn, text, repeat=3):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    print(f"{'input':<16} {'old scans':>10} {'analyze_text':>13} {'speed-up':>9}")
+    for name, vocabulary in (("english", ENGLISH), ("mixed-script", MIXED)):
+        for megabytes in args.sizes:
+            text = build_text(megabytes, vocabulary)
+            features = analyze_text(text)
+            language, (words, _), (exclamations, caps, _) = old_pipeline(text)
+            assert (features.language, features.exclamations, features.caps_words) == (language, exclamations, caps)
+            old = best_of(old_pipeline, text)
+            new = best_of(analyze_text, text)
+            print(f"{name + f' {megabytes:g}MB':<16} {old:>9.3f}s {new:>12.3f}s {old / new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Load-test the HTTP inference service against the stub Inference API.
+
+    python benchmarks/loadtest_service.py --requests 2000 --concurrency 64
+
+Starts the stub and `python -m news_detector serve` as subprocesses unless
+--url points at a service that is already running, then reports latency
+percentiles, throughput and status codes.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEADLINES = [
+    "According to the ministry of finance the budget deficit narrowed in the last quarter",
+    "Shocking miracle cure they don't want you to know about, share before deleted!",
+    "The supreme court adjourned the hearing until next week, a spokesperson said",
+    "Scientists baffled as banned video reveals the truth about the illuminati",
+]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else float("nan")
+
+
+def wait_for(url, timeout=15):
+    parsed = urlparse(url)
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        try:
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=1)
+            conn.request("GET", "/healthz")
+            if conn.getresponse().status < 500:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def run_load(url, n_requests, concurrency, unique, deadline_ms):
+    parsed = urlparse(url)
+    texts = [f"{random.choice(HEADLINES)} #{i}" for i in range(unique)]
+    latencies = []
+    statuses = Counter()
+
+    def worker(count):
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=60)
+        for _ in range(count):
+            body = json.dumps({"text": random.choice(texts), "deadline_ms": deadline_ms})
+            started = time.perf_counter()
+            conn.request("POST", "/v1/classify", body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status] += 1
+
+    per_worker = [n_requests // concurrency + (i < n_requests % concurrency) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, per_worker))
+    elapsed = time.perf_counter() - started
+    return latencies, statuses, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="existing service to test instead of starting one")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--unique", type=int, default=500, help="distinct texts in the request mix")
+    parser.add_argument("--deadline-ms", type=float, default=5000)
+    parser.add_argument("--stub-latency-ms", type=float, default=80)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    processes = []
+    url = args.url
+    try:
+        if url is None:
+            stub_port = args.port + 1
+            processes.append(subprocess.Popen(
+                [sys.executable, os.path.join(ROOT, "benchmarks", "stub_inference_api.py"),
+                 "--port", str(stub_port), "--latency-ms", str(args.stub_latency_ms)]))
+            env = dict(os.environ, HF_API_BASE=f"http://127.0.0.1:{stub_port}/models", RATE_LIMIT_RPS="0")
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "news_detector", "serve", "--port", str(args.port)], cwd=ROOT, env=env))
+            url = f"http://127.0.0.1:{args.port}"
+        wait_for(url)
+
+        latencies, statuses, elapsed = run_load(url, args.requests, args.concurrency, args.unique, args.deadline_ms)
+        print(f"{args.requests} requests, concurrency {args.concurrency}, {elapsed:.2f}s "
+              f"→ {args.requests / elapsed:.1f} req/s")
+        print("latency ms: " + ", ".join(
+            f"p{q} {percentile(latencies, q) * 1000:.1f}" for q in (50, 95, 99)))
+        print("statuses: " + ", ".join(f"{status}: {n}" for status, n in sorted(statuses.items())))
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Offline benchmark suite: pipeline stages and file extractors against a stub API.
+
+    python benchmarks/run_suite.py                              # writes benchmarks/results/<commit>.json
+    python benchmarks/run_suite.py --latency lognormal:80:0.6 --error-rate 0.05 --loading-rate 0.02
+    python benchmarks/run_suite.py --compare benchmarks/results/<older>.json
+
+Starts benchmarks/stub_inference_api.py in-process, points the models at it
+and turns the verdict cache, the near-duplicate index and the rate limiter
+off, so every detect_fake_news call takes the full cascade. Each case runs
+over a synthetic corpus at every --sizes word count and reports p50/p95/p99
+latency and throughput. Results are saved as JSON together with the commit,
+interpreter and stub settings. --compare prints the p50 change per case
+against an earlier run and exits with status 1 when anything is slower by
+more than --tolerance.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCHMARKS)
+
+import stub_inference_api  # noqa: E402
+
+VOCABULARY = ("the government said on tuesday that according to officials the report was confirmed by "
+              "the ministry of finance while experts say the BREAKING miracle cure is a hoax! prices "
+              "rose sharply in karachi and lahore. why? sources say more at https://example.com/a").split()
+WORDS_PER_PAGE = 500
+
+
+def make_text(words, seed):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def make_docx(text):
+    import docx
+
+    document = docx.Document()
+    words = text.split()
+    for i in range(0, len(words), 60):
+        document.add_paragraph(" ".join(words[i:i + 60]))
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def make_csv(text):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["id", "body"])
+    words = text.split()
+    for i in range(0, len(words), 40):
+        writer.writerow([i, " ".join(words[i:i + 40])])
+    return out.getvalue().encode("utf-8")
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))]
+
+
+def measure(fn, inputs):
+    latencies = []
+    started = time.perf_counter()
+    for item in inputs:
+        t = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "n": len(inputs),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "throughput_per_s": len(inputs) / elapsed,
+    }
+
+
+def build_cases():
+    # case name -> (function, make input from (words, seed)); imported late so
+    # the package sees the environment set up in main()
+    from bench_pdf_extraction import build_pdf
+    from news_detector import (current_config, detect_fake_news, parse_result, preprocess_text, rule_based_analysis,
+                               try_model)
+    from news_detector.extract import extract_csv_column, extract_docx_text, extract_pdf_text
+
+    return {
+        "preprocess_text": (preprocess_text, make_text),
+        "rule_based_analysis": (lambda text: rule_based_analysis(preprocess_text(text)), make_text),
+        "detect_fake_news": (detect_fake_news, make_text),
+        # One un-windowed request, answered in the nested or flat single-input shape
+        "try_model+parse_result": (lambda text: parse_result(try_model(current_config().models[0][0], text)), make_text),
+        "extract_pdf": (lambda data: extract_pdf_text(data, max_words=sys.maxsize),
+                        lambda words, seed: build_pdf(max(1, words // WORDS_PER_PAGE), lines_per_page=42, seed=seed)),
+        "extract_pdf_early_stop": (extract_pdf_text,
+                                   lambda words, seed: build_pdf(max(1, words // WORDS_PER_PAGE), lines_per_page=42, seed=seed)),
+        "extract_docx": (extract_docx_text, lambda words, seed: make_docx(make_text(words, seed))),
+        "extract_csv": (lambda data: extract_csv_column(data, "body"), lambda words, seed: make_csv(make_text(words, seed))),
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def compare(current, baseline_path, tolerance):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    before = {(r["case"], r["size_words"]): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\nvs {baseline_path} ({baseline['meta'].get('commit')})")
+    for result in current["results"]:
+        old = before.get((result["case"], result["size_words"]))
+        if old is None:
+            continue
+        change = result["p50_ms"] / old["p50_ms"] - 1 if old["p50_ms"] else 0.0
+        flag = ""
+        if change > tolerance:
+            flag = "  <-- slower"
+            regressions += 1
+        print(f"{result['case']:<24} {result['size_words']:>7} words  p50 {old['p50_ms']:9.2f} -> "
+              f"{result['p50_ms']:9.2f} ms ({change:+.0%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="words per document")
+    parser.add_argument("--docs", type=int, default=30, help="documents per case and size")
+    parser.add_argument("--cases", nargs="+", help="run only these cases")
+    parser.add_argument("--latency", default="lognormal:60:0.5", help="stub latency distribution")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--loading-rate", type=float, default=0.0)
+    parser.add_argument("--shape", choices=["nested", "flat", "mixed"], default="mixed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="result file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed p50 slow-down for --compare")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    stub_settings = {"latency": args.latency, "error_rate": args.error_rate,
+                     "loading_rate": args.loading_rate, "shape": args.shape}
+    server, base = stub_inference_api.start(**stub_settings)
+    os.environ.update(HF_API_BASE=base, INFERENCE_BACKENDS="huggingface", VERDICT_CACHE_SIZE="0",
+                      VERDICT_CACHE_DB="", DEDUP_INDEX_SIZE="0", RATE_LIMIT_RPS="0")
+    cases = build_cases()
+    selected = args.cases or list(cases)
+
+    commit, dirty = git_commit()
+    report = {
+        "meta": {
+            "commit": commit, "dirty": dirty, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "docs": args.docs, "sizes": args.sizes, "seed": args.seed, "stub": stub_settings,
+        },
+        "results": [],
+    }
+    print(f"{'case':<24} {'words':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'per s':>9}")
+    for name in selected:
+        fn, make_input = cases[name]
+        for words in args.sizes:
+            inputs = [make_input(words, args.seed * 100003 + i) for i in range(args.docs)]
+            fn(inputs[0])   # warm-up: imports, pools, connections
+            result = dict(case=name, size_words=words, **measure(fn, inputs))
+            report["results"].append(result)
+            print(f"{name:<24} {words:>7} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+                  f"{result['p99_ms']:>9.2f} {result['throughput_per_s']:>9.1f}", flush=True)
+    report["meta"]["stub_responses"] = dict(server.config.counts)
+    server.shutdown()
+
+    output = args.output or os.path.join(BENCHMARKS, "results", f"{commit or 'unknown'}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nsaved {output}")
+
+    if args.compare and compare(report, args.compare, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""Local stand-in for the HuggingFace Inference API.
+
+    python benchmarks/stub_inference_api.py --port 9000 --latency lognormal:80:0.5
+    HF_API_BASE=http://127.0.0.1:9000/models python -m news_detector serve
+
+Answers POST /models/<org>/<name> with text-classification predictions in the
+shapes parse_result handles: one prediction list per input when "inputs" is a
+list, and either the nested [[...]] or the flat [...] form for a single
+string. Each model gets its own label vocabulary (LABEL_1/LABEL_0, FAKE/REAL
+or NEGATIVE/POSITIVE).
+
+Latency specs (milliseconds):
+    fixed:50            always 50
+    uniform:20:200      uniform between 20 and 200
+    lognormal:80:0.5    lognormal with median 80 and sigma 0.5
+    exp:60              exponential with mean 60
+Failures: --error-rate answers 500, --loading-rate answers 503 with the
+{"error": "... is currently loading", "estimated_time": ...} body, and
+--cold-start-seconds makes every model answer 503 until that long after its
+first request, and --rate-limit answers 429 (with Retry-After) once a model
+gets more than that many requests per second.
+
+--model-latency org/name=<spec> gives one model its own latency. Texts that
+contain a "[truth:fake]" or "[truth:real]" marker get a verdict that is
+right with probability --accuracy (or org/name=<p> per model via
+--model-accuracy), for measuring how well the models' answers combine.
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LABEL_SETS = [("LABEL_1", "LABEL_0"), ("FAKE", "REAL"), ("NEGATIVE", "POSITIVE")]
+TRUTH_MARKER = re.compile(r"\[truth:(fake|real)\]")
+
+
+def parse_latency(spec):
+    # Returns a function giving one latency sample in seconds
+    kind, *args = spec.split(":")
+    args = [float(a) for a in args]
+    if kind == "fixed":
+        return lambda: args[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(args[0], args[1]) / 1000
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(args[0]), args[1]) / 1000
+    if kind == "exp":
+        return lambda: random.expovariate(1 / args[0]) / 1000
+    raise ValueError(f"unknown latency distribution: {spec}")
+
+
+def parse_model_values(specs, parse):
+    # ["org/name=value", ...] -> {"org/name": parse(value)}
+    return {model: parse(value) for model, _, value in (spec.partition("=") for spec in specs or [])}
+
+
+def predictions(text, model, accuracy=None):
+    # Deterministic per text and model so repeated runs give the same verdicts
+    digest = hashlib.blake2b(f"{model}\0{text}".encode("utf-8"), digest_size=4).digest()
+    fake = int.from_bytes(digest[:2], "big") / 0xFFFF
+    truth = TRUTH_MARKER.search(text) if accuracy is not None else None
+    if truth:
+        # Right with probability `accuracy`, more confident when right
+        right = int.from_bytes(digest[2:], "big") / 0xFFFF < accuracy
+        says_fake = (truth.group(1) == "fake") == right
+        margin = 0.5 * fake ** (0.5 if right else 1.5)
+        fake = 0.5 + margin if says_fake else 0.5 - margin
+    fake_label, real_label = LABEL_SETS[sum(model.encode("utf-8")) % len(LABEL_SETS)]
+    return [{"label": fake_label, "score": fake}, {"label": real_label, "score": 1 - fake}]
+
+
+class StubConfig:
+    def __init__(self, latency="fixed:50", error_rate=0.0, loading_rate=0.0, cold_start_seconds=0.0,
+                 shape="nested", latency_ms=None, rate_limit=0.0, model_latency=None, accuracy=None,
+                 model_accuracy=None):
+        self.sample_latency = parse_latency(f"fixed:{latency_ms}" if latency_ms is not None else latency)
+        self.model_latency = {model: parse_latency(spec) for model, spec in (model_latency or {}).items()}
+        self.accuracy = accuracy
+        self.model_accuracy = dict(model_accuracy or {})
+        self.error_rate = error_rate
+        self.loading_rate = loading_rate
+        self.cold_start_seconds = cold_start_seconds
+        self.shape = shape
+        self.rate_limit = rate_limit
+        self.buckets = {}       # model -> (tokens, updated), one second of burst
+        self.first_seen = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def allow(self, model):
+        if not self.rate_limit:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            tokens, updated = self.buckets.get(model, (self.rate_limit, now))
+            tokens = min(self.rate_limit, tokens + (now - updated) * self.rate_limit)
+            allowed = tokens >= 1
+            self.buckets[model] = (tokens - allowed, now)
+            return allowed
+
+    def record(self, model, outcome):
+        with self.lock:
+            self.first_seen.setdefault(model, time.monotonic())
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, delayed ACKs
+    # add ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+    config = StubConfig()
+
+    def log_message(self, *args):
+        pass
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on the request (a deadline passed)
+            pass
+
+    def reply(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self.reply(400, {"error": "invalid JSON"})
+        if not self.path.startswith("/models/"):
+            return self.reply(404, {"error": "Model not found"})
+        model = self.path[len("/models/"):]
+        config = self.config
+
+        if not config.allow(model):
+            config.record(model, 429)
+            return self.reply(429, {"error": "Rate limit reached"}, {"Retry-After": "1"})
+
+        warm_for = config.first_seen.get(model)
+        warm_for = 0.0 if warm_for is None else time.monotonic() - warm_for
+        if warm_for < config.cold_start_seconds or random.random() < config.loading_rate:
+            config.record(model, 503)
+            remaining = max(config.cold_start_seconds - warm_for, 1.0)
+            return self.reply(503, {"error": f"Model {model} is currently loading", "estimated_time": remaining})
+
+        time.sleep(config.model_latency.get(model, config.sample_latency)())
+        if random.random() < config.error_rate:
+            config.record(model, 500)
+            return self.reply(500, {"error": "stub failure"})
+
+        config.record(model, 200)
+        inputs = payload.get("inputs", "")
+        accuracy = config.model_accuracy.get(model, config.accuracy)
+        if isinstance(inputs, list):
+            return self.reply(200, [predictions(text, model, accuracy) for text in inputs])
+        shape = config.shape if config.shape != "mixed" else random.choice(["nested", "flat"])
+        result = predictions(inputs, model, accuracy)
+        return self.reply(200, [result] if shape == "nested" else result)
+
+
+def start(host="127.0.0.1", port=0, **config):
+    # Starts the stub on a background thread and returns (server, base_url);
+    # server.config holds the settings and per-status request counts
+    config = StubConfig(**config)
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, name="stub-inference-api", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/models"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", default="fixed:50", help="latency distribution, see above")
+    parser.add_argument("--latency-ms", type=float, help="shorthand for --latency fixed:<ms>")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--loading-rate", type=float, default=0.0)
+    parser.add_argument("--cold-start-seconds", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="requests per second per model, 0 for none")
+    parser.add_argument("--shape", choices=["nested", "flat", "mixed"], default="nested",
+                        help="response shape for single-string inputs")
+    parser.add_argument("--model-latency", action="append", metavar="ORG/NAME=SPEC",
+                        help="latency distribution for one model; repeatable")
+    parser.add_argument("--accuracy", type=float, help="chance a [truth:...] text gets the right verdict")
+    parser.add_argument("--model-accuracy", action="append", metavar="ORG/NAME=P",
+                        help="--accuracy for one model; repeatable")
+    args = parser.parse_args()
+    server, base = start(
+        args.host, args.port, latency=args.latency, latency_ms=args.latency_ms, error_rate=args.error_rate,
+        loading_rate=args.loading_rate, cold_start_seconds=args.cold_start_seconds, shape=args.shape,
+        rate_limit=args.rate_limit, model_latency=parse_model_values(args.model_latency, str),
+        accuracy=args.accuracy, model_accuracy=parse_model_values(args.model_accuracy, float),
+    )
+    print(f"stub Inference API on {base}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Fake news detection core: text cleanup, model cascade, rule fallback.
+
+Importing the package is cheap and has no side effects; HTTP clients,
+thread pools, model checkpoints and the watched detector config are created
+on first use.
+"""
+from .cascade import analyze_with_huggingface
+from .config import current_config
+from .models import parse_result, try_model
+from .pipeline import classify_chunk, detect_fake_news
+from .rules import rule_based_analysis, rule_based_batch
+from .text import TextFeatures, analyze_text, detect_language, get_word_stats, preprocess_text
+
+__all__ = [
+    "TextFeatures",
+    "analyze_text",
+    "analyze_with_huggingface",
+    "classify_chunk",
+    "current_config",
+    "detect_fake_news",
+    "detect_language",
+    "get_word_stats",
+    "parse_result",
+    "preprocess_text",
+    "rule_based_analysis",
+    "rule_based_batch",
+    "try_model",
+]
@@ -0,0 +1,29 @@
+import functools
+import threading
+
+
+def process_wide(factory):
+    # Memoizes factory(*args) for the life of the process. Streamlit re-runs the
+    # page script on every interaction, but imported modules stay loaded, so
+    # pools, clients and caches built here survive reruns and are shared by
+    # every session (what st.cache_resource did while this lived in app.py).
+    instances = {}
+    lock = threading.Lock()
+
+    @functools.wraps(factory)
+    def get(*args):
+        with lock:
+            if args not in instances:
+                instances[args] = factory(*args)
+            return instances[args]
+
+    get.reset = instances.clear
+    return get
+
+
+def report(on_progress, stage, progress, **info):
+    # Progress events are plain dicts handed to an optional callback. They are
+    # always emitted on the caller's thread, so a Streamlit script can update
+    # its widgets straight from the callback.
+    if on_progress is not None:
+        on_progress(dict(info, stage=stage, progress=progress))
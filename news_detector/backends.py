@@ -0,0 +1,251 @@
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from ._shared import process_wide
+from .config import current_config
+from .metrics import endpoint_label, metrics
+from .models import UnparseableResponse, parse_window_results, query_windows
+
+# A backend turns a list of (window_text, words) into [(fake_score, real_score)]
+# per window, None when it can't answer, or raises UnparseableResponse when
+# the answer has no usable labels (RequestShed when a rate limit turned it
+# away before sending anything). The cascade only talks to backends.
+
+INFERENCE_BACKENDS = [
+    name.strip() for name in os.environ.get("INFERENCE_BACKENDS", "local,huggingface").split(",")
+    if name.strip()
+]
+LOCAL_MODEL_PATH = os.environ.get("LOCAL_MODEL_PATH", "")   # .onnx, .pt/.ts or "stub"
+LOCAL_MAX_BATCH = int(os.environ.get("LOCAL_MAX_BATCH", "16"))
+LOCAL_MAX_WAIT_MS = float(os.environ.get("LOCAL_MAX_WAIT_MS", "10"))
+
+
+class HTTPModelBackend:
+    def __init__(self, url, name):
+        self.key = url
+        self.url = url
+        self.name = name
+        self.endpoint = endpoint_label(url)
+
+    def score_windows(self, windows, timeout, cancel=None, session=None, count_timeout=True):
+        return query_windows(self.url, windows, timeout, cancel, session, count_timeout)
+
+
+class MicroBatcher:
+    # Collects concurrent submit() calls for up to max_wait_ms or max_batch
+    # inputs and runs them through fn as a single batch on a worker thread.
+    def __init__(self, fn, max_batch=LOCAL_MAX_BATCH, max_wait_ms=LOCAL_MAX_WAIT_MS):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self.worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self.worker.start()
+
+    def submit(self, inputs):
+        future = Future()
+        self.queue.put((inputs, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            size = len(batch[0][0])
+            flush_at = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = flush_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+                size += len(batch[-1][0])
+
+            batch = [(inputs, future) for inputs, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                outputs = self.fn([text for inputs, _ in batch for text in inputs])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(outputs)
+            offset = 0
+            for inputs, future in batch:
+                future.set_result(outputs[offset:offset + len(inputs)])
+                offset += len(inputs)
+
+
+def _softmax(logits):
+    import numpy as np
+
+    logits = np.asarray(logits, dtype=np.float64)
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def _load_checkpoint_meta(path):
+    # Exported checkpoints sit next to the tokenizer.json and config.json
+    # written by `transformers` / `optimum` exports.
+    from tokenizers import Tokenizer
+
+    folder = os.path.dirname(os.path.abspath(path))
+    tokenizer = Tokenizer.from_file(os.path.join(folder, "tokenizer.json"))
+    tokenizer.enable_truncation(512)
+    tokenizer.enable_padding()
+    labels = ["LABEL_0", "LABEL_1"]
+    config_path = os.path.join(folder, "config.json")
+    if os.path.exists(config_path):
+        with open(config_path, encoding="utf-8") as f:
+            id2label = json.load(f).get("id2label") or {}
+        if id2label:
+            labels = [id2label[str(i)] for i in range(len(id2label))]
+    return tokenizer, labels
+
+
+def _predictions(probabilities, labels):
+    return [
+        [{"label": label, "score": float(p)} for label, p in zip(labels, row)]
+        for row in probabilities
+    ]
+
+
+class OnnxRunner:
+    def __init__(self, path):
+        import numpy as np
+        import onnxruntime
+
+        self.np = np
+        self.tokenizer, self.labels = _load_checkpoint_meta(path)
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = os.cpu_count() or 1
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def __call__(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": self.np.array([e.ids for e in encodings], dtype=self.np.int64),
+            "attention_mask": self.np.array([e.attention_mask for e in encodings], dtype=self.np.int64),
+            "token_type_ids": self.np.array([e.type_ids for e in encodings], dtype=self.np.int64),
+        }
+        logits = self.session.run(None, {k: v for k, v in feeds.items() if k in self.input_names})[0]
+        return _predictions(_softmax(logits), self.labels)
+
+
+class TorchScriptRunner:
+    def __init__(self, path):
+        import torch
+
+        torch.set_num_threads(os.cpu_count() or 1)
+        self.torch = torch
+        self.tokenizer, self.labels = _load_checkpoint_meta(path)
+        self.model = torch.jit.load(path, map_location="cpu").eval()
+
+    def __call__(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = self.torch.tensor([e.ids for e in encodings])
+        attention_mask = self.torch.tensor([e.attention_mask for e in encodings])
+        with self.torch.inference_mode():
+            output = self.model(input_ids, attention_mask)
+        logits = output[0] if isinstance(output, (tuple, list)) else output
+        return _predictions(_softmax(logits.numpy()), self.labels)
+
+
+class StubRunner:
+    # Tiny keyword model with the same output shape as a real checkpoint,
+    # for running the local path without model weights.
+    WEIGHTS = {"!": 0.6, "shocking": 1.0, "miracle": 1.2, "secret": 0.8, "banned": 0.8,
+               "according": -0.8, "reported": -0.6, "statement": -0.6, "study": -0.5}
+
+    def __call__(self, texts):
+        import math
+
+        predictions = []
+        for text in texts:
+            lowered = text.lower()
+            logit = sum(weight * lowered.count(token) for token, weight in self.WEIGHTS.items())
+            fake = 1 / (1 + math.exp(-max(-30.0, min(30.0, logit))))
+            predictions.append([{"label": "FAKE", "score": fake}, {"label": "REAL", "score": 1 - fake}])
+        return predictions
+
+
+def load_local_runner(path):
+    if path == "stub":
+        return StubRunner()
+    if path.endswith(".onnx"):
+        return OnnxRunner(path)
+    if path.endswith((".pt", ".ts")):
+        return TorchScriptRunner(path)
+    raise ValueError(f"Unsupported local model format: {path}")
+
+
+class LocalModelBackend:
+    def __init__(self, path, max_batch=LOCAL_MAX_BATCH, max_wait_ms=LOCAL_MAX_WAIT_MS):
+        self.key = f"local:{path}"
+        self.name = f"💻 Local CPU Model ({os.path.basename(path)})"
+        self.endpoint = "local"
+        self.path = path
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.batcher = None
+        self.error = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if self.batcher is None and self.error is None:
+                try:
+                    self.batcher = MicroBatcher(load_local_runner(self.path), self.max_batch, self.max_wait_ms)
+                except Exception as e:
+                    self.error = f"{type(e).__name__}: {e}"
+        return self.batcher
+
+    def score_windows(self, windows, timeout, cancel=None, session=None, count_timeout=True):
+        # Local inference isn't rate limited or breaker-guarded, so session and
+        # count_timeout are unused
+        batcher = self.load()
+        if batcher is None:
+            return None
+        future = batcher.submit([text for text, _ in windows])
+        try:
+            with metrics.timer("model_request_seconds", endpoint=self.endpoint):
+                result = future.result(timeout=timeout)
+        except FutureTimeout:
+            metrics.inc("model_requests_total", endpoint=self.endpoint, outcome="timeout")
+            future.cancel()
+            return None
+        except Exception:
+            metrics.inc("model_requests_total", endpoint=self.endpoint, outcome="error")
+            return None
+        scores = parse_window_results(result, len(windows))
+        metrics.inc("model_requests_total", endpoint=self.endpoint, outcome="ok" if scores is not None else "parse_failure")
+        if scores is None:
+            raise UnparseableResponse(self.key)
+        return scores
+
+
+@process_wide
+def get_local_backend(path):
+    # Loading a checkpoint is expensive; one instance per process
+    return LocalModelBackend(path)
+
+
+def get_backends(config=None):
+    # In priority order; the hosted models are the given config snapshot's
+    backends = []
+    for name in INFERENCE_BACKENDS:
+        if name == "huggingface":
+            backends.extend(HTTPModelBackend(url, label) for url, label in (config or current_config()).models)
+        elif name == "local" and LOCAL_MODEL_PATH:
+            backends.append(get_local_backend(LOCAL_MODEL_PATH))
+    return backends
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from ._shared import process_wide
+from .backends import get_backends
+from .config import current_config
+from .ensemble import ENSEMBLE_PRIOR, ENSEMBLE_WEIGHTS
+from .linear import offline_fingerprint
+from .models import CASCADE_MODE
+from .rules import RULES_VERSION
+from .windows import WINDOW_AGGREGATION, WINDOW_BUDGET, WINDOW_OVERLAP, WINDOW_SECONDS, WINDOW_WORDS
+
+VERDICT_CACHE_SIZE = int(os.environ.get("VERDICT_CACHE_SIZE", "2048"))
+VERDICT_CACHE_TTL = float(os.environ.get("VERDICT_CACHE_TTL", str(6 * 3600)))
+# Rule verdicts only exist because every model failed, so retry the models sooner
+FALLBACK_CACHE_TTL = float(os.environ.get("FALLBACK_CACHE_TTL", "300"))
+VERDICT_CACHE_DB = os.environ.get("VERDICT_CACHE_DB", "")
+
+
+def _fingerprint(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def config_fingerprints(config=None):
+    # Model verdicts depend only on the model list; offline verdicts (rules or
+    # the trained linear model) were produced because those models failed, so
+    # they depend on both. A new config version invalidates both kinds, and an
+    # edit that keeps the version only the kinds it touches.
+    config = config or current_config()
+    models = [config.version, [b.key for b in get_backends(config)],
+              WINDOW_WORDS, WINDOW_OVERLAP, WINDOW_SECONDS, WINDOW_BUDGET]
+    if CASCADE_MODE == "ensemble":
+        models += [CASCADE_MODE, ENSEMBLE_WEIGHTS, ENSEMBLE_PRIOR]
+    models_fp = _fingerprint(models)
+    rules_fp = _fingerprint([models_fp, config.fingerprint, RULES_VERSION, offline_fingerprint()])
+    return {"model": models_fp, "rules": rules_fp}
+
+
+def verdict_cache_key(cleaned, aggregation=WINDOW_AGGREGATION):
+    return hashlib.sha256(f"{aggregation}\0{cleaned}".encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    # Bounded by entry count and, when sizeof is given, by the summed
+    # sizeof(value) of its entries as well
+    def __init__(self, max_entries=1024, ttl=3600.0, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def _size(self, value):
+        return self.sizeof(value) if self.sizeof else 0
+
+    def _drop(self, key):
+        value, _ = self.data.pop(key)
+        self.bytes -= self._size(value)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, ttl=None, expires_at=None):
+        if expires_at is None:
+            expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self.lock:
+            if key in self.data:
+                self._drop(key)
+            self.data[key] = (value, expires_at)
+            self.bytes += self._size(value)
+            while len(self.data) > self.max_entries or (
+                    self.max_bytes is not None and self.bytes > self.max_bytes and len(self.data) > 1):
+                self._drop(next(iter(self.data)))
+                self.evictions += 1
+
+    def discard(self, key):
+        with self.lock:
+            if key in self.data:
+                self._drop(key)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self.lock:
+            stats = {"entries": len(self.data), "hits": self.hits, "misses": self.misses,
+                     "evictions": self.evictions, "expirations": self.expirations}
+            if self.sizeof:
+                stats["bytes"] = self.bytes
+            return stats
+
+
+class VerdictCache:
+    # Memory LRU in front of an optional SQLite table that survives restarts.
+    # Entries are (label, confidence, method, kind, fingerprint); an entry whose
+    # fingerprint no longer matches the current config for its kind is stale.
+
+    def __init__(self, max_entries=VERDICT_CACHE_SIZE, ttl=VERDICT_CACHE_TTL, db_path=VERDICT_CACHE_DB):
+        self.memory = LRUCache(max_entries, ttl)
+        self.ttl = ttl
+        self.db = None
+        self.db_lock = threading.Lock()
+        self.disk_hits = self.disk_misses = self.stale = 0
+        if db_path:
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS verdicts (
+                    key TEXT PRIMARY KEY,
+                    label TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    method TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )""")
+            self.db.execute("CREATE INDEX IF NOT EXISTS verdicts_expires ON verdicts (expires_at)")
+            self.db.commit()
+
+    def get(self, key, config=None):
+        # config: the request's DetectorConfig snapshot (the current one by default)
+        fingerprints = config_fingerprints(config)
+        entry = self.memory.get(key)
+        if entry is None and self.db is not None:
+            with self.db_lock:
+                row = self.db.execute(
+                    "SELECT label, confidence, method, kind, fingerprint, expires_at FROM verdicts "
+                    "WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone()
+            if row is None:
+                self.disk_misses += 1
+            else:
+                self.disk_hits += 1
+                entry = row[:5]
+                self.memory.put(key, entry, expires_at=row[5])
+        if entry is None:
+            return None
+        label, confidence, method, kind, fingerprint = entry
+        if fingerprints.get(kind) != fingerprint:
+            self.stale += 1
+            self.memory.discard(key)
+            return None
+        return label, confidence, method
+
+    def put(self, key, label, confidence, method, kind, ttl=None, config=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl
+        entry = (label, confidence, method, kind, config_fingerprints(config)[kind])
+        self.memory.put(key, entry, expires_at=expires_at)
+        if self.db is not None:
+            with self.db_lock:
+                self.db.execute("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                (key, *entry, expires_at))
+                self.db.commit()
+
+    def purge(self):
+        # Drop expired rows and rows written under an older model/rule config
+        self.memory.clear()
+        if self.db is None:
+            return 0
+        fingerprints = config_fingerprints()
+        with self.db_lock:
+            cursor = self.db.execute(
+                "DELETE FROM verdicts WHERE expires_at <= ? "
+                "OR (kind = 'model' AND fingerprint != ?) OR (kind = 'rules' AND fingerprint != ?)",
+                (time.time(), fingerprints["model"], fingerprints["rules"]))
+            self.db.commit()
+            return cursor.rowcount
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats.update({"disk_hits": self.disk_hits, "disk_misses": self.disk_misses,
+                      "stale": self.stale, "disk_enabled": self.db is not None})
+        return stats
+
+
+@process_wide
+def get_verdict_cache():
+    cache = VerdictCache()
+    cache.purge()
+    return cache
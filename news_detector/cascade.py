@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ._shared import process_wide, report
+from .backends import get_backends
+from .ensemble import ENSEMBLE_WEIGHTS, combine_votes, ensemble_name, fake_probability, model_weight, \
+    parse_ensemble_weights
+from .metrics import metrics
+from .limiter import RequestShed
+from .models import CASCADE_DEADLINE, CASCADE_GRACE, CASCADE_MODE, ENSEMBLE_DEADLINE, MODEL_TIMEOUT, \
+    UnparseableResponse
+from .router import get_router
+from .text import detect_language
+from .windows import WINDOW_AGGREGATION, aggregate_windows, make_windows
+
+
+# Model requests can sit in the rate limiter's queue for most of their deadline,
+# so the pool is sized for waiting threads, not for CPU (16 per model for the
+# default five, plus one spare set); threads start lazily
+MODEL_WORKERS = int(os.environ.get("MODEL_WORKERS", "96"))
+
+
+@process_wide
+def get_model_executor():
+    # Shared across reruns and sessions so concurrent users don't spawn a pool each
+    return ThreadPoolExecutor(max_workers=MODEL_WORKERS, thread_name_prefix="hf-model")
+
+
+def cascade_deadline(mode=CASCADE_MODE):
+    return ENSEMBLE_DEADLINE if mode == "ensemble" else CASCADE_DEADLINE
+
+
+def analyze_with_huggingface(text, grace=CASCADE_GRACE, deadline=None,
+                             aggregation=WINDOW_AGGREGATION, details=None, on_progress=None, language=None,
+                             session=None, mode=CASCADE_MODE, config=None):
+    # All models are queried at once. The highest-priority valid answer wins, but a
+    # lower-priority answer only has to wait `grace` seconds for the ones above it.
+    # The router sets the priority order per language from each model's recent
+    # results. Long texts are split into windows whose scores are aggregated per
+    # model. Progress moves from 0.1 to 0.9 as the models answer. session
+    # identifies the caller to the rate limiter's fair queue; config is the
+    # request's DetectorConfig snapshot (the current one by default).
+    # In "ensemble" mode every answer that arrives by the deadline (by default
+    # ENSEMBLE_DEADLINE) votes instead, each model may use the whole deadline,
+    # and details["ensemble"] lists every model's part; running out of that
+    # deadline isn't held against a model's circuit breaker.
+    ensemble = mode == "ensemble"
+    deadline = cascade_deadline(mode) if deadline is None else deadline
+    timeout = deadline if ensemble else min(MODEL_TIMEOUT, deadline)
+    started = time.monotonic()
+    end = started + deadline
+    with metrics.timer("stage_seconds", stage="windows"):
+        windows = make_windows(text)
+    word_counts = [words for _, words in windows]
+    language = language or detect_language(text)
+    router = get_router()
+    backends = router.plan(get_backends(config), language, timeout)
+    executor = get_model_executor()
+    cancel = threading.Event()
+    futures = {
+        executor.submit(backend.score_windows, windows, timeout, cancel, session, count_timeout=not ensemble): i
+        for i, backend in enumerate(backends)
+    }
+    step = 0.8 / max(len(backends), 1)
+    for backend in backends:
+        report(on_progress, "model_started", 0.1, model=backend.name, windows=len(windows))
+    pending = set(futures)
+    parsed = [None] * len(backends)
+    window_scores = [None] * len(backends)
+    answered_at = [None] * len(backends)
+    best = None
+    first_valid_at = None
+
+    try:
+        while pending:
+            if not ensemble and best is not None and all(parsed[i] is not None for i in range(best)):
+                break
+            wait_until = end if ensemble or first_valid_at is None else min(end, first_valid_at + grace)
+            remaining = wait_until - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = futures[future]
+                try:
+                    window_scores[i] = future.result()
+                    outcome = "ok" if window_scores[i] is not None else "error"
+                except UnparseableResponse:
+                    outcome = "parse_failure"
+                except RequestShed:
+                    # Turned away by our own rate limiter; says nothing about the model
+                    outcome = None
+                except Exception as e:
+                    # A backend bug or runtime error (local ONNX/torch) counts as
+                    # that model failing; the others and the fallback carry on
+                    outcome = "error"
+                    metrics.inc("model_requests_total", endpoint=backends[i].endpoint, outcome=type(e).__name__)
+                if outcome is not None:
+                    router.record(backends[i], language, outcome, time.monotonic() - started)
+                parsed[i] = (None, None)
+                if window_scores[i] is not None:
+                    parsed[i] = aggregate_windows(window_scores[i], word_counts, aggregation)
+                answered_at[i] = time.monotonic() - started
+                answered = sum(p is not None for p in parsed)
+                report(on_progress, "model_finished" if parsed[i][0] else "model_failed", 0.1 + step * answered,
+                       model=backends[i].name, elapsed=time.monotonic() - started)
+                if parsed[i][0] and (best is None or i < best):
+                    best = i
+                    if first_valid_at is None:
+                        first_valid_at = time.monotonic()
+    finally:
+        # Drop requests nobody is waiting for any more and stop their retries
+        cancel.set()
+        for future in pending:
+            future.cancel()
+            report(on_progress, "model_skipped", 0.9, model=backends[futures[future]].name)
+
+    if details is not None and best is not None:
+        details["aggregation"] = aggregation
+        details["windows"] = [
+            {"window": n + 1, "words": words, "fake": fake, "real": real, "text": window_text[:160]}
+            for n, ((window_text, words), (fake, real)) in enumerate(zip(windows, window_scores[best]))
+        ]
+
+    metrics.observe("stage_seconds", time.monotonic() - started, stage="cascade")
+    if ensemble:
+        return _ensemble_verdict(backends, parsed, answered_at, details)
+    if best is None:
+        return None, None, None
+    metrics.inc("cascade_wins_total", position=best, backend=backends[best].endpoint)
+    label, confidence = parsed[best]
+    return label, confidence, backends[best].name
+
+
+def _ensemble_verdict(backends, parsed, answered_at, details):
+    # Late answers were cancelled above and simply don't vote
+    weights = parse_ensemble_weights(ENSEMBLE_WEIGHTS)
+    votes, voters, rows = [], [], []
+    for backend, result, seconds in zip(backends, parsed, answered_at):
+        weight, temperature = model_weight(backend, weights)
+        status = "late" if result is None else "voted" if result[0] else "failed"
+        metrics.inc("ensemble_votes_total", backend=backend.endpoint, status=status)
+        rows.append({"model": backend.name, "status": status, "label": result[0] if result else None,
+                     "confidence": result[1] if result else None, "weight": weight, "seconds": seconds})
+        if status == "voted":
+            votes.append((fake_probability(*result), weight, temperature))
+            voters.append(backend)
+    if details is not None:
+        details["ensemble"] = rows
+    if not votes:
+        return None, None, None
+    label, confidence = combine_votes(votes)
+    if label is None:
+        return None, None, None
+    return label, confidence, ensemble_name(voters, len(backends))
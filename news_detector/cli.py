@@ -0,0 +1,293 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from .config import current_config
+from .linear import LINEAR_HASH_BITS, parse_label, train_linear
+from .metrics import metrics
+from .pipeline import BATCH_WORKERS, classify_chunk
+from .service import SERVICE_DEADLINE_MS, SERVICE_MAX_BATCH, SERVICE_MAX_WAIT_MS, SERVICE_QUEUE_SIZE
+from .text import preprocess_text
+from .windows import WINDOW_AGGREGATION, WINDOW_AGGREGATIONS
+
+
+# ─────────────────────────────────────────────
+# Input / Output
+# ─────────────────────────────────────────────
+
+def open_input(path):
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", errors="replace", newline="")
+    return open(path, encoding="utf-8", errors="replace", newline="")
+
+
+def detect_format(path, requested):
+    if requested != "auto":
+        return requested
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def read_records(stream, fmt, text_field, skipped=None):
+    # Yields (record, text) one at a time so input size never matters. JSONL
+    # lines that aren't an object or a string, or whose text isn't a string,
+    # are reported on stderr and counted in `skipped` instead.
+    if fmt == "csv":
+        csv.field_size_limit(sys.maxsize)
+        for record in csv.DictReader(stream):
+            yield record, record.get(text_field) or ""
+        return
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            problem = f"not JSON ({e})"
+        else:
+            if isinstance(record, str):
+                record = {text_field: record}
+            if not isinstance(record, dict):
+                problem = f"a JSON {type(record).__name__}, not an object or a string"
+            elif not isinstance(record.get(text_field) or "", str):
+                problem = f"'{text_field}' is not a string"
+            else:
+                yield record, record.get(text_field) or ""
+                continue
+        print(f"line {number}: skipped, {problem}", file=sys.stderr)
+        if skipped is not None:
+            skipped["records"] += 1
+
+
+def chunked(records, size):
+    chunk = []
+    for item in records:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ResultWriter:
+    def __init__(self, stream, fmt):
+        self.stream = stream
+        self.fmt = fmt
+        self.csv_writer = None
+
+    def write(self, record, label, confidence, method, config_version):
+        row = dict(record, verdict=label, verdict_confidence=round(confidence, 4), verdict_method=method,
+                   verdict_config=config_version)
+        if self.fmt == "csv":
+            if self.csv_writer is None:
+                self.csv_writer = csv.DictWriter(self.stream, fieldnames=list(row), extrasaction="ignore")
+                self.csv_writer.writeheader()
+            self.csv_writer.writerow(row)
+        else:
+            self.stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+# ─────────────────────────────────────────────
+# Workers
+# ─────────────────────────────────────────────
+
+def classify_texts(texts, aggregation, use_models, row_executor=None):
+    # Runs in worker processes too, where row_executor is None and each process
+    # builds its own clients and pools (and watches the config) lazily.
+    config = current_config()
+    verdicts = [None] * len(texts)
+    for i, label, confidence, method in classify_chunk(texts, aggregation, row_executor, use_models, config=config):
+        verdicts[i] = (label, confidence, method, config.version)
+    return verdicts
+
+
+def run(records, writer, workers, executor_kind, chunk_size, aggregation, use_models):
+    # Keeps at most 2 * workers chunks in flight and writes each chunk as soon
+    # as it finishes, so memory stays bounded for inputs of any length. A chunk
+    # that raises is reported on stderr and its records counted as "failed";
+    # the rest of the run carries on.
+    counts = Counter()
+    in_flight = {}
+    if executor_kind == "process":
+        pool, row_executor = ProcessPoolExecutor(max_workers=workers), None
+    else:
+        # Chunk threads mostly wait; the rows' model calls share `workers` threads
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cli-chunk")
+        row_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cli-row")
+    with pool:
+        chunks = enumerate(chunked(records, chunk_size))
+
+        def fill():
+            while len(in_flight) < 2 * workers:
+                number, chunk = next(chunks, (None, None))
+                if chunk is None:
+                    return
+                texts = [text for _, text in chunk]
+                future = pool.submit(classify_texts, texts, aggregation, use_models, row_executor)
+                in_flight[future] = number, chunk
+
+        fill()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                number, chunk = in_flight.pop(future)
+                try:
+                    verdicts = future.result()
+                except Exception as e:
+                    first = number * chunk_size + 1
+                    print(f"records {first}-{first + len(chunk) - 1}: not classified, {type(e).__name__}: {e}",
+                          file=sys.stderr)
+                    counts["failed"] += len(chunk)
+                    continue
+                for (record, _), (label, confidence, method, version) in zip(chunk, verdicts):
+                    writer.write(record, label, confidence, method, version)
+                    counts[label] += 1
+                writer.stream.flush()
+            fill()
+    if row_executor is not None:
+        row_executor.shutdown()
+    return counts
+
+
+# ─────────────────────────────────────────────
+# Entry Point
+# ─────────────────────────────────────────────
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m news_detector", description="Headless fake news detection.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    classify = commands.add_parser("classify", help="Classify JSONL or CSV records from a file or stdin.")
+    classify.add_argument("input", nargs="?", default="-", help="input file, or - for stdin (default)")
+    classify.add_argument("-o", "--output", default="-", help="output file, or - for stdout (default)")
+    classify.add_argument("--format", choices=["auto", "jsonl", "csv"], default="auto",
+                          help="input format; auto picks csv for *.csv and jsonl otherwise")
+    classify.add_argument("--output-format", choices=["jsonl", "csv"], default=None,
+                          help="output format (defaults to the input format)")
+    classify.add_argument("--text-field", default="text", help="field/column holding the article text")
+    classify.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    classify.add_argument("--executor", choices=["thread", "process"], default="thread",
+                          help="thread for model-bound runs, process for CPU-bound offline runs")
+    classify.add_argument("--chunk-size", type=int, default=64, help="records handed to a worker at once")
+    classify.add_argument("--aggregation", choices=list(WINDOW_AGGREGATIONS), default=WINDOW_AGGREGATION)
+    classify.add_argument("--offline", action="store_true",
+                          help="skip the models and use the offline engine: the trained n-gram model at "
+                               "LINEAR_MODEL_PATH if set, else the rules")
+    classify.add_argument("--metrics-file", help="write Prometheus-format stage and model metrics here when done "
+                                                 "(thread executor only; process workers keep their own)")
+
+    train = commands.add_parser("train-linear", help="Train the offline hashed n-gram model from labeled records.")
+    train.add_argument("input", nargs="?", default="-", help="input file, or - for stdin (default)")
+    train.add_argument("-o", "--output", default="linear_model.bin", help="model file to write")
+    train.add_argument("--format", choices=["auto", "jsonl", "csv"], default="auto",
+                       help="input format; auto picks csv for *.csv and jsonl otherwise")
+    train.add_argument("--text-field", default="text", help="field/column holding the article text")
+    train.add_argument("--label-field", default="label", help="field/column holding FAKE/REAL (or 1/0)")
+    train.add_argument("--hash-bits", type=int, default=LINEAR_HASH_BITS, help="log2 of the hashed feature count")
+    train.add_argument("--epochs", type=int, default=5)
+    train.add_argument("--learning-rate", type=float, default=0.1, help="Adagrad step size")
+    train.add_argument("--holdout", type=float, default=0.1, help="share of records kept aside for evaluation")
+    train.add_argument("--seed", type=int, default=0)
+
+    serve = commands.add_parser("serve", help="Run the HTTP inference service.")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--max-batch", type=int, default=SERVICE_MAX_BATCH, help="texts per micro-batch")
+    serve.add_argument("--max-wait-ms", type=float, default=SERVICE_MAX_WAIT_MS,
+                       help="how long a micro-batch waits to fill up")
+    serve.add_argument("--queue-size", type=int, default=SERVICE_QUEUE_SIZE,
+                       help="queued texts before requests are rejected with 429")
+    serve.add_argument("--deadline-ms", type=float, default=SERVICE_DEADLINE_MS, help="default request deadline")
+    serve.add_argument("--workers", type=int, default=BATCH_WORKERS, help="concurrent model cascades")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "serve":
+        return run_service(args)
+    if args.command == "train-linear":
+        return run_train(args)
+    return run_classify(args)
+
+
+def run_service(args):
+    import asyncio
+
+    from .service import serve
+
+    try:
+        asyncio.run(serve(
+            args.host, args.port, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+            queue_size=args.queue_size, deadline_ms=args.deadline_ms, workers=args.workers,
+        ))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def run_train(args):
+    texts, labels, skipped = [], [], 0
+    with open_input(args.input) as source:
+        for record, text in read_records(source, detect_format(args.input, args.format), args.text_field):
+            label = parse_label(record.get(args.label_field))
+            if label is None or not text.strip():
+                skipped += 1
+                continue
+            texts.append(preprocess_text(text))
+            labels.append(label)
+    if not texts:
+        print(f"no labeled records (skipped {skipped})", file=sys.stderr)
+        return 1
+
+    def on_epoch(epoch, accuracy, loss):
+        scores = f"holdout accuracy {accuracy:.4f}, log loss {loss:.4f}" if accuracy is not None else "no holdout"
+        print(f"epoch {epoch}/{args.epochs}: {scores}", file=sys.stderr)
+
+    started = time.perf_counter()
+    header = train_linear(texts, labels, args.output, hash_bits=args.hash_bits, epochs=max(1, args.epochs),
+                          learning_rate=args.learning_rate, holdout=args.holdout, seed=args.seed, on_epoch=on_epoch)
+    fake = sum(labels)
+    print(f"trained on {header['trained_on']} records ({fake} fake, {len(labels) - fake} real, {skipped} skipped) "
+          f"in {time.perf_counter() - started:.2f}s; wrote {args.output} ({header['size'] * 4 / 2**20:.1f} MB, "
+          f"fingerprint {header['fingerprint']}). Set LINEAR_MODEL_PATH to use it.", file=sys.stderr)
+    return 0
+
+
+def run_classify(args):
+    fmt = detect_format(args.input, args.format)
+    output_format = args.output_format or fmt
+    started = time.perf_counter()
+    skipped = Counter()
+    with open_input(args.input) as source:
+        output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+        try:
+            writer = ResultWriter(output, output_format)
+            counts = run(
+                read_records(source, fmt, args.text_field, skipped), writer, max(1, args.workers), args.executor,
+                max(1, args.chunk_size), args.aggregation, not args.offline,
+            )
+        finally:
+            if output is not sys.stdout:
+                output.close()
+    if args.metrics_file:
+        metrics.write_prometheus(args.metrics_file)
+
+    elapsed = time.perf_counter() - started
+    failed = counts.pop("failed", 0)
+    total = sum(counts.values())
+    print(
+        f"classified {total} records in {elapsed:.2f}s ({total / max(elapsed, 1e-9):.1f} records/s) — "
+        + ", ".join(f"{label}: {n}" for label, n in sorted(counts.items()))
+        + (f"; skipped {skipped['records']} bad records" if skipped["records"] else "")
+        + (f"; {failed} records failed" if failed else ""),
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
@@ -0,0 +1,295 @@
+import random
+import threading
+import time
+
+from ._shared import process_wide
+from .limiter import RateLimiter, RequestShed
+from .metrics import endpoint_label, metrics
+
+
+class CircuitBreaker:
+    # closed: requests flow; open: endpoint is skipped until reset_timeout passes;
+    # half-open: a single probe request decides whether to close or re-open.
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failure_threshold=3, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self.probe_in_flight:
+                    return False
+                self.probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probe_in_flight = False
+
+    def release(self):
+        # The request ended without saying anything about the endpoint's health
+        # (a model still loading); only frees the half-open probe slot
+        with self.lock:
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self.lock:
+            retry_in = 0.0
+            if self.state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            return {"state": self.state, "failures": self.failures, "retry_in": round(retry_in, 1)}
+
+
+class RetryBudget:
+    # Every request deposits `ratio` tokens and every retry spends one, so retries
+    # can never add more than ~ratio extra load on top of normal traffic.
+    def __init__(self, ratio=0.2, min_tokens=5.0, max_tokens=20.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+        self.lock = threading.Lock()
+
+    def deposit(self):
+        with self.lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self.lock:
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+
+class InferenceClient:
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, pool_size=32, max_retries=2, backoff=0.25,
+                 failure_threshold=3, reset_timeout=60.0, loading_poll=2.0):
+        # requests is only needed once something actually calls a model
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.requests = requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        self.adapter = adapter
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.loading_poll = loading_poll
+        self.budget = RetryBudget()
+        self.limiter = RateLimiter()
+        self.breakers = {}
+        self.loading_until = {}    # url -> monotonic time the API expects the model to be ready
+        self.last_success = {}     # url -> monotonic time of the last 200
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "retries": 0, "failures": 0,
+                         "short_circuited": 0, "budget_exhausted": 0,
+                         "loading_waits": 0, "loading_skipped": 0}
+
+    def breaker(self, url):
+        with self.lock:
+            if url not in self.breakers:
+                self.breakers[url] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[url]
+
+    def count(self, key):
+        with self.lock:
+            self.counters[key] += 1
+
+    def idle_for(self, url):
+        # Seconds since the endpoint last answered 200 (inf if it never has)
+        with self.lock:
+            last = self.last_success.get(url)
+        return float("inf") if last is None else time.monotonic() - last
+
+    def loading_estimate(self, response):
+        # Seconds until the model is loaded for an Inference API "currently
+        # loading" 503, None for any other response
+        if response.status_code != 503:
+            return None
+        try:
+            body = response.json()
+        except ValueError:
+            return None
+        if not isinstance(body, dict) or "estimated_time" not in body:
+            return None
+        try:
+            return max(0.0, float(body["estimated_time"]))
+        except (TypeError, ValueError):
+            return None
+
+    def retry_after(self, response, default=1.0):
+        try:
+            return max(0.0, float(response.headers.get("Retry-After", default)))
+        except (TypeError, ValueError):
+            return default
+
+    def skip_loading(self, endpoint, ready_at, deadline):
+        # A cold model is only worth waiting for if it should be ready within
+        # the request's own budget; otherwise the cascade moves on at once
+        if ready_at < deadline:
+            return False
+        self.count("loading_skipped")
+        metrics.inc("model_loading_total", endpoint=endpoint, decision="moved_on")
+        return True
+
+    def post(self, url, payload, timeout, cancel=None, session=None, count_timeout=True):
+        # Raises RequestShed if the rate limiter can't fit the first attempt into
+        # `timeout`; session is the caller's fair-queueing identity. Callers whose
+        # timeout is a deliberately short deadline (ensemble mode) pass
+        # count_timeout=False so running out of it doesn't count against the
+        # endpoint's breaker.
+        endpoint = endpoint_label(url)
+        with self.lock:
+            ready_at = self.loading_until.get(url)
+        if ready_at is not None and self.skip_loading(endpoint, ready_at, time.monotonic() + timeout):
+            return None
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            self.count("short_circuited")
+            metrics.inc("model_requests_total", endpoint=endpoint, outcome="short_circuited")
+            return None
+        with metrics.timer("model_request_seconds", endpoint=endpoint):
+            return self._post(url, endpoint, breaker, payload, timeout, cancel, session, count_timeout)
+
+    def _post(self, url, endpoint, breaker, payload, timeout, cancel, session, count_timeout):
+        self.budget.deposit()
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            # Time spent queued for a token counts against the request's deadline
+            if not self.limiter.acquire(url, session, deadline, cancel):
+                if attempt == 0:
+                    breaker.release()
+                    raise RequestShed(url)
+                break
+            self.count("requests")
+            retryable = True
+            try:
+                response = self.session.post(url, json=payload, timeout=max(0.1, deadline - time.monotonic()))
+                outcome = str(response.status_code)
+                if response.status_code == 200:
+                    result = response.json()
+                    metrics.inc("model_requests_total", endpoint=endpoint, outcome=outcome)
+                    breaker.record_success()
+                    with self.lock:
+                        self.loading_until.pop(url, None)
+                        self.last_success[url] = time.monotonic()
+                    return result
+                loading = self.loading_estimate(response)
+                if loading is not None:
+                    # Not a failure: wait for the model (polling, without
+                    # spending retries) if the budget allows, else give up now
+                    metrics.inc("model_requests_total", endpoint=endpoint, outcome="loading")
+                    ready_at = time.monotonic() + loading
+                    with self.lock:
+                        self.loading_until[url] = ready_at
+                    if self.skip_loading(endpoint, ready_at, deadline):
+                        breaker.release()
+                        return None
+                    self.count("loading_waits")
+                    metrics.inc("model_loading_total", endpoint=endpoint, decision="waited")
+                    pause = min(max(loading, 0.1), self.loading_poll)
+                    if cancel is not None:
+                        if cancel.wait(pause):
+                            breaker.release()
+                            return None
+                    else:
+                        time.sleep(pause)
+                    continue
+                if response.status_code == 429:
+                    self.limiter.throttle(url, self.retry_after(response))
+                retryable = response.status_code in self.RETRY_STATUSES
+            except self.requests.Timeout:
+                outcome = "timeout"
+            except self.requests.JSONDecodeError:
+                # 200 with a body that isn't JSON (an HTML error page); asking
+                # again gets the same page. Checked before RequestException,
+                # which it subclasses.
+                outcome = "invalid_json"
+                retryable = False
+            except self.requests.RequestException:
+                outcome = "error"
+            metrics.inc("model_requests_total", endpoint=endpoint, outcome=outcome)
+
+            attempt += 1
+            delay = random.uniform(0, self.backoff * (2 ** attempt))
+            if (not retryable or attempt > self.max_retries
+                    or (cancel is not None and cancel.is_set())
+                    or time.monotonic() + delay >= deadline):
+                break
+            if not self.budget.withdraw():
+                self.count("budget_exhausted")
+                break
+            self.count("retries")
+            if cancel is not None:
+                if cancel.wait(delay):
+                    break
+            else:
+                time.sleep(delay)
+
+        if outcome == "timeout" and not count_timeout:
+            # Slower than the caller's deadline says nothing about the model being down
+            breaker.release()
+            return None
+        self.count("failures")
+        breaker.record_failure()
+        return None
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+            breakers = {url: b.snapshot() for url, b in self.breakers.items()}
+        pools = []
+        for key in list(self.adapter.poolmanager.pools.keys()):
+            pool = self.adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            idle = [conn for conn in list(pool.pool.queue) if conn is not None] if pool.pool else []
+            pools.append({
+                "host": pool.host,
+                "idle_connections": len(idle),
+                "connections_opened": pool.num_connections,
+                "requests_sent": pool.num_requests,
+            })
+        counters["retry_tokens"] = round(self.budget.tokens, 2)
+        now = time.monotonic()
+        with self.lock:
+            loading = {url: round(ready_at - now, 1) for url, ready_at in self.loading_until.items() if ready_at > now}
+        return {"counters": counters, "breakers": breakers, "pools": pools, "loading": loading,
+                "rate_limits": self.limiter.stats()}
+
+
+@process_wide
+def get_inference_client():
+    # One pooled client per process: keep-alive connections and breaker state
+    # survive Streamlit reruns and are shared by every session.
+    return InferenceClient()
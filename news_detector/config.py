@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import warnings
+
+from ._shared import process_wide
+from .matcher import compile_phrases
+from .metrics import metrics
+from .models import HF_API_BASE
+
+# Indicator phrases, rule weights and model endpoints; edits to the file are
+# picked up by running processes within CONFIG_POLL seconds (0 reads it once)
+DETECTOR_CONFIG = os.environ.get(
+    "DETECTOR_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "detector_config.json"))
+CONFIG_POLL = float(os.environ.get("CONFIG_POLL", "5"))
+RULE_WEIGHT_KEYS = ("fake_phrase", "exclamation", "caps_word", "real_phrase", "score_cap")
+
+
+def _phrases(data, key):
+    phrases = data[key]
+    if not isinstance(phrases, list) or not all(isinstance(p, str) for p in phrases):
+        raise ValueError(f"{key} must be a list of strings")
+    return tuple(p.lower() for p in phrases if p.strip())
+
+
+class DetectorConfig:
+    # One version of the config and everything compiled from it. Never changed
+    # once built: a request takes current_config() once and uses that snapshot
+    # to the end, whatever reloads happen meanwhile.
+
+    def __init__(self, data, api_base=HF_API_BASE):
+        self.version = str(data["version"])
+        self.fake_indicators = _phrases(data, "fake_indicators")
+        self.real_indicators = _phrases(data, "real_indicators")
+        self.rule_weights = {key: float(data["rule_weights"][key]) for key in RULE_WEIGHT_KEYS}
+        # Model endpoints are relative to HF_API_BASE unless given as full URLs
+        self.models = tuple(
+            (endpoint if "://" in endpoint else f"{api_base}/{endpoint.strip('/')}", name)
+            for endpoint, name in data["models"]
+        )
+        self.fingerprint = hashlib.sha256(json.dumps(
+            [self.version, self.fake_indicators, self.real_indicators, self.rule_weights, self.models],
+            sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self.matcher = compile_phrases({"fake": self.fake_indicators, "real": self.real_indicators})
+
+    def __repr__(self):
+        return (f"DetectorConfig(version={self.version!r}, fingerprint={self.fingerprint}, "
+                f"phrases={len(self.fake_indicators)}+{len(self.real_indicators)}, models={len(self.models)})")
+
+
+def load_config(path, api_base=HF_API_BASE):
+    with open(path, encoding="utf-8") as f:
+        return DetectorConfig(json.load(f), api_base)
+
+
+class ConfigStore:
+    # Holds the current DetectorConfig. With poll > 0 a daemon thread checks
+    # the file's mtime and size every `poll` seconds; a changed file is parsed
+    # and compiled on that thread and swapped in with a single assignment, so
+    # requests never wait for a reload. A file that fails to load is reported
+    # and the running version stays until the file changes again.
+
+    def __init__(self, path=DETECTOR_CONFIG, poll=CONFIG_POLL, api_base=HF_API_BASE):
+        self.path = path
+        self.poll = poll
+        self.api_base = api_base
+        self.stamp = self._stamp()
+        # A broken file at start-up is a deployment error, so it raises here
+        self.config = load_config(path, api_base)
+        self.loaded_at = time.time()
+        self.reloads = self.failures = 0
+        self.error = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+
+    def start(self):
+        if self.poll > 0:
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    def _stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _run(self):
+        while not self.stopped.wait(self.poll):
+            stamp = self._stamp()
+            if stamp is not None and stamp != self.stamp:
+                self.reload(stamp)
+
+    def reload(self, stamp=None):
+        # True if a new config was swapped in; also the way to apply a changed
+        # api_base (benchmarks pointing the models at a stub)
+        with self.lock:
+            stamp = stamp or self._stamp()
+            try:
+                config = load_config(self.path, self.api_base)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                self.stamp = stamp
+                self.failures += 1
+                self.error = f"{type(e).__name__}: {e}"
+                metrics.inc("config_reloads_total", outcome="failed")
+                warnings.warn(f"Config {self.path} not reloaded, keeping version {self.config.version}: {self.error}")
+                return False
+            self.stamp = stamp
+            self.config = config
+            self.loaded_at = time.time()
+            self.reloads += 1
+            self.error = None
+            metrics.inc("config_reloads_total", outcome="ok")
+            return True
+
+    def snapshot(self):
+        config = self.config
+        return {"path": self.path, "version": config.version, "fingerprint": config.fingerprint,
+                "loaded_at": self.loaded_at, "reloads": self.reloads, "failures": self.failures,
+                "error": self.error, "watching": self.thread.is_alive()}
+
+
+@process_wide
+def get_config_store():
+    # Loaded and watched from first use; one per process
+    return ConfigStore().start()
+
+
+def current_config():
+    return get_config_store().config
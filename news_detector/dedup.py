@@ -0,0 +1,282 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import warnings
+import zlib
+from collections import OrderedDict
+from itertools import islice
+
+from ._shared import process_wide
+from .cache import VERDICT_CACHE_TTL, config_fingerprints
+from .extract import EXTRACT_MAX_WORDS
+from .metrics import metrics
+
+DEDUP_INDEX_SIZE = int(os.environ.get("DEDUP_INDEX_SIZE", "50000"))   # articles kept; 0 turns the index off
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", "0.8"))     # estimated Jaccard of word shingles
+DEDUP_INDEX_DB = os.environ.get("DEDUP_INDEX_DB", "dedup_index.db")    # empty keeps the index in memory
+DEDUP_TTL = float(os.environ.get("DEDUP_TTL", str(VERDICT_CACHE_TTL)))
+DEDUP_PERMUTATIONS = 128
+DEDUP_SHINGLE_WORDS = 3
+# Below this a one-word edit ("is" -> "is not") is a large share of the
+# shingles, and short claims are rarely syndicated anyway
+DEDUP_MIN_WORDS = 40
+DEDUP_BUCKET_LIMIT = 64      # newest articles kept per LSH bucket, so boilerplate can't make lookups linear
+DEDUP_EXCERPT_CHARS = 160
+# Bump when shingling or hashing changes; persisted signatures from another
+# scheme are dropped on load
+DEDUP_SCHEME = f"minhash-crc32-v1-{DEDUP_PERMUTATIONS}x{DEDUP_SHINGLE_WORDS}"
+
+PRIME = (1 << 32) - 5        # largest prime below 2**32; a * h + b stays inside uint64
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def lsh_bands(threshold, permutations=DEDUP_PERMUTATIONS, recall=0.99):
+    # (bands, rows) with the most rows per band, i.e. the fewest spurious
+    # candidates, that still makes a pair at the threshold a candidate with
+    # probability `recall`. Candidates are checked against the full signature.
+    for rows in range(permutations, 0, -1):
+        bands = permutations // rows
+        if 1 - (1 - threshold ** rows) ** bands >= recall:
+            return bands, rows
+    return permutations, 1
+
+
+class DuplicateIndex:
+    # MinHash signatures of analysed articles, bucketed by LSH band so a lookup
+    # touches a handful of candidates however many articles are stored. Entries
+    # are evicted least recently matched first, expire after `ttl`, and only
+    # match while their model fingerprint is current (see cache.config_fingerprints).
+
+    def __init__(self, max_entries=DEDUP_INDEX_SIZE, threshold=DEDUP_THRESHOLD, db_path=DEDUP_INDEX_DB,
+                 ttl=DEDUP_TTL, permutations=DEDUP_PERMUTATIONS, shingle_words=DEDUP_SHINGLE_WORDS):
+        import numpy as np
+
+        self.np = np
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        self.permutations = permutations
+        self.shingle_words = shingle_words
+        self.bands, self.rows = lsh_bands(threshold, permutations)
+        # Fixed seed: signatures saved by one process must compare with the next one's
+        rng = np.random.default_rng(20240601)
+        self.a = rng.integers(1, PRIME, permutations, dtype=np.uint64)
+        self.b = rng.integers(0, PRIME, permutations, dtype=np.uint64)
+        self.entries = OrderedDict()     # id -> (signature bytes, verdict, source, fingerprint, expires_at)
+        self.buckets = [{} for _ in range(self.bands)]   # band hash -> id, or a list of ids once shared
+        # Ids of entries that never reached the database count down from -1,
+        # clear of the positive ids SQLite assigns
+        self.next_id = -1
+        self.lock = threading.Lock()
+        self.lookups = self.hits = self.candidates = self.evictions = self.disk_errors = 0
+        self.db = None
+        if db_path:
+            try:
+                self._open(db_path)
+            except sqlite3.Error as e:
+                warnings.warn(f"Near-duplicate index {db_path} unavailable, keeping it in memory: {e}")
+                self.db = None
+                self.entries.clear()
+                self.buckets = [{} for _ in range(self.bands)]
+
+    def _open(self, db_path):
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        # Several processes (CLI workers, app replicas) may share the file
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS near_duplicates (
+                id INTEGER PRIMARY KEY,
+                scheme TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                label TEXT NOT NULL,
+                confidence REAL NOT NULL,
+                method TEXT NOT NULL,
+                source_key TEXT NOT NULL,
+                excerpt TEXT NOT NULL,
+                analysed_at REAL NOT NULL,
+                fingerprint TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )""")
+        self.db.commit()
+        self._load()
+
+    # ── Signatures ──
+
+    def signature(self, text):
+        # MinHash over word shingles of preprocessed text; None for short texts.
+        # Only the first EXTRACT_MAX_WORDS words count: the classifier never
+        # reads further, and the shingle matrix stays a few MB for any input.
+        np = self.np
+        words = [match.group().lower() for match in islice(WORD_PATTERN.finditer(text), EXTRACT_MAX_WORDS)]
+        if len(words) < DEDUP_MIN_WORDS:
+            return None
+        k = self.shingle_words
+        shingles = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((np.outer(hashes, self.a) + self.b) % PRIME).min(axis=0).astype(np.uint32).tobytes()
+
+    def _band_keys(self, signature):
+        step = 4 * self.rows
+        return [hash(signature[band * step:(band + 1) * step]) for band in range(self.bands)]
+
+    # ── Index ──
+
+    def _insert(self, entry_id, entry):
+        self.entries[entry_id] = entry
+        for bucket, key in zip(self.buckets, self._band_keys(entry[0])):
+            ids = bucket.get(key)
+            if ids is None:
+                bucket[key] = entry_id
+            elif isinstance(ids, int):
+                bucket[key] = [ids, entry_id]
+            else:
+                ids.append(entry_id)
+                if len(ids) > DEDUP_BUCKET_LIMIT:
+                    del ids[0]
+
+    def _remove(self, entry_id):
+        signature = self.entries.pop(entry_id)[0]
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            ids = bucket.get(key)
+            if ids == entry_id:
+                del bucket[key]
+            elif isinstance(ids, list) and entry_id in ids:
+                ids.remove(entry_id)
+                if len(ids) == 1:
+                    bucket[key] = ids[0]
+        return entry_id
+
+    def lookup(self, signature, config=None):
+        # Best stored match at or above the threshold as a dict with the
+        # verdict, the similarity and a reference to the source article;
+        # config is the request's DetectorConfig snapshot (current by default)
+        if signature is None:
+            return None
+        np = self.np
+        query = np.frombuffer(signature, dtype=np.uint32)
+        fingerprint = config_fingerprints(config)["model"]
+        now = time.time()
+        with self.lock:
+            self.lookups += 1
+            candidates = set()
+            for bucket, key in zip(self.buckets, self._band_keys(signature)):
+                ids = bucket.get(key)
+                if isinstance(ids, int):
+                    candidates.add(ids)
+                elif ids:
+                    candidates.update(ids)
+            self.candidates += len(candidates)
+            best, best_similarity, expired = None, 0.0, []
+            for entry_id in candidates:
+                stored, verdict, source, entry_fingerprint, expires_at = self.entries[entry_id]
+                if expires_at <= now or entry_fingerprint != fingerprint:
+                    expired.append(entry_id)
+                    continue
+                similarity = int(np.count_nonzero(np.frombuffer(stored, dtype=np.uint32) == query)) / self.permutations
+                if similarity >= self.threshold and similarity > best_similarity:
+                    best, best_similarity = entry_id, similarity
+            if expired:
+                for entry_id in expired:
+                    self._remove(entry_id)
+                self._delete(expired)
+            if best is None:
+                return None
+            self.hits += 1
+            self.entries.move_to_end(best)
+            _, (label, confidence, method), source, _, _ = self.entries[best]
+        return {"label": label, "confidence": confidence, "method": method,
+                "similarity": best_similarity, "source": dict(source)}
+
+    def add(self, signature, text, label, confidence, method, source_key, config=None):
+        if signature is None:
+            return
+        now = time.time()
+        source = {"key": source_key, "excerpt": text[:DEDUP_EXCERPT_CHARS], "analysed_at": now}
+        entry = (signature, (label, confidence, method), source, config_fingerprints(config)["model"], now + self.ttl)
+        with self.lock:
+            entry_id = None
+            if self.db is not None:
+                # SQLite picks the id, so processes sharing the file never collide
+                try:
+                    entry_id = self.db.execute(
+                        "INSERT INTO near_duplicates (scheme, signature, label, confidence, method, source_key, "
+                        "excerpt, analysed_at, fingerprint, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (DEDUP_SCHEME, signature, label, confidence, method, source_key,
+                         source["excerpt"], now, entry[3], entry[4])).lastrowid
+                    self.db.commit()
+                except sqlite3.Error as e:
+                    self._disk_error("add", e)
+            if entry_id is None:
+                entry_id = self.next_id
+                self.next_id -= 1
+            elif entry_id in self.entries:
+                # A rowid freed by another process and handed out again
+                self._remove(entry_id)
+            self._insert(entry_id, entry)
+            evicted = []
+            while len(self.entries) > self.max_entries:
+                evicted.append(self._remove(next(iter(self.entries))))
+                self.evictions += 1
+            self._delete(evicted)
+
+    def _delete(self, entry_ids):
+        # Called with the lock held. The index is a cache: a failed write is
+        # counted and the in-memory index carries on.
+        entry_ids = [(i,) for i in entry_ids if i > 0]
+        if self.db is None or not entry_ids:
+            return
+        try:
+            self.db.executemany("DELETE FROM near_duplicates WHERE id = ?", entry_ids)
+            self.db.commit()
+        except sqlite3.Error as e:
+            self._disk_error("delete", e)
+
+    def _disk_error(self, operation, error):
+        self.disk_errors += 1
+        metrics.inc("dedup_disk_errors_total", operation=operation)
+        try:
+            self.db.rollback()
+        except sqlite3.Error:
+            pass
+
+    def _load(self):
+        # Rebuilds the buckets from the newest max_entries live rows and drops the rest
+        with self.lock:
+            self.db.execute("DELETE FROM near_duplicates WHERE scheme != ? OR expires_at <= ?",
+                            (DEDUP_SCHEME, time.time()))
+            rows = self.db.execute(
+                "SELECT id, signature, label, confidence, method, source_key, excerpt, analysed_at, "
+                "fingerprint, expires_at FROM near_duplicates ORDER BY id DESC LIMIT ?", (self.max_entries,)
+            ).fetchall()
+            for entry_id, raw, label, confidence, method, source_key, excerpt, analysed_at, fingerprint, expires_at \
+                    in reversed(rows):
+                source = {"key": source_key, "excerpt": excerpt, "analysed_at": analysed_at}
+                self._insert(entry_id, (bytes(raw), (label, confidence, method), source, fingerprint, expires_at))
+            if rows:
+                self.db.execute("DELETE FROM near_duplicates WHERE id < ?", (rows[-1][0],))
+            self.db.commit()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.buckets = [{} for _ in range(self.bands)]
+            if self.db is not None:
+                self.db.execute("DELETE FROM near_duplicates")
+                self.db.commit()
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "lookups": self.lookups, "hits": self.hits,
+                    "candidates_per_lookup": round(self.candidates / self.lookups, 2) if self.lookups else 0.0,
+                    "evictions": self.evictions, "disk_errors": self.disk_errors, "threshold": self.threshold,
+                    "bands": self.bands, "rows": self.rows, "disk_enabled": self.db is not None}
+
+
+@process_wide
+def get_duplicate_index():
+    # None when DEDUP_INDEX_SIZE is 0
+    if DEDUP_INDEX_SIZE <= 0:
+        return None
+    return DuplicateIndex()
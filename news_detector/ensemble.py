@@ -0,0 +1,53 @@
+import math
+import os
+
+# Per-model vote weight and temperature, "org/name=2:1.5,other/name=0.5";
+# unlisted models get weight 1 and temperature 1. Temperatures above 1 soften
+# a model that is confidently wrong on held-out data, below 1 sharpen one
+# that is under-confident.
+ENSEMBLE_WEIGHTS = os.environ.get("ENSEMBLE_WEIGHTS", "")
+# Weight of a neutral 50/50 vote added to every ensemble, so a verdict one
+# model carried alone is less confident than one several models agreed on
+ENSEMBLE_PRIOR = float(os.environ.get("ENSEMBLE_PRIOR", "0.5"))
+ENSEMBLE_CLIP = 1e-4     # probabilities are clipped to [clip, 1 - clip] before taking log-odds
+
+
+def parse_ensemble_weights(spec):
+    # "org/name=2:1.5,other/name=0.5" -> {"org/name": (2.0, 1.5), "other/name": (0.5, 1.0)}
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        endpoint, _, value = item.partition("=")
+        weight, _, temperature = value.partition(":")
+        weights[endpoint.strip()] = (float(weight), float(temperature) if temperature else 1.0)
+    return weights
+
+
+def model_weight(backend, weights):
+    # (weight, temperature) of a backend; a local checkpoint is keyed "local"
+    return weights.get(backend.endpoint, (1.0, 1.0))
+
+
+def fake_probability(label, confidence):
+    return confidence if label == "FAKE" else 1 - confidence
+
+
+def combine_votes(votes, prior=ENSEMBLE_PRIOR):
+    # votes: [(fake_probability, weight, temperature)] -> (label, confidence).
+    # A weighted mean of the models' temperature-scaled log-odds, with the
+    # prior voting 50/50. Averaging rather than summing keeps five correlated
+    # models that agree from claiming more certainty than any one of them.
+    total = prior + sum(weight for _, weight, _ in votes)
+    if total <= 0:
+        return None, None
+    logit = 0.0
+    for p, weight, temperature in votes:
+        p = min(1 - ENSEMBLE_CLIP, max(ENSEMBLE_CLIP, p))
+        logit += weight * math.log(p / (1 - p)) / temperature
+    fake = 1 / (1 + math.exp(-logit / total))
+    return ("FAKE", fake) if fake > 0.5 else ("REAL", 1 - fake)
+
+
+def ensemble_name(voters, queried):
+    # "🗳️ Ensemble of 3/5 models (xlm-roberta-large-xnli, ...)" from the voting backends
+    names = [backend.endpoint.rsplit("/", 1)[-1] for backend in voters]
+    return f"🗳️ Ensemble of {len(voters)}/{queried} models ({', '.join(names)})"
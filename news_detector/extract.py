@@ -0,0 +1,269 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from ._shared import process_wide
+from .cache import LRUCache
+from .metrics import metrics
+from .windows import WINDOW_BUDGET, WINDOW_SECONDS, WINDOW_WORDS
+
+# The classifier never reads more than this many words (see make_windows), so
+# extraction stops once it has them
+EXTRACT_MAX_WORDS = int(WINDOW_BUDGET / WINDOW_SECONDS) * WINDOW_WORDS
+EXTRACT_WORKERS = int(os.environ.get("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACT_PAGE_TIMEOUT = float(os.environ.get("EXTRACT_PAGE_TIMEOUT", "10"))
+EXTRACT_INLINE_PAGES = 8    # smaller PDFs are read in-process; a pool costs more than it saves
+EXTRACT_MAX_STUCK = 4       # threads left on hung inline pages before small PDFs use the pool too
+EXTRACT_CSV_PREVIEW_ROWS = 200
+EXTRACT_CACHE_SIZE = int(os.environ.get("EXTRACT_CACHE_SIZE", "64"))
+EXTRACT_CACHE_MB = float(os.environ.get("EXTRACT_CACHE_MB", "64"))
+EXTRACT_CACHE_TTL = float(os.environ.get("EXTRACT_CACHE_TTL", "3600"))
+# Bump when any extractor below changes what it returns for the same bytes
+EXTRACTOR_VERSION = 1
+
+
+class PageTimeout(Exception):
+    pass
+
+
+# ─────────────────────────────────────────────
+# Worker Side
+# ─────────────────────────────────────────────
+
+_open_reader = (None, None)
+
+
+def _reader_for(path):
+    # Each worker parses the document once and reuses it for every page it is given
+    global _open_reader
+    key = (path, os.stat(path).st_mtime_ns)
+    if _open_reader[0] != key:
+        import PyPDF2
+        _open_reader = (key, PyPDF2.PdfReader(path))
+    return _open_reader[1]
+
+
+def _page_text(page):
+    return page.extract_text() or ""
+
+
+def _on_alarm(signum, frame):
+    raise PageTimeout()
+
+
+def extract_page(path, number, timeout=EXTRACT_PAGE_TIMEOUT):
+    # Runs in a pool worker (the main thread of its process), where SIGALRM can
+    # interrupt a pathological page instead of tying the worker up forever
+    use_alarm = hasattr(signal, "setitimer")
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return _reader_for(path).pages[number].extract_text() or ""
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+@process_wide
+def get_extract_pool():
+    # spawn, not fork: the Streamlit server process is full of threads
+    return ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+class InlineReader:
+    # Reads small PDFs' pages on short-lived threads so page_timeout applies
+    # without a process hop. A thread can't be interrupted, so one that overruns
+    # is left behind; once max_stuck of them are still running, usable() says no
+    # and small PDFs go to the process pool as well, where SIGALRM can stop a page.
+
+    def __init__(self, max_stuck=EXTRACT_MAX_STUCK):
+        self.max_stuck = max_stuck
+        self.stuck = []
+        self.lock = threading.Lock()
+
+    def usable(self):
+        with self.lock:
+            self.stuck = [thread for thread in self.stuck if thread.is_alive()]
+            return len(self.stuck) < self.max_stuck
+
+    def page_text(self, page, timeout):
+        outcome = {}
+
+        def run():
+            try:
+                outcome["text"] = _page_text(page)
+            except Exception as e:
+                outcome["error"] = e
+
+        thread = threading.Thread(target=run, name="extract-inline", daemon=True)
+        thread.start()
+        thread.join(timeout)
+        if thread.is_alive():
+            with self.lock:
+                self.stuck.append(thread)
+            raise PageTimeout()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["text"]
+
+
+@process_wide
+def get_inline_reader():
+    return InlineReader()
+
+
+# ─────────────────────────────────────────────
+# PDF Extraction
+# ─────────────────────────────────────────────
+
+def iter_pdf_pages(data, max_words=EXTRACT_MAX_WORDS, page_timeout=EXTRACT_PAGE_TIMEOUT, report=None):
+    # Yields (page_number, text) in page order while later pages are still being
+    # extracted. Stops once max_words words have been yielded. report, if given,
+    # is filled with pages, pages_read, failed_pages, timed_out_pages,
+    # stopped_early and seconds.
+    import PyPDF2
+
+    started = time.monotonic()
+    report = {} if report is None else report
+    report.update(pages=0, pages_read=0, failed_pages=[], timed_out_pages=[], stopped_early=False, seconds=0.0)
+    words = 0
+
+    def record(number, text, error=None):
+        nonlocal words
+        if isinstance(error, (PageTimeout, FutureTimeout)):
+            report["timed_out_pages"].append(number + 1)
+        elif error is not None:
+            report["failed_pages"].append(number + 1)
+        report["pages_read"] += 1
+        words += len(text.split())
+        report["seconds"] = time.monotonic() - started
+        return number + 1, text
+
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    report["pages"] = total = len(reader.pages)
+
+    first = 0
+    inline = get_inline_reader()
+    if (total <= EXTRACT_INLINE_PAGES or EXTRACT_WORKERS <= 1) and inline.usable():
+        for number in range(total):
+            try:
+                text, error = inline.page_text(reader.pages[number], page_timeout), None
+            except Exception as e:
+                text, error = "", e
+            yield record(number, text, error)
+            first = number + 1
+            if words >= max_words:
+                report["stopped_early"] = first < total
+                return
+            if isinstance(error, PageTimeout):
+                # The stuck thread may still be reading the shared stream, so
+                # the rest of the document goes to the pool
+                break
+        if first == total:
+            return
+
+    # Workers read the document from a temp file rather than receiving the
+    # bytes with every page
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(data)
+    pool = get_extract_pool()
+    in_flight = {}
+    next_page = first
+    try:
+        for number in range(first, total):
+            # Keep a bounded look-ahead so early termination wastes little work
+            while next_page < total and len(in_flight) < 2 * EXTRACT_WORKERS:
+                in_flight[next_page] = pool.submit(extract_page, tmp.name, next_page, page_timeout)
+                next_page += 1
+            future = in_flight.pop(number)
+            try:
+                # The worker enforces page_timeout itself; this is the backstop
+                text, error = future.result(timeout=page_timeout + 5), None
+            except Exception as e:
+                text, error = "", e
+            yield record(number, text, error)
+            if words >= max_words:
+                report["stopped_early"] = number + 1 < total
+                return
+    finally:
+        for future in in_flight.values():
+            future.cancel()
+        report["seconds"] = time.monotonic() - started
+        try:
+            os.unlink(tmp.name)
+        except OSError:
+            pass
+
+
+def extract_pdf_text(data, max_words=EXTRACT_MAX_WORDS, page_timeout=EXTRACT_PAGE_TIMEOUT, report=None):
+    return "\n".join(text for _, text in iter_pdf_pages(data, max_words, page_timeout, report) if text)
+
+
+# ─────────────────────────────────────────────
+# DOCX / CSV Extraction
+# ─────────────────────────────────────────────
+
+def extract_docx_text(data):
+    import docx
+
+    document = docx.Document(io.BytesIO(data))
+    return "\n".join(p.text for p in document.paragraphs if p.text.strip())
+
+
+def csv_text_columns(data, preview_rows=EXTRACT_CSV_PREVIEW_ROWS):
+    import pandas as pd
+
+    preview = pd.read_csv(io.BytesIO(data), nrows=preview_rows)
+    return preview.select_dtypes(include="object").columns.tolist()
+
+
+def extract_csv_column(data, column):
+    import pandas as pd
+
+    df = pd.read_csv(io.BytesIO(data), usecols=[column])
+    return " ".join(df[column].dropna().astype(str).tolist())
+
+
+# ─────────────────────────────────────────────
+# Extraction Cache
+# ─────────────────────────────────────────────
+
+def _sizeof(value):
+    if isinstance(value, tuple):
+        return sum(_sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+@process_wide
+def get_extract_cache():
+    # Streamlit reruns the script on every interaction; uploads are parsed once
+    return LRUCache(EXTRACT_CACHE_SIZE, EXTRACT_CACHE_TTL, max_bytes=int(EXTRACT_CACHE_MB * 1024 * 1024), sizeof=_sizeof)
+
+
+def extraction_cache_key(data, kind, *params):
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{kind}:{EXTRACTOR_VERSION}:{EXTRACT_MAX_WORDS}:{params!r}:{digest}"
+
+
+def cached_extract(data, kind, extract, *params):
+    # Returns (extract(data, *params), hit)
+    cache = get_extract_cache()
+    key = extraction_cache_key(data, kind, *params)
+    value = cache.get(key)
+    if value is not None:
+        metrics.inc("extractions_total", kind=kind, cache="hit")
+        return value, True
+    with metrics.timer("stage_seconds", stage=f"extract_{kind}"):
+        value = extract(data, *params)
+    metrics.inc("extractions_total", kind=kind, cache="miss")
+    cache.put(key, value)
+    return value, False
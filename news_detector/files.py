@@ -0,0 +1,88 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ._shared import process_wide
+from .extract import cached_extract, csv_text_columns, extract_csv_column, extract_docx_text, iter_pdf_pages
+from .pipeline import detect_fake_news
+from .windows import WINDOW_AGGREGATION
+
+FILE_WORKERS = int(os.environ.get("FILE_WORKERS", "8"))   # files extracted and classified at once
+FILE_KINDS = ("txt", "pdf", "docx", "csv")
+FILE_MIN_WORDS = 5
+
+
+def file_kind(name):
+    return name.rsplit(".", 1)[-1].lower() if "." in name else ""
+
+
+def extract_pdf_with_report(data):
+    # Same (text, report) value the app caches for a single PDF upload
+    report = {}
+    text = "\n".join(text for _, text in iter_pdf_pages(data, report=report) if text)
+    return text, report
+
+
+def extract_file(name, data):
+    # Returns (text, extraction cache hit). A CSV is read as one article made of
+    # its first text column.
+    kind = file_kind(name)
+    if kind == "txt":
+        return data.decode("utf-8", errors="ignore"), False
+    if kind == "pdf":
+        (text, _), hit = cached_extract(data, "pdf", extract_pdf_with_report)
+        return text, hit
+    if kind == "docx":
+        return cached_extract(data, "docx", extract_docx_text)
+    if kind == "csv":
+        columns, _ = cached_extract(data, "csv-columns", csv_text_columns)
+        if not columns:
+            raise ValueError("no text column found")
+        return cached_extract(data, "csv", extract_csv_column, columns[0])
+    raise ValueError(f"unsupported file type .{kind}")
+
+
+def analyze_file(name, data, aggregation=WINDOW_AGGREGATION, session=None):
+    # One result row; a file that can't be read or classified gets status
+    # "failed" and an error instead of raising
+    started = time.monotonic()
+    row = {"file": name, "kind": file_kind(name), "status": "ok", "verdict": None, "confidence": None,
+           "method": "", "language": None, "words": 0, "text": "", "cached_extract": False, "error": "",
+           "config_version": None}
+    try:
+        text, row["cached_extract"] = extract_file(name, data)
+        row["words"] = len(text.split())
+        if row["words"] < FILE_MIN_WORDS:
+            raise ValueError(f"only {row['words']} words of text")
+        details = {}
+        row["verdict"], row["confidence"], row["method"] = detect_fake_news(text, aggregation, details, session=session)
+        features = details["features"]
+        row["language"], row["text"] = features.language, features.text
+        row["config_version"] = details["config_version"]
+    except Exception as e:
+        row.update(status="failed", error=f"{type(e).__name__}: {e}")
+    row["seconds"] = time.monotonic() - started
+    return row
+
+
+@process_wide
+def get_file_executor():
+    return ThreadPoolExecutor(max_workers=FILE_WORKERS, thread_name_prefix="file-upload")
+
+
+def classify_files(files, aggregation=WINDOW_AGGREGATION, executor=None, session=None):
+    # files is a list of (name, bytes). Yields (position, row) as each file
+    # finishes, on the caller's thread; at most FILE_WORKERS (or the given
+    # executor's workers) files are in flight, and their PDF pages share the
+    # extraction process pool.
+    executor = executor or get_file_executor()
+    futures = {
+        executor.submit(analyze_file, name, data, aggregation, session): i for i, (name, data) in enumerate(files)
+    }
+    try:
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # The rerun was interrupted or the consumer stopped early
+        for future in futures:
+            future.cancel()
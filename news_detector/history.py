@@ -0,0 +1,127 @@
+import os
+import sqlite3
+import threading
+import time
+
+from ._shared import process_wide
+
+# Empty keeps history in memory for the life of the process
+HISTORY_DB = os.environ.get("HISTORY_DB", "history.db")
+HISTORY_TEXT_CHARS = 2000    # stored per entry; enough to recognise an article
+HISTORY_PAGE_SIZE = 20
+# Entries older than this are deleted (checked at start-up and hourly); 0 keeps them forever
+HISTORY_RETENTION_DAYS = float(os.environ.get("HISTORY_RETENTION_DAYS", "90"))
+HISTORY_PRUNE_INTERVAL = 3600
+
+
+class HistoryStore:
+    # Analysis results in an indexed SQLite table. Pages and counts are
+    # queried on demand, so nothing grows in session state. Every row belongs
+    # to an owner (the app's visitor id) and every query is scoped to one, so
+    # visitors never see or clear each other's entries. Rows saved before
+    # owners were recorded have none and are listed for everyone until they
+    # age out.
+
+    def __init__(self, db_path=HISTORY_DB, retention_days=HISTORY_RETENTION_DAYS):
+        self.db = sqlite3.connect(db_path or ":memory:", check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock:
+            if db_path:
+                self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at REAL NOT NULL,
+                    label TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    method TEXT NOT NULL,
+                    language TEXT,
+                    latency_ms REAL,
+                    words INTEGER,
+                    text TEXT NOT NULL,
+                    config_version TEXT,
+                    owner TEXT
+                )
+            """)
+            # Tables created before verdicts recorded their config version or owner
+            columns = {row["name"] for row in self.db.execute("PRAGMA table_info(history)")}
+            if "config_version" not in columns:
+                self.db.execute("ALTER TABLE history ADD COLUMN config_version TEXT")
+            if "owner" not in columns:
+                self.db.execute("ALTER TABLE history ADD COLUMN owner TEXT")
+            self.db.execute("CREATE INDEX IF NOT EXISTS history_owner_created ON history (owner, created_at)")
+            self.db.execute(
+                "CREATE INDEX IF NOT EXISTS history_owner_label_created ON history (owner, label, created_at)")
+            self.db.commit()
+        self.retention = retention_days * 86400
+        self.pruned_at = 0.0
+        self.prune()
+
+    def prune(self):
+        # Deletes entries past the retention period; the number removed
+        if not self.retention:
+            return 0
+        with self.lock:
+            self.pruned_at = time.time()
+            cursor = self.db.execute("DELETE FROM history WHERE created_at < ?", (self.pruned_at - self.retention,))
+            self.db.commit()
+        return cursor.rowcount
+
+    def add(self, owner, text, label, confidence, method, language=None, latency_ms=None, words=None,
+            config_version=None):
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO history (created_at, label, confidence, method, language, latency_ms, words, text, "
+                "config_version, owner) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), label, confidence, method, language, latency_ms, words, text[:HISTORY_TEXT_CHARS],
+                 config_version, owner),
+            )
+            self.db.commit()
+        if time.time() - self.pruned_at > HISTORY_PRUNE_INTERVAL:
+            self.prune()
+
+    @staticmethod
+    def _where(owner, label=None, since=None, until=None):
+        # since/until are epoch seconds; until is exclusive
+        clauses, params = ["(owner = ? OR owner IS NULL)"], [owner]
+        if label:
+            clauses.append("label = ?")
+            params.append(label)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        return " WHERE " + " AND ".join(clauses), params
+
+    def page(self, owner, page=0, page_size=HISTORY_PAGE_SIZE, label=None, since=None, until=None):
+        # Newest first
+        where, params = self._where(owner, label, since, until)
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT * FROM history{where} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                params + [page_size, page * page_size],
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self, owner, label=None, since=None, until=None):
+        # {"total": n, "FAKE": n, "REAL": n} for the owner's entries matching the filters
+        where, params = self._where(owner, label, since, until)
+        with self.lock:
+            rows = self.db.execute(f"SELECT label, COUNT(*) FROM history{where} GROUP BY label", params).fetchall()
+        counts = {"FAKE": 0, "REAL": 0}
+        counts.update({label: n for label, n in rows})
+        counts["total"] = sum(counts.values())
+        return counts
+
+    def clear(self, owner):
+        with self.lock:
+            self.db.execute("DELETE FROM history WHERE owner = ?", (owner,))
+            self.db.commit()
+
+
+@process_wide
+def get_history_store(path=HISTORY_DB):
+    return HistoryStore(path)
@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from .metrics import endpoint_label, metrics
+
+# Requests per second and burst per model endpoint; 0 turns limiting off.
+# RATE_LIMITS overrides single endpoints: "org/name=2:4,other/name=0.5"
+RATE_LIMIT_RPS = float(os.environ.get("RATE_LIMIT_RPS", "5"))
+RATE_LIMIT_BURST = float(os.environ.get("RATE_LIMIT_BURST", "10"))
+RATE_LIMITS = os.environ.get("RATE_LIMITS", "")
+# A request is only worth sending with at least this much of its deadline left
+RATE_LIMIT_SLACK = float(os.environ.get("RATE_LIMIT_SLACK", "0.25"))
+
+
+class RequestShed(Exception):
+    # The limiter could not grant the request before its deadline; nothing was sent
+    pass
+
+
+def parse_rate_limits(spec):
+    # "org/name=2:4,other/name=0.5" -> {"org/name": (2.0, 4.0), "other/name": (0.5, None)}
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        endpoint, _, value = item.partition("=")
+        rate, _, burst = value.partition(":")
+        limits[endpoint.strip()] = (float(rate), float(burst) if burst else None)
+    return limits
+
+
+class FairTokenBucket:
+    # A token bucket whose waiters queue per session and are granted tokens
+    # round-robin across sessions, so one user's 50-file upload can't starve
+    # everybody else. A request that can't be granted before its deadline is
+    # refused at once rather than queued.
+
+    def __init__(self, rate, burst, slack=RATE_LIMIT_SLACK):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.slack = slack
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.queues = OrderedDict()     # session -> deque of waiting tickets, in round-robin order
+        self.cond = threading.Condition()
+        self.granted = self.shed = self.expired = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return now
+
+    def _eta(self, session):
+        # Seconds until a new ticket from `session` would be served: round-robin
+        # lets every other session go once per turn of this one
+        own = len(self.queues.get(session, ()))
+        ahead = own + sum(min(len(q), own + 1) for s, q in self.queues.items() if s != session)
+        return max(0.0, (ahead + 1 - self.tokens) / self.rate)
+
+    def _head(self):
+        for queue in self.queues.values():
+            return queue[0]
+        return None
+
+    def _leave(self, session, ticket):
+        queue = self.queues[session]
+        queue.remove(ticket)
+        if not queue:
+            del self.queues[session]
+        self.cond.notify_all()
+
+    def acquire(self, session, deadline, cancel=None):
+        # Blocks until a token is granted (True), or returns False when the
+        # deadline can't be met, passes or `cancel` is set
+        with self.cond:
+            now = self._refill()
+            if not self.queues and self.tokens >= 1:
+                self.tokens -= 1
+                self.granted += 1
+                return True
+            if now + self._eta(session) + self.slack > deadline:
+                self.shed += 1
+                return False
+            ticket = object()
+            self.queues.setdefault(session, deque()).append(ticket)
+            while True:
+                now = self._refill()
+                if self._head() is ticket and self.tokens >= 1:
+                    self.tokens -= 1
+                    self.granted += 1
+                    # This session goes to the back of the round
+                    queue = self.queues.pop(session)
+                    queue.popleft()
+                    if queue:
+                        self.queues[session] = queue
+                    self.cond.notify_all()
+                    return True
+                if now + self.slack > deadline or (cancel is not None and cancel.is_set()):
+                    self.expired += 1
+                    self._leave(session, ticket)
+                    return False
+                wait = deadline - self.slack - now
+                if self._head() is ticket:
+                    wait = min(wait, (1 - self.tokens) / self.rate)
+                # Cancellation isn't signalled through the condition, so poll for it
+                self.cond.wait(min(wait, 0.1) if cancel is not None else wait)
+
+    def depth(self):
+        with self.cond:
+            return sum(len(q) for q in self.queues.values())
+
+    def throttle(self, seconds):
+        # The endpoint answered 429: send nothing for `seconds`
+        with self.cond:
+            self._refill()
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def stats(self):
+        with self.cond:
+            self._refill()
+            return {"rate": self.rate, "burst": self.burst, "tokens": round(self.tokens, 2),
+                    "queued": sum(len(q) for q in self.queues.values()), "sessions_waiting": len(self.queues),
+                    "granted": self.granted, "shed": self.shed, "expired": self.expired}
+
+
+class RateLimiter:
+    # One FairTokenBucket per endpoint, created on first use
+
+    def __init__(self, rate=RATE_LIMIT_RPS, burst=RATE_LIMIT_BURST, overrides=RATE_LIMITS):
+        self.rate = rate
+        self.burst = burst
+        self.overrides = parse_rate_limits(overrides) if isinstance(overrides, str) else dict(overrides)
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        # None when the endpoint isn't limited
+        with self.lock:
+            if url not in self.buckets:
+                rate, burst = self.overrides.get(endpoint_label(url), (self.rate, None))
+                burst = self.burst if burst is None else burst
+                self.buckets[url] = FairTokenBucket(rate, burst) if rate > 0 else None
+            return self.buckets[url]
+
+    def acquire(self, url, session, deadline, cancel=None):
+        bucket = self.bucket(url)
+        if bucket is None:
+            return True
+        endpoint = endpoint_label(url)
+        started = time.monotonic()
+        granted = bucket.acquire(session, deadline, cancel)
+        metrics.inc("rate_limit_total", endpoint=endpoint, outcome="granted" if granted else "shed")
+        if granted:
+            metrics.observe("rate_limit_wait_seconds", time.monotonic() - started, endpoint=endpoint)
+        metrics.set("rate_limit_queue_depth", bucket.depth(), endpoint=endpoint)
+        return granted
+
+    def throttle(self, url, seconds):
+        bucket = self.bucket(url)
+        if bucket is not None:
+            bucket.throttle(seconds)
+
+    def stats(self):
+        with self.lock:
+            buckets = dict(self.buckets)
+        return {endpoint_label(url): bucket.stats() for url, bucket in buckets.items() if bucket is not None}
@@ -0,0 +1,389 @@
+import hashlib
+import json
+import math
+import os
+import re
+import time
+import warnings
+from functools import lru_cache
+
+from ._shared import process_wide
+from .config import current_config
+from .rules import RULE_METHOD, rule_based_analysis, rule_based_batch
+
+# Weights written by `python -m news_detector train-linear`; empty keeps the
+# hand-weighted rules as the offline engine
+LINEAR_MODEL_PATH = os.environ.get("LINEAR_MODEL_PATH", "")
+LINEAR_HASH_BITS = 20           # 2**20 hashed features, 4 MB of float32 weights
+LINEAR_WORD_NGRAMS = 2          # word unigrams and bigrams
+LINEAR_CHAR_NGRAMS = (3, 5)     # character 3- to 5-grams
+LINEAR_METHOD = "📈 Hashed N-gram Model (Offline Mode)"
+
+LINEAR_MAGIC = b"NDLINEAR"
+LINEAR_FORMAT = 1
+LINEAR_ALIGN = 64               # weights start on a cache line so np.memmap reads them in place
+# Dense features appended after the hashed ones, in this order
+LINEAR_DENSE = ("fake_phrases", "real_phrases", "exclamations", "caps_words", "words")
+
+NON_WORD = re.compile(r"\W+")
+# \W for ASCII text as a bytes.translate table, several times faster than the regex
+ASCII_NON_WORD = bytes(c if chr(c).isalnum() or c == ord("_") else ord(" ") for c in range(128)) + bytes(range(128, 256))
+PRIME = 1099511628211                      # odd, so it has an inverse modulo 2**64
+PRIME_INVERSE = pow(PRIME, -1, 1 << 64)
+FIBONACCI = 0x9E3779B97F4A7C15             # 2**64 / golden ratio
+SPACE = 32
+PHRASE_FILTER_BITS = 16
+SALTS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x27D4EB2F165667C5,
+         0x85EBCA77C2B2AE63, 0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB)
+
+
+# ─────────────────────────────────────────────
+# Features
+# ─────────────────────────────────────────────
+#
+# Feature hashing: every word n-gram and character n-gram is hashed straight
+# to one of 2**hash_bits weights, and a text's score is the sum of its
+# n-grams' weights scaled by 1/sqrt(n-gram count). The text is normalized to
+# " word word ",
+# and one polynomial prefix hash over its bytes gives the hash of any span
+# with a subtraction and a multiplication, so all n-grams (and whole-word
+# indicator phrase matches) come out of a few vectorized numpy operations
+# per text instead of a Python loop over its words.
+
+_powers = None
+
+
+def _power_tables(length):
+    # PRIME**i and PRIME_INVERSE**i modulo 2**64 (uint64 arithmetic wraps),
+    # grown by doubling and shared by all threads
+    import numpy as np
+
+    global _powers
+    powers = _powers
+    if powers is None or len(powers[0]) < length:
+        size = max(length, 2 * len(powers[0]) if powers else 1 << 14)
+        tables = []
+        for base in (PRIME, PRIME_INVERSE):
+            table = np.full(size, base, dtype=np.uint64)
+            table[0] = 1
+            tables.append(np.cumprod(table, dtype=np.uint64))
+        _powers = powers = tuple(tables)
+    return powers
+
+
+def normalize(text):
+    # UTF-8 bytes of the lowercased words joined by single spaces, with a space
+    # at each end
+    lowered = text.lower()
+    if lowered.isascii():
+        words = lowered.encode("ascii").translate(ASCII_NON_WORD).split()
+    else:
+        words = NON_WORD.sub(" ", lowered).encode("utf-8").split()
+    return b" " + b" ".join(words) + b" " if words else b" "
+
+
+class SpanHasher:
+    # Hashes of arbitrary byte spans of one normalized text. A span's hash
+    # doesn't depend on where it starts, so a phrase hashed on its own matches
+    # the same words inside an article.
+
+    def __init__(self, normalized):
+        import numpy as np
+
+        self.np = np
+        self.data = np.frombuffer(normalized, dtype=np.uint8)
+        forward, self.inverse = _power_tables(len(self.data) + 1)
+        self.prefix = np.zeros(len(self.data) + 1, dtype=np.uint64)
+        np.cumsum(self.data * forward[:len(self.data)], out=self.prefix[1:])
+        spaces = np.flatnonzero(self.data == SPACE)
+        self.starts, self.ends = spaces[:-1] + 1, spaces[1:]
+
+    def spans(self, starts, ends):
+        return (self.prefix[ends] - self.prefix[starts]) * self.inverse[starts]
+
+    def words(self, n):
+        # Hashes of every run of n consecutive words
+        if len(self.starts) < n:
+            return self.np.zeros(0, dtype=self.np.uint64)
+        return self.spans(self.starts[:len(self.starts) - n + 1], self.ends[n - 1:])
+
+    def chars(self, n):
+        # Hashes of every n bytes; contiguous starts, so slices instead of gathers
+        count = max(0, len(self.data) - n + 1)
+        return (self.prefix[n:n + count] - self.prefix[:count]) * self.inverse[:count]
+
+
+@lru_cache(maxsize=4)
+def _phrase_table(fake_phrases, real_phrases):
+    # Sorted hashes of the normalized indicator phrases, the group of each, the
+    # longest phrase in words, and a bitmap of their low bits that rules out
+    # almost every word run before the binary search
+    import numpy as np
+
+    groups = {}
+    for group, phrases in ((1, fake_phrases), (2, real_phrases)):
+        for phrase in phrases:
+            normalized = normalize(phrase)
+            if normalized.strip():
+                groups[int(SpanHasher(normalized).words(len(normalized.split()))[0])] = group
+    hashes = np.array(sorted(groups), dtype=np.uint64)
+    bitmap = np.zeros(1 << PHRASE_FILTER_BITS, dtype=bool)
+    bitmap[hashes & np.uint64((1 << PHRASE_FILTER_BITS) - 1)] = True
+    longest = max((len(normalize(p).split()) for p in fake_phrases + real_phrases), default=1)
+    return hashes, np.array([groups[int(h)] for h in hashes], dtype=np.int8), longest, bitmap
+
+
+def indicator_phrases(config=None):
+    config = config or current_config()
+    return config.fake_indicators, config.real_indicators
+
+
+def text_features(text, word_ngrams=LINEAR_WORD_NGRAMS, char_ngrams=LINEAR_CHAR_NGRAMS, phrases=None):
+    # (uint64 n-gram hashes, dense features) of one text. The dense features
+    # are the rule engine's signals, scaled to roughly unit range: distinct
+    # fake and real indicator phrases (matched on whole words), exclamation
+    # marks, all-caps words and length. phrases: (fake, real) tuples, by
+    # default the current config's
+    import numpy as np
+
+    hasher = SpanHasher(normalize(text))
+    phrase_hashes, phrase_groups, phrase_words, bitmap = _phrase_table(*(phrases or indicator_phrases()))
+    parts, runs = [], []
+    for n in range(1, max(word_ngrams, phrase_words) + 1):
+        h = hasher.words(n)
+        runs.append(h)
+        if n <= word_ngrams:
+            parts.append(h ^ np.uint64(SALTS[n]))
+    for n in range(char_ngrams[0], char_ngrams[1] + 1):
+        parts.append(hasher.chars(n) ^ np.uint64(SALTS[(n + 3) % len(SALTS)]))
+
+    runs = np.concatenate(runs)
+    runs = runs[bitmap[runs & np.uint64((1 << PHRASE_FILTER_BITS) - 1)]]
+    found = np.minimum(np.searchsorted(phrase_hashes, runs), len(phrase_hashes) - 1)
+    found = np.unique(found[phrase_hashes[found] == runs])
+    fake_phrases = int((phrase_groups[found] == 1).sum())
+    caps = sum(1 for w in text.split() if len(w) > 2 and w.isupper())
+    dense = [math.log1p(fake_phrases), math.log1p(len(found) - fake_phrases), math.log1p(text.count("!")),
+             math.log1p(caps), math.log1p(len(hasher.starts)) / 5]
+    return np.concatenate(parts), dense
+
+
+def featurize(texts, hash_bits, word_ngrams=LINEAR_WORD_NGRAMS, char_ngrams=LINEAR_CHAR_NGRAMS, phrases=None):
+    # A batch as a sparse 0/1 matrix in coordinate form, (rows, columns), with
+    # each row's scale (1/sqrt of its n-gram count), plus a dense
+    # (len(texts), len(LINEAR_DENSE)) block. Columns are the top hash_bits of
+    # hash * FIBONACCI (multiplicative hashing), taken per text while its
+    # hashes are still in cache.
+    import numpy as np
+
+    shift = np.uint64(64 - hash_bits)
+    phrases = phrases or indicator_phrases()
+    columns, dense = [], []
+    for text in texts:
+        h, row = text_features(text, word_ngrams, char_ngrams, phrases)
+        h *= np.uint64(FIBONACCI)
+        columns.append((h >> shift).astype(np.intp))
+        dense.append(row)
+    lengths = np.array([len(c) for c in columns], dtype=np.intp)
+    rows = np.repeat(np.arange(len(texts)), lengths)
+    columns = np.concatenate(columns) if columns else np.zeros(0, dtype=np.intp)
+    scale = 1 / np.sqrt(np.maximum(lengths, 1))
+    return rows, columns, scale, np.array(dense, dtype=np.float32).reshape(len(texts), len(LINEAR_DENSE))
+
+
+def _sigmoid(z):
+    import numpy as np
+
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30.0, 30.0)))
+
+
+# ─────────────────────────────────────────────
+# Model
+# ─────────────────────────────────────────────
+
+class LinearModel:
+    # Logistic regression over hashed n-grams. weights holds the hashed
+    # features followed by the dense ones; it is usually a read-only np.memmap
+    # of the model file, so every process shares the same pages.
+
+    def __init__(self, header, weights):
+        import numpy as np
+
+        self.np = np
+        self.header = header
+        self.weights = weights
+        self.hash_bits = header["hash_bits"]
+        self.word_ngrams = header["word_ngrams"]
+        self.char_ngrams = tuple(header["char_ngrams"])
+        self.bias = header["bias"]
+        self.fingerprint = header["fingerprint"]
+        # The dense phrase features must keep using the lists the weights were
+        # trained with, whatever the config says now (older files lack them)
+        self.phrases = None
+        if "fake_phrases" in header:
+            self.phrases = (tuple(header["fake_phrases"]), tuple(header["real_phrases"]))
+        self.hashed = 1 << self.hash_bits
+        self.dense = weights[self.hashed:]
+
+    def fake_probabilities(self, texts):
+        np = self.np
+        rows, columns, scale, dense = featurize(texts, self.hash_bits, self.word_ngrams, self.char_ngrams,
+                                                self.phrases)
+        z = np.bincount(rows, weights=self.weights[columns], minlength=len(texts)) * scale
+        return _sigmoid(z + dense @ self.dense + self.bias)
+
+    def analyze(self, text):
+        return self.batch([text])[0]
+
+    def batch(self, texts):
+        # Same (label, confidence) shape as rule_based_batch
+        return [("FAKE", float(p)) if p > 0.5 else ("REAL", float(1 - p))
+                for p in self.fake_probabilities(list(texts))]
+
+
+def save_linear_model(path, header, weights):
+    # NDLINEAR magic, uint32 header length, JSON header, padding up to
+    # LINEAR_ALIGN, then little-endian float32 weights
+    import numpy as np
+
+    weights = np.ascontiguousarray(weights, dtype="<f4")
+    header = dict(header, format=LINEAR_FORMAT, size=len(weights),
+                  fingerprint=hashlib.sha256(weights.tobytes()).hexdigest()[:16])
+    encoded = json.dumps(header, sort_keys=True).encode("utf-8")
+    offset = len(LINEAR_MAGIC) + 4 + len(encoded)
+    encoded += b" " * (-offset % LINEAR_ALIGN)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(LINEAR_MAGIC + len(encoded).to_bytes(4, "little") + encoded)
+        f.write(weights.tobytes())
+    os.replace(tmp, path)
+    return header
+
+
+def load_linear_model(path):
+    import numpy as np
+
+    with open(path, "rb") as f:
+        magic = f.read(len(LINEAR_MAGIC))
+        if magic != LINEAR_MAGIC:
+            raise ValueError(f"{path} is not a linear model file")
+        length = int.from_bytes(f.read(4), "little")
+        header = json.loads(f.read(length))
+    if header.get("format") != LINEAR_FORMAT:
+        raise ValueError(f"{path} has model format {header.get('format')}, expected {LINEAR_FORMAT}")
+    weights = np.memmap(path, dtype="<f4", mode="r", offset=len(LINEAR_MAGIC) + 4 + length, shape=(header["size"],))
+    return LinearModel(header, weights)
+
+
+@process_wide
+def get_linear_model():
+    # None when no model is configured or it can't be loaded; the rules take over
+    if not LINEAR_MODEL_PATH:
+        return None
+    try:
+        return load_linear_model(LINEAR_MODEL_PATH)
+    except (OSError, ValueError, KeyError) as e:
+        warnings.warn(f"Linear model {LINEAR_MODEL_PATH} not loaded, using the rules: {e}")
+        return None
+
+
+def offline_fingerprint():
+    model = get_linear_model()
+    return model.fingerprint if model is not None else None
+
+
+def offline_engine():
+    # What the fallback runs, as shown in progress messages
+    return "the hashed n-gram model" if get_linear_model() is not None else "rule-based analysis"
+
+
+def offline_analysis(text, features=None, config=None):
+    # The verdict used when every model failed: (label, confidence, method)
+    model = get_linear_model()
+    if model is None:
+        return (*rule_based_analysis(text, features, config), RULE_METHOD)
+    return (*model.analyze(text), LINEAR_METHOD)
+
+
+def offline_batch(texts, config=None):
+    model = get_linear_model()
+    if model is None:
+        return [(*verdict, RULE_METHOD) for verdict in rule_based_batch(texts, config)]
+    return [(*verdict, LINEAR_METHOD) for verdict in model.batch(texts)]
+
+
+# ─────────────────────────────────────────────
+# Training
+# ─────────────────────────────────────────────
+
+LABEL_VALUES = {"fake": 1, "1": 1, "true": 1, "false": 0, "real": 0, "0": 0}
+
+
+def parse_label(value):
+    # FAKE/REAL, 1/0 or true/false (true means fake); None for anything else
+    return LABEL_VALUES.get(str(value).strip().lower())
+
+
+def train_linear(texts, labels, path, hash_bits=LINEAR_HASH_BITS, epochs=5, batch_size=256, learning_rate=0.1,
+                 l2=1e-6, holdout=0.1, seed=0, on_epoch=None):
+    # Mini-batch logistic regression with Adagrad, which suits hashed
+    # features: rare n-grams keep a large step size, frequent ones settle.
+    # labels are 1 for fake and 0 for real. A `holdout` share of the texts is
+    # kept aside and scored after each epoch; on_epoch, if given, receives
+    # (epoch, holdout accuracy, holdout log loss). Returns the saved header.
+    import numpy as np
+
+    texts = list(texts)
+    y = np.asarray(labels, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(texts))
+    held = order[:int(len(texts) * holdout)]
+    train = order[len(held):]
+    if not len(train):
+        raise ValueError("no training examples")
+
+    size = (1 << hash_bits) + len(LINEAR_DENSE)
+    weights = np.zeros(size, dtype=np.float64)
+    squares = np.full(size, 1e-8)
+    bias, bias_square = 0.0, 1e-8
+    phrases = indicator_phrases()
+    header = {"hash_bits": hash_bits, "word_ngrams": LINEAR_WORD_NGRAMS, "char_ngrams": list(LINEAR_CHAR_NGRAMS),
+              "dense": list(LINEAR_DENSE), "trained_on": int(len(train)), "epochs": epochs,
+              "fake_phrases": list(phrases[0]), "real_phrases": list(phrases[1])}
+    if len(held):
+        held_features = featurize([texts[i] for i in held], hash_bits, phrases=phrases)
+
+    for epoch in range(1, epochs + 1):
+        rng.shuffle(train)
+        for start in range(0, len(train), batch_size):
+            batch = train[start:start + batch_size]
+            rows, columns, scale, dense = featurize([texts[i] for i in batch], hash_bits, phrases=phrases)
+            z = np.bincount(rows, weights=weights[columns], minlength=len(batch)) * scale
+            z += dense @ weights[1 << hash_bits:] + bias
+            error = (_sigmoid(z) - y[batch]) / len(batch)
+            gradient = np.bincount(columns, weights=(error * scale)[rows], minlength=size)
+            gradient[1 << hash_bits:] += error @ dense
+            touched = np.flatnonzero(gradient)
+            g = gradient[touched] + l2 * weights[touched]
+            squares[touched] += g * g
+            weights[touched] -= learning_rate * g / np.sqrt(squares[touched])
+            g = error.sum()
+            bias_square += g * g
+            bias -= learning_rate * g / math.sqrt(bias_square)
+
+        if len(held):
+            # Scored with float32 weights, as the saved model will be
+            rows, columns, scale, dense = held_features
+            saved = weights.astype(np.float32)
+            z = np.bincount(rows, weights=saved[columns], minlength=len(held)) * scale
+            p = _sigmoid(z + dense @ saved[1 << hash_bits:] + bias)
+            accuracy = float(((p > 0.5) == (y[held] > 0.5)).mean())
+            loss = float(-np.mean(y[held] * np.log(p + 1e-12) + (1 - y[held]) * np.log(1 - p + 1e-12)))
+            header.update(holdout=int(len(held)), holdout_accuracy=round(accuracy, 4), holdout_log_loss=round(loss, 4))
+            if on_epoch is not None:
+                on_epoch(epoch, accuracy, loss)
+        elif on_epoch is not None:
+            on_epoch(epoch, None, None)
+
+    header.update(bias=float(bias), created_at=time.time())
+    return save_linear_model(path, header, weights)
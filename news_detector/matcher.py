@@ -0,0 +1,98 @@
+import re
+from functools import lru_cache
+
+
+# ─────────────────────────────────────────────
+# Multi-pattern phrase matcher
+# ─────────────────────────────────────────────
+#
+# All phrases are inserted into a trie and the trie is emitted as one regular
+# expression, so the regex engine walks every phrase at once (Aho-Corasick
+# style) instead of scanning the text once per phrase. Matching is plain
+# substring matching, the same as `phrase in text`, including overlaps.
+#
+# Below TRIE_MIN_PHRASES the per-phrase `in` scans (C-level, one pass each)
+# are faster, so counts() uses them and the trie only serves callers that
+# need positions (see benchmarks/bench_phrase_matcher.py for the crossover).
+TRIE_MIN_PHRASES = 128
+
+
+def _trie_pattern(node):
+    terminal = "" in node
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    body = "(?:" + "|".join(branches) + ")"
+    # Longest branch first, shorter phrase ending here as the fallback
+    return body + "?" if terminal else body
+
+
+class PhraseMatcher:
+    def __init__(self, groups):
+        # groups: {"fake": [...phrases], "real": [...phrases]}
+        self.groups = {name: [p for p in dict.fromkeys(phrases) if p] for name, phrases in groups.items()}
+        self.phrase_groups = {}
+        for name, phrases in self.groups.items():
+            for phrase in phrases:
+                self.phrase_groups.setdefault(phrase, []).append(name)
+
+        trie = {}
+        for phrase in self.phrase_groups:
+            node = trie
+            for ch in phrase:
+                node = node.setdefault(ch, {})
+            node[""] = True
+        self.pattern = re.compile(_trie_pattern(trie)) if self.phrase_groups else None
+
+        # The regex reports the longest phrase starting at a position; shorter
+        # phrases that are prefixes of it start there too.
+        self.prefixes = {
+            phrase: [other for other in self.phrase_groups if other != phrase and phrase.startswith(other)]
+            for phrase in self.phrase_groups
+        }
+
+    def finditer(self, text):
+        # Yields (start, end, phrase) for every occurrence, ordered by start
+        if self.pattern is None:
+            return
+        search = self.pattern.search
+        match = search(text)
+        while match is not None:
+            start = match.start()
+            phrase = match.group()
+            for prefix in self.prefixes[phrase]:
+                yield start, start + len(prefix), prefix
+            yield start, match.end(), phrase
+            match = search(text, start + 1)
+
+    def scan(self, text):
+        # counts: distinct phrases found per group (what the rule scores use)
+        # occurrences: total hits per group, matches: (start, end, phrase, group)
+        found = {name: set() for name in self.groups}
+        occurrences = dict.fromkeys(self.groups, 0)
+        matches = []
+        for start, end, phrase in self.finditer(text):
+            for name in self.phrase_groups[phrase]:
+                found[name].add(phrase)
+                occurrences[name] += 1
+                matches.append((start, end, phrase, name))
+        counts = {name: len(phrases) for name, phrases in found.items()}
+        return {"counts": counts, "occurrences": occurrences, "matches": matches}
+
+    def counts(self, text):
+        # Distinct phrases found per group, without building match tuples
+        if len(self.phrase_groups) < TRIE_MIN_PHRASES:
+            return {name: sum(1 for phrase in phrases if phrase in text) for name, phrases in self.groups.items()}
+        found = {phrase for _, _, phrase in self.finditer(text)}
+        return {name: sum(1 for phrase in phrases if phrase in found) for name, phrases in self.groups.items()}
+
+
+@lru_cache(maxsize=16)
+def _compile(frozen_groups):
+    return PhraseMatcher({name: list(phrases) for name, phrases in frozen_groups})
+
+
+def compile_phrases(groups):
+    # Compiled matchers are memoized on the phrase lists, so callers can ask
+    # for one on every request and only pay the build cost when lists change.
+    return _compile(tuple((name, tuple(phrases)) for name, phrases in groups.items()))
@@ -0,0 +1,205 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# METRICS=0 swaps the registry for a no-op one
+METRICS_ENABLED = os.environ.get("METRICS", "1") != "0"
+METRICS_PREFIX = "news_detector"
+# Seconds; spans a cache hit (sub-millisecond) up to a full cascade deadline
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "stage_seconds": "Time spent in each pipeline stage.",
+    "model_request_seconds": "Latency of single model endpoint requests, retries included.",
+    "model_requests_total": "Model endpoint requests by outcome (HTTP status, timeout, error, parse_failure, ...).",
+    "verdicts_total": "Verdicts by source (cache, near_duplicate, model, linear, rules).",
+    "model_loading_total": "Cold-model 503s by decision: waited for the model to load or moved on.",
+    "warmup_pings_total": "Background warm-up pings by endpoint and outcome.",
+    "cascade_wins_total": "Verdicts produced by each cascade position.",
+    "ensemble_votes_total": "Ensemble-mode model answers by status: voted, failed or late (after the deadline).",
+    "extractions_total": "Upload extractions by file kind and cache result.",
+    "dedup_disk_errors_total": "Near-duplicate index writes that failed on disk (the in-memory index carries on).",
+    "http_request_seconds": "Inference service request latency by path.",
+    "http_responses_total": "Inference service responses by path and status.",
+    "rate_limit_wait_seconds": "Time model requests spent queued for a rate-limit token.",
+    "rate_limit_total": "Model requests granted a rate-limit token or shed before their deadline.",
+    "rate_limit_queue_depth": "Model requests queued for a rate-limit token, as of the last grant or shed.",
+    "config_reloads_total": "Detector config reloads by outcome (ok, failed; a failed reload keeps the running version).",
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q):
+        # Linear interpolation inside the bucket holding the q-th observation
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                low = self.buckets[i - 1] if i else 0.0
+                high = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return low + (high - low) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class Timer:
+    __slots__ = ("metrics", "name", "labels", "started")
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Metrics:
+    enabled = True
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = value
+
+    def timer(self, name, **labels):
+        return Timer(self, name, labels)
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+    def summary(self):
+        # {"histograms": [(name, labels, count, mean, p50, p95)], "counters": [(name, labels, value)],
+        #  "gauges": [(name, labels, value)]}
+        with self.lock:
+            histograms = [
+                (name, dict(labels), h.count, h.total / h.count, h.quantile(0.5), h.quantile(0.95))
+                for (name, labels), h in sorted(self.histograms.items()) if h.count
+            ]
+            counters = [(name, dict(labels), value) for (name, labels), value in sorted(self.counters.items())]
+            gauges = [(name, dict(labels), value) for (name, labels), value in sorted(self.gauges.items())]
+        return {"histograms": histograms, "counters": counters, "gauges": gauges}
+
+    def prometheus_text(self):
+        def render_labels(labels, extra=()):
+            pairs = [f'{k}="{_escape(v)}"' for k, v in list(labels) + list(extra)]
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+
+        lines = []
+        with self.lock:
+            for name in sorted({name for name, _ in self.histograms}):
+                metric = f"{METRICS_PREFIX}_{name}"
+                lines += [f"# HELP {metric} {HELP.get(name, name)}", f"# TYPE {metric} histogram"]
+                for (hname, labels), h in sorted(self.histograms.items()):
+                    if hname != name:
+                        continue
+                    cumulative = 0
+                    for bound, n in zip(list(h.buckets) + ["+Inf"], h.counts):
+                        cumulative += n
+                        lines.append(f"{metric}_bucket{render_labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{metric}_sum{render_labels(labels)} {h.total:.6f}")
+                    lines.append(f"{metric}_count{render_labels(labels)} {h.count}")
+            for name in sorted({name for name, _ in self.counters}):
+                metric = f"{METRICS_PREFIX}_{name}"
+                lines += [f"# HELP {metric} {HELP.get(name, name)}", f"# TYPE {metric} counter"]
+                for (cname, labels), value in sorted(self.counters.items()):
+                    if cname == name:
+                        lines.append(f"{metric}{render_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self.gauges}):
+                metric = f"{METRICS_PREFIX}_{name}"
+                lines += [f"# HELP {metric} {HELP.get(name, name)}", f"# TYPE {metric} gauge"]
+                for (gname, labels), value in sorted(self.gauges.items()):
+                    if gname == name:
+                        lines.append(f"{metric}{render_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Written to a temp file and renamed so scrapers never see half a file
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+
+class NullMetrics:
+    # Same interface as Metrics; every call returns at once
+    enabled = False
+    _timer = nullcontext()
+
+    def observe(self, name, seconds, **labels):
+        pass
+
+    def inc(self, name, amount=1, **labels):
+        pass
+
+    def set(self, name, value, **labels):
+        pass
+
+    def timer(self, name, **labels):
+        return self._timer
+
+    def reset(self):
+        pass
+
+    def summary(self):
+        return {"histograms": [], "counters": [], "gauges": []}
+
+    def prometheus_text(self):
+        return ""
+
+    def write_prometheus(self, path):
+        pass
+
+
+metrics = Metrics() if METRICS_ENABLED else NullMetrics()
+
+
+def endpoint_label(url):
+    # "https://.../models/org/name" -> "org/name"
+    return "/".join(url.rstrip("/").split("/")[-2:])
@@ -0,0 +1,115 @@
+import os
+import time
+
+from .client import get_inference_client
+from .limiter import RequestShed
+from .metrics import endpoint_label, metrics
+from .windows import WINDOW_BATCH_SIZE
+
+
+class UnparseableResponse(Exception):
+    # The endpoint answered, but not with labels label_scores understands
+    pass
+
+
+def label_scores(predictions):
+    # (fake_score, real_score) for one list of {"label", "score"} predictions
+    label_map = {}
+    for item in predictions:
+        label_map[item['label'].upper()] = item['score']
+
+    fake_score = 0
+    real_score = 0
+
+    for key, val in label_map.items():
+        if any(f in key for f in ['FAKE', 'LABEL_1', 'FALSE', 'MISINFORMATION', 'UNRELIABLE']):
+            fake_score = max(fake_score, val)
+        elif any(r in key for r in ['REAL', 'LABEL_0', 'TRUE', 'RELIABLE', 'LEGITIMATE']):
+            real_score = max(real_score, val)
+
+    if fake_score == 0 and real_score == 0:
+        fake_score = label_map.get('NEGATIVE', label_map.get('NEG', 0))
+        real_score = label_map.get('POSITIVE', label_map.get('POS', 0))
+
+    if fake_score == 0 and real_score == 0:
+        return None
+    return fake_score, real_score
+
+
+def parse_result(result):
+    if not result:
+        return None, None
+    try:
+        predictions = result[0] if isinstance(result[0], list) else result
+        scores = label_scores(predictions)
+        if scores is None:
+            return None, None
+        fake_score, real_score = scores
+        if fake_score > real_score:
+            return "FAKE", fake_score
+        else:
+            return "REAL", real_score
+    except Exception:
+        return None, None
+
+
+def parse_window_results(result, n_windows):
+    # A batched request answers with one prediction list per input
+    if not isinstance(result, list) or len(result) != n_windows:
+        return None
+    try:
+        scores = [label_scores(predictions) for predictions in result]
+    except Exception:
+        return None
+    if any(score is None for score in scores):
+        return None
+    return scores
+
+
+# Point at a local stub of the Inference API for load tests and benchmarks
+# Model endpoints are listed, in priority order, in the detector config
+# (detector_config.json) relative to this base
+HF_API_BASE = os.environ.get("HF_API_BASE", "https://api-inference.huggingface.co/models").rstrip("/")
+
+MODEL_TIMEOUT = 25       # seconds a single endpoint may take
+CASCADE_GRACE = 1.5      # seconds a higher-priority model gets after the first valid answer
+CASCADE_DEADLINE = 30    # seconds for the whole cascade before falling back to rules
+# "first": the highest-priority valid answer decides. "ensemble": every model
+# is asked and whatever answered by ENSEMBLE_DEADLINE votes, so that one
+# deadline trades accuracy for latency
+CASCADE_MODE = os.environ.get("CASCADE_MODE", "first")
+ENSEMBLE_DEADLINE = float(os.environ.get("ENSEMBLE_DEADLINE", "6"))
+
+
+def try_model(api_url, inputs, timeout=MODEL_TIMEOUT, cancel=None, session=None, count_timeout=True):
+    # None on failure; RequestShed when the rate limiter turned the request away
+    payload = {"inputs": inputs}
+    try:
+        return get_inference_client().post(api_url, payload, timeout, cancel, session, count_timeout)
+    except RequestShed:
+        raise
+    except Exception:
+        return None
+
+
+def query_windows(api_url, windows, timeout=MODEL_TIMEOUT, cancel=None, session=None, count_timeout=True):
+    # Sends the windows in batches of WINDOW_BATCH_SIZE; None if any batch fails,
+    # UnparseableResponse if one comes back without usable labels
+    end = time.monotonic() + timeout
+    scores = []
+    for i in range(0, len(windows), WINDOW_BATCH_SIZE):
+        batch = [text for text, _ in windows[i:i + WINDOW_BATCH_SIZE]]
+        remaining = end - time.monotonic()
+        if remaining <= 0 or (cancel is not None and cancel.is_set()):
+            return None
+        result = try_model(api_url, batch, remaining, cancel, session, count_timeout)
+        if result is None:
+            return None
+        with metrics.timer("stage_seconds", stage="parse"):
+            batch_scores = parse_window_results(result, len(batch))
+        if batch_scores is None:
+            # Answered, but not with one usable prediction list per window
+            metrics.inc("model_requests_total", endpoint=endpoint_label(api_url), outcome="parse_failure")
+            raise UnparseableResponse(api_url)
+        scores.extend(batch_scores)
+    return scores
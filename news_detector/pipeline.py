@@ -0,0 +1,143 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ._shared import process_wide, report
+from .cache import FALLBACK_CACHE_TTL, get_verdict_cache, verdict_cache_key
+from .cascade import analyze_with_huggingface
+from .config import current_config
+from .dedup import get_duplicate_index
+from .linear import LINEAR_METHOD, offline_analysis, offline_batch, offline_engine
+from .metrics import metrics
+from .spans import suspicious_spans
+from .text import analyze_text, detect_language, preprocess_text
+from .windows import WINDOW_AGGREGATION
+
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "8"))
+
+
+def detect_fake_news(text, aggregation=WINDOW_AGGREGATION, details=None, on_progress=None, session=None):
+    # details, if given, is filled with extras for display (text features,
+    # suspicious sentences, per-window scores, the near-duplicate match, the
+    # config version); on_progress, if given, receives progress events (see
+    # _shared.report); session identifies the caller to the rate limiter's
+    # fair queue. The whole request runs under one config snapshot.
+    config = current_config()
+    with metrics.timer("stage_seconds", stage="preprocess"):
+        features = analyze_text(text)
+    cleaned = features.text
+    cache = get_verdict_cache()
+    key = verdict_cache_key(cleaned, aggregation)
+    with metrics.timer("stage_seconds", stage="cache_lookup"):
+        cached = cache.get(key, config)
+    if details is not None:
+        details["cached"] = cached is not None
+        details["features"] = features
+        details["config_version"] = config.version
+        with metrics.timer("stage_seconds", stage="spans"):
+            details["spans"] = suspicious_spans(cleaned, config=config)
+    if cached is not None:
+        metrics.inc("verdicts_total", source="cache")
+        report(on_progress, "cached", 1.0, method=cached[2])
+        return cached
+
+    # Syndicated copies (new byline, tracking links, small edits) reuse the
+    # verdict of the article they were copied from
+    index = get_duplicate_index()
+    signature = None
+    if index is not None:
+        with metrics.timer("stage_seconds", stage="near_duplicate"):
+            signature = index.signature(cleaned)
+            match = index.lookup(signature, config)
+        if match is not None:
+            if details is not None:
+                details["near_duplicate"] = match
+            metrics.inc("verdicts_total", source="near_duplicate")
+            cache.put(key, match["label"], match["confidence"], match["method"], "model", config=config)
+            report(on_progress, "near_duplicate", 1.0, method=match["method"], similarity=match["similarity"])
+            return match["label"], match["confidence"], match["method"]
+
+    lang = features.language
+    report(on_progress, "preprocessed", 0.1, language=lang, words=features.word_count)
+    label, confidence, model_name = analyze_with_huggingface(
+        cleaned, aggregation=aggregation, details=details, on_progress=on_progress, language=lang, session=session,
+        config=config)
+    if label is None:
+        report(on_progress, "fallback", 0.95, engine=offline_engine())
+        with metrics.timer("stage_seconds", stage="rules"):
+            label, confidence, method = offline_analysis(cleaned, features, config)
+        metrics.inc("verdicts_total", source="linear" if method == LINEAR_METHOD else "rules")
+        cache.put(key, label, confidence, method, "rules", ttl=FALLBACK_CACHE_TTL, config=config)
+    else:
+        method = f"{model_name} | Language: {lang.upper()}"
+        cache.put(key, label, confidence, method, "model", config=config)
+        if index is not None:
+            index.add(signature, cleaned, label, confidence, method, key, config)
+        metrics.inc("verdicts_total", source="model")
+    report(on_progress, "done", 1.0, method=method)
+    return label, confidence, method
+
+
+@process_wide
+def get_batch_executor():
+    return ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch-row")
+
+
+def classify_chunk(texts, aggregation=WINDOW_AGGREGATION, executor=None, use_models=True,
+                   deadline=None, session=None, config=None):
+    # Yields (position, label, confidence, method) for each text as soon as its
+    # verdict is ready. At most BATCH_WORKERS rows (or the given executor's
+    # workers) run the model cascade at once; rows every model failed on, or all
+    # rows when use_models is False, take the chunk's batched offline verdict.
+    # The chunk runs under one config snapshot: the given one, else the current.
+    config = config or current_config()
+    with metrics.timer("stage_seconds", stage="batch_preprocess"):
+        cleaned = [preprocess_text(t) if isinstance(t, str) else "" for t in texts]
+    with metrics.timer("stage_seconds", stage="batch_rules"):
+        fallback = offline_batch(cleaned, config)
+    offline_source = "linear" if fallback and fallback[0][2] == LINEAR_METHOD else "rules"
+    cache = get_verdict_cache()
+    index = get_duplicate_index() if use_models else None
+    keys = [verdict_cache_key(c, aggregation) for c in cleaned]
+    signatures = {}
+    executor = executor or get_batch_executor()
+    futures = {}
+    try:
+        for i, text in enumerate(cleaned):
+            cached = cache.get(keys[i], config) if use_models else None
+            match = None
+            if cached is None and text and index is not None:
+                signatures[i] = index.signature(text)
+                match = index.lookup(signatures[i], config)
+            if cached is not None:
+                metrics.inc("verdicts_total", source="cache")
+                yield (i, *cached)
+            elif match is not None:
+                cache.put(keys[i], match["label"], match["confidence"], match["method"], "model", config=config)
+                metrics.inc("verdicts_total", source="near_duplicate")
+                yield i, match["label"], match["confidence"], match["method"]
+            elif not text or not use_models:
+                metrics.inc("verdicts_total", source=offline_source)
+                yield (i, *fallback[i])
+            else:
+                future = executor.submit(analyze_with_huggingface, text, deadline=deadline, aggregation=aggregation,
+                                         session=session, config=config)
+                futures[future] = i
+
+        for future in as_completed(futures):
+            i = futures.pop(future)
+            label, confidence, model_name = future.result()
+            if label is None:
+                label, confidence, method = fallback[i]
+                cache.put(keys[i], label, confidence, method, "rules", ttl=FALLBACK_CACHE_TTL, config=config)
+                metrics.inc("verdicts_total", source=offline_source)
+            else:
+                method = f"{model_name} | Language: {detect_language(cleaned[i]).upper()}"
+                cache.put(keys[i], label, confidence, method, "model", config=config)
+                if index is not None:
+                    index.add(signatures.get(i), cleaned[i], label, confidence, method, keys[i], config)
+                metrics.inc("verdicts_total", source="model")
+            yield i, label, confidence, method
+    finally:
+        # The rerun was interrupted or the consumer stopped early
+        for future in futures:
+            future.cancel()
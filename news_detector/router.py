@@ -0,0 +1,135 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from ._shared import process_wide
+
+logger = logging.getLogger(__name__)
+
+ROUTER_ENABLED = os.environ.get("ROUTER_ENABLED", "1") != "0"
+ROUTER_ALPHA = float(os.environ.get("ROUTER_ALPHA", "0.2"))           # EWMA weight of the newest call
+ROUTER_EXPLORE = float(os.environ.get("ROUTER_EXPLORE", "0.1"))       # chance a skipped model is retried
+ROUTER_MIN_SAMPLES = int(os.environ.get("ROUTER_MIN_SAMPLES", "5"))   # calls before a model can be skipped
+ROUTER_SKIP_BELOW = 0.2      # usable-answer rate under which a model is skipped
+ROUTER_DEMOTE_BELOW = 0.8    # usable-answer rate under which a model loses its priority
+ROUTER_LOG_SIZE = 200
+
+
+class ModelStats:
+    # Rolling statistics for one (model, language) pair. Rates start at 1.0 so
+    # a model nobody has tried yet is treated as healthy.
+    __slots__ = ("calls", "success", "parsed", "latency", "last_outcome", "last_at")
+
+    def __init__(self):
+        self.calls = 0
+        self.success = 1.0     # EWMA of "the endpoint answered"
+        self.parsed = 1.0      # EWMA of "the answer had usable labels", over answered calls
+        self.latency = None    # EWMA seconds, over answered calls
+        self.last_outcome = None
+        self.last_at = None
+
+    @property
+    def usable(self):
+        return self.success * self.parsed
+
+    def update(self, outcome, seconds, alpha):
+        answered = outcome != "error"
+        self.calls += 1
+        self.success += alpha * (answered - self.success)
+        if answered:
+            self.parsed += alpha * ((outcome == "ok") - self.parsed)
+            self.latency = seconds if self.latency is None else self.latency + alpha * (seconds - self.latency)
+        self.last_outcome = outcome
+        self.last_at = time.time()
+
+
+class ModelRouter:
+    # Orders the cascade per language. Reliable models keep their configured
+    # priority; models whose usable-answer rate has dropped below demote_below
+    # go after them (most usable, then fastest first); models below skip_below,
+    # or slower on average than the cascade deadline, are not called at all
+    # except for an `explore` share of requests, which lets a recovered model
+    # earn its place back.
+
+    def __init__(self, alpha=ROUTER_ALPHA, explore=ROUTER_EXPLORE, min_samples=ROUTER_MIN_SAMPLES,
+                 skip_below=ROUTER_SKIP_BELOW, demote_below=ROUTER_DEMOTE_BELOW, enabled=ROUTER_ENABLED):
+        self.alpha = alpha
+        self.explore = explore
+        self.min_samples = min_samples
+        self.skip_below = skip_below
+        self.demote_below = demote_below
+        self.enabled = enabled
+        self.stats = {}
+        self.decisions = deque(maxlen=ROUTER_LOG_SIZE)
+        self.lock = threading.Lock()
+
+    def _stats(self, backend, language):
+        key = (backend.key, language)
+        if key not in self.stats:
+            self.stats[key] = ModelStats()
+        return self.stats[key]
+
+    def plan(self, backends, language, deadline):
+        # Returns the backends to call, highest priority first
+        if not self.enabled:
+            return list(backends)
+        reliable, demoted, skipped, explored = [], [], [], []
+        with self.lock:
+            for priority, backend in enumerate(backends):
+                stats = self._stats(backend, language)
+                warming_up = stats.calls < self.min_samples
+                too_slow = not warming_up and stats.latency is not None and stats.latency > deadline
+                if not warming_up and (stats.usable < self.skip_below or too_slow):
+                    if random.random() < self.explore:
+                        explored.append(backend)
+                    else:
+                        skipped.append((stats.usable, backend))
+                elif warming_up or stats.usable >= self.demote_below:
+                    reliable.append(backend)
+                else:
+                    demoted.append((-stats.usable, stats.latency or 0.0, priority, backend))
+
+            order = reliable + [backend for *_, backend in sorted(demoted, key=lambda d: d[:3])] + explored
+            if not order and skipped:
+                # Never leave the cascade empty; keep the least bad model
+                keep = max(skipped, key=lambda s: s[0])
+                skipped.remove(keep)
+                order.append(keep[1])
+            decision = {
+                "time": time.time(),
+                "language": language,
+                "order": [b.name for b in order],
+                "demoted": [d[-1].name for d in demoted],
+                "skipped": [b.name for _, b in skipped],
+                "explored": [b.name for b in explored],
+            }
+            self.decisions.append(decision)
+        if decision["skipped"] or decision["demoted"] or decision["explored"]:
+            logger.debug("route %s: order=%s skipped=%s explored=%s", language, decision["order"],
+                         decision["skipped"], decision["explored"])
+        return order
+
+    def record(self, backend, language, outcome, seconds):
+        # outcome: "ok", "parse_failure" (answered without usable labels) or "error"
+        with self.lock:
+            self._stats(backend, language).update(outcome, seconds, self.alpha)
+
+    def snapshot(self):
+        with self.lock:
+            stats = [
+                {"model": key, "language": language, "calls": s.calls, "success": round(s.success, 3),
+                 "parsed": round(s.parsed, 3), "usable": round(s.usable, 3),
+                 "latency_ms": None if s.latency is None else round(s.latency * 1000, 1),
+                 "last_outcome": s.last_outcome}
+                for (key, language), s in sorted(self.stats.items())
+            ]
+            decisions = list(self.decisions)
+        return {"enabled": self.enabled, "stats": stats, "decisions": decisions}
+
+
+@process_wide
+def get_router():
+    return ModelRouter()
@@ -0,0 +1,106 @@
+from .config import current_config
+from .text import analyze_text
+
+# The indicator phrases and score weights live in the detector config
+# (detector_config.json) and can change while the process runs
+RULE_METHOD = "⚙️ Rule-Based Analysis (Offline Mode)"
+
+# Bump when rule_based_analysis changes in a way the config's lists/weights don't capture
+RULES_VERSION = 1
+
+
+def rule_based_analysis(text, features=None, config=None):
+    # features: the text's TextFeatures when the caller already has them;
+    # config: the DetectorConfig snapshot the request runs under
+    features = features or analyze_text(text)
+    config = config or current_config()
+    weights = config.rule_weights
+    text_lower = features.text.lower()
+
+    counts = config.matcher.counts(text_lower)
+    fake_count = counts["fake"]
+    real_count = counts["real"]
+
+    exclamation = features.exclamations
+    caps_words = features.caps_words
+    word_count = features.word_count
+    length_bonus = 0.3 if word_count > 150 else 0.1 if word_count > 80 else 0.0
+
+    fake_score = (
+        (fake_count * weights["fake_phrase"])
+        + (exclamation * weights["exclamation"])
+        + (caps_words * weights["caps_word"])
+    )
+    real_score = (real_count * weights["real_phrase"]) + length_bonus
+
+    fake_score = min(fake_score, weights["score_cap"])
+    real_score = min(real_score, weights["score_cap"])
+
+    if fake_score == 0 and real_score == 0:
+        fake_score = 0.25 if word_count > 100 else 0.50
+        real_score = 0.75 if word_count > 100 else 0.50
+
+    total = fake_score + real_score
+    fake_score /= total
+    real_score /= total
+
+    if fake_score > real_score:
+        return "FAKE", fake_score
+    else:
+        return "REAL", real_score
+
+
+def rule_based_batch(texts, config=None):
+    # Same scores as rule_based_analysis, computed for a whole chunk at once.
+    # Rows are joined with a separator no phrase contains, so the phrase
+    # matcher makes one pass over the chunk instead of one per row.
+    import numpy as np
+    import pandas as pd
+
+    config = config or current_config()
+    weights = config.rule_weights
+    texts = pd.Series(list(texts), dtype=object).fillna("").astype(str)
+    n = len(texts)
+    if n == 0:
+        return []
+
+    lowered = [t.lower() for t in texts]
+    bounds = np.cumsum([len(t) + 1 for t in lowered])
+    counts = {"fake": np.zeros(n), "real": np.zeros(n)}
+    seen = set()
+    for start, _, phrase, group in config.matcher.scan("\x00".join(lowered))["matches"]:
+        row = int(np.searchsorted(bounds, start, side="right"))
+        if (row, phrase, group) not in seen:
+            seen.add((row, phrase, group))
+            counts[group][row] += 1
+
+    words = texts.str.split()
+    word_count = words.str.len().to_numpy(dtype=float)
+    exploded = words.explode()
+    caps = (exploded.str.isupper().fillna(False).astype(bool) & (exploded.str.len() > 2))
+    caps_words = caps.groupby(level=0).sum().reindex(range(n), fill_value=0).to_numpy(dtype=float)
+    exclamation = texts.str.count("!").to_numpy(dtype=float)
+    length_bonus = np.where(word_count > 150, 0.3, np.where(word_count > 80, 0.1, 0.0))
+
+    fake_score = (
+        (counts["fake"] * weights["fake_phrase"])
+        + (exclamation * weights["exclamation"])
+        + (caps_words * weights["caps_word"])
+    )
+    real_score = (counts["real"] * weights["real_phrase"]) + length_bonus
+
+    fake_score = np.minimum(fake_score, weights["score_cap"])
+    real_score = np.minimum(real_score, weights["score_cap"])
+
+    neutral = (fake_score == 0) & (real_score == 0)
+    fake_score = np.where(neutral, np.where(word_count > 100, 0.25, 0.50), fake_score)
+    real_score = np.where(neutral, np.where(word_count > 100, 0.75, 0.50), real_score)
+
+    total = fake_score + real_score
+    fake_score = fake_score / total
+    real_score = real_score / total
+
+    return [
+        ("FAKE", float(f)) if f > r else ("REAL", float(r))
+        for f, r in zip(fake_score, real_score)
+    ]
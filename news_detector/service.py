@@ -0,0 +1,310 @@
+import asyncio
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import verdict_cache_key
+from .cascade import cascade_deadline
+from .config import current_config
+from .metrics import metrics
+from .pipeline import BATCH_WORKERS, classify_chunk
+from .text import preprocess_text
+from .warmup import get_model_warmer
+from .windows import WINDOW_AGGREGATION, WINDOW_AGGREGATIONS
+
+SERVICE_MAX_BATCH = 32        # texts coalesced into one pipeline call
+SERVICE_MAX_WAIT_MS = 10      # how long the first text of a batch waits for company
+SERVICE_QUEUE_SIZE = 1024     # admitted-but-unfinished texts before answering 429
+SERVICE_DEADLINE_MS = 30000   # default per-request deadline
+SERVICE_MAX_BODY = 8 * 1024 * 1024
+SERVICE_MAX_BULK = 1000
+# Paths that get their own metrics label; anything else is counted as "other"
+ROUTES = ("/healthz", "/metrics", "/v1/classify", "/v1/classify/batch")
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           411: "Length Required", 413: "Payload Too Large", 429: "Too Many Requests",
+           500: "Internal Server Error", 504: "Gateway Timeout"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class Job:
+    __slots__ = ("text", "aggregation", "deadline", "future")
+
+    def __init__(self, text, aggregation, deadline, future):
+        self.text = text
+        self.aggregation = aggregation
+        self.deadline = deadline
+        self.future = future
+
+
+# ─────────────────────────────────────────────
+# Detection Service
+# ─────────────────────────────────────────────
+
+class DetectionService:
+    # Requests are admitted into a bounded queue (429 when full), identical
+    # in-flight texts share one job, and a dispatcher coalesces queued jobs into
+    # micro-batches that run through classify_chunk on a thread pool.
+
+    def __init__(self, max_batch=SERVICE_MAX_BATCH, max_wait_ms=SERVICE_MAX_WAIT_MS,
+                 queue_size=SERVICE_QUEUE_SIZE, deadline_ms=SERVICE_DEADLINE_MS, workers=BATCH_WORKERS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue_size = queue_size
+        self.default_deadline = deadline_ms / 1000
+        self.row_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="service-row")
+        self.batch_executor = ThreadPoolExecutor(max_workers=max(2, workers // 4), thread_name_prefix="service-batch")
+        self.queue = None
+        self.dispatcher = None
+        self.in_flight = {}
+        self.stats = {"requests": 0, "texts": 0, "batches": 0, "coalesced": 0, "rejected": 0, "timeouts": 0}
+
+    async def start(self):
+        get_model_warmer()
+        self.queue = asyncio.Queue()
+        self.dispatcher = asyncio.create_task(self.dispatch())
+
+    # ── Admission ──
+
+    def admit(self, texts, aggregation, deadline):
+        # Returns one future per text; raises 429 if the batch would overflow
+        keys = [verdict_cache_key(preprocess_text(text), aggregation) for text in texts]
+        new = sum(1 for key in dict.fromkeys(keys) if key not in self.in_flight)
+        if len(self.in_flight) + new > self.queue_size:
+            self.stats["rejected"] += 1
+            raise HTTPError(429, "queue full", {"Retry-After": "1"})
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        for key, text in zip(keys, texts):
+            job = self.in_flight.get(key)
+            if job is not None:
+                self.stats["coalesced"] += 1
+                job.deadline = max(job.deadline, deadline)
+            else:
+                job = Job(text, aggregation, deadline, loop.create_future())
+                job.future.add_done_callback(lambda _, key=key: self.in_flight.pop(key, None))
+                self.in_flight[key] = job
+                self.queue.put_nowait(job)
+            futures.append(job.future)
+        self.stats["texts"] += len(texts)
+        return futures
+
+    # ── Micro-batching ──
+
+    async def dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            flush_at = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = flush_at - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            now = time.monotonic()
+            live = []
+            for job in batch:
+                if job.future.done():
+                    continue
+                if job.deadline <= now:
+                    job.future.set_exception(HTTPError(504, "deadline exceeded before dispatch"))
+                else:
+                    live.append(job)
+            for aggregation in {job.aggregation for job in live}:
+                jobs = [job for job in live if job.aggregation == aggregation]
+                self.stats["batches"] += 1
+                loop.run_in_executor(self.batch_executor, self.run_batch, loop, jobs, aggregation)
+
+    def run_batch(self, loop, jobs, aggregation):
+        # Runs on a batch thread; hands each verdict back to the event loop as
+        # soon as classify_chunk yields it, tagged with the batch's config version.
+        deadline = max(job.deadline for job in jobs) - time.monotonic()
+        config = current_config()
+        try:
+            for i, label, confidence, method in classify_chunk(
+                    [job.text for job in jobs], aggregation, self.row_executor,
+                    deadline=max(0.1, min(deadline, cascade_deadline())), config=config):
+                loop.call_soon_threadsafe(self.resolve, jobs[i].future,
+                                          {"label": label, "confidence": confidence, "method": method,
+                                           "config_version": config.version})
+        except Exception as e:
+            for job in jobs:
+                loop.call_soon_threadsafe(self.fail, job.future, e)
+
+    @staticmethod
+    def resolve(future, verdict):
+        if not future.done():
+            future.set_result(verdict)
+
+    @staticmethod
+    def fail(future, error):
+        if not future.done():
+            future.set_exception(error)
+
+    # ── Endpoints ──
+
+    async def classify(self, texts, aggregation, deadline_ms):
+        self.stats["requests"] += 1
+        timeout = (deadline_ms / 1000) if deadline_ms else self.default_deadline
+        deadline = time.monotonic() + timeout
+        futures = self.admit(texts, aggregation, deadline)
+        try:
+            # shield: another request may be waiting on the same shared job
+            return await asyncio.wait_for(asyncio.gather(*map(asyncio.shield, futures)), timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise HTTPError(504, "deadline exceeded")
+
+    async def handle(self, method, path, headers, body):
+        if path == "/healthz":
+            return 200, {"status": "ok", "queued": len(self.in_flight), "config_version": current_config().version,
+                         **self.stats}
+        if path == "/metrics":
+            return 200, metrics.prometheus_text()
+        if path not in ("/v1/classify", "/v1/classify/batch"):
+            raise HTTPError(404, "not found")
+        if method != "POST":
+            raise HTTPError(405, "use POST")
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "body must be JSON")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "body must be a JSON object")
+
+        aggregation = payload.get("aggregation", WINDOW_AGGREGATION)
+        if not isinstance(aggregation, str) or aggregation not in WINDOW_AGGREGATIONS:
+            raise HTTPError(400, f"aggregation must be one of {sorted(WINDOW_AGGREGATIONS)}")
+        deadline_ms = payload.get("deadline_ms")
+        if deadline_ms is None:
+            deadline_ms = headers.get("x-request-deadline-ms")
+        if deadline_ms is not None:
+            # A number in the body or a numeric string in the header; bool is
+            # an int subclass but never a deadline
+            try:
+                if isinstance(deadline_ms, bool) or not isinstance(deadline_ms, (int, float, str)):
+                    raise ValueError
+                deadline_ms = float(deadline_ms)
+            except ValueError:
+                raise HTTPError(400, "deadline_ms must be a number")
+            if not math.isfinite(deadline_ms) or deadline_ms <= 0:
+                raise HTTPError(400, "deadline_ms must be a positive, finite number")
+
+        if path == "/v1/classify":
+            text = payload.get("text")
+            if not isinstance(text, str) or not text.strip():
+                raise HTTPError(400, "'text' must be a non-empty string")
+            (verdict,) = await self.classify([text], aggregation, deadline_ms)
+            return 200, verdict
+
+        texts = payload.get("texts")
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            raise HTTPError(400, "'texts' must be a list of strings")
+        if len(texts) > SERVICE_MAX_BULK:
+            raise HTTPError(413, f"at most {SERVICE_MAX_BULK} texts per request")
+        verdicts = await self.classify(texts, aggregation, deadline_ms) if texts else []
+        return 200, {"results": verdicts}
+
+
+# ─────────────────────────────────────────────
+# HTTP/1.1 Transport
+# ─────────────────────────────────────────────
+
+async def read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if "chunked" in headers.get("transfer-encoding", ""):
+        raise HTTPError(411, "send a Content-Length instead of chunked encoding")
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(400, "Content-Length must be an integer")
+    if length < 0:
+        raise HTTPError(400, "Content-Length must not be negative")
+    if length > SERVICE_MAX_BODY:
+        raise HTTPError(413, "body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target.split("?", 1)[0], headers, body
+
+
+def write_response(writer, status, payload, headers=None, keep_alive=True):
+    # str payloads are sent as plain text (the Prometheus exposition format)
+    if isinstance(payload, str):
+        body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+    else:
+        body, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8"
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+             f"Content-Type: {content_type}",
+             f"Content-Length: {len(body)}",
+             "Connection: " + ("keep-alive" if keep_alive else "close")]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+
+
+async def serve_connection(service, reader, writer):
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except HTTPError as e:
+                write_response(writer, e.status, {"error": str(e)}, e.headers, keep_alive=False)
+                break
+            if request is None:
+                break
+            method, path, headers, body = request
+            keep_alive = headers.get("connection", "").lower() != "close"
+            started = time.perf_counter()
+            try:
+                status, payload = await service.handle(method, path, headers, body)
+                extra = {}
+            except HTTPError as e:
+                status, payload, extra = e.status, {"error": str(e)}, e.headers
+            except Exception as e:
+                status, payload, extra = 500, {"error": f"{type(e).__name__}: {e}"}, {}
+            write_response(writer, status, payload, extra, keep_alive)
+            route = path if path in ROUTES else "other"
+            metrics.observe("http_request_seconds", time.perf_counter() - started, path=route)
+            metrics.inc("http_responses_total", path=route, status=status)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=8000, **options):
+    service = DetectionService(**options)
+    await service.start()
+    server = await asyncio.start_server(
+        lambda reader, writer: serve_connection(service, reader, writer), host, port, backlog=1024)
+    print(f"serving on http://{host}:{port}", flush=True)
+    async with server:
+        await server.serve_forever()
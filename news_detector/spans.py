@@ -0,0 +1,164 @@
+import heapq
+import re
+
+from .config import current_config
+from .text import SENTENCE_PATTERN
+
+TOP_SPANS = 5            # sentences returned for highlighting
+EXCLAMATION_PATTERN = re.compile(r"!+")
+# Words of 3+ characters without ASCII lower case: the caps-word candidates
+CAPS_PATTERN = re.compile(r"(?<!\S)[^\sa-z]{3,}(?!\S)")
+ASCII_LOWER = {c: c + 32 for c in range(ord("A"), ord("Z") + 1)}
+# Display priority where marks overlap ("HOAX!!!" is a phrase, a caps word and a burst)
+SPAN_KINDS = ("fake", "exclamation", "caps", "real")
+
+
+# ─────────────────────────────────────────────
+# Evidence
+# ─────────────────────────────────────────────
+#
+# Each source yields (start, end, kind, weight) ordered by start, so the
+# sources can be merged in one pass; weights are the rule engine's, with
+# sourcing phrases counting against a sentence.
+
+def _phrase_marks(text, config):
+    # Offsets must line up with text; lower() can change the length of a few
+    # non-ASCII characters, and every indicator phrase is ASCII anyway
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        lowered = text.translate(ASCII_LOWER)
+    weights = {"fake": config.rule_weights["fake_phrase"], "real": -config.rule_weights["real_phrase"]}
+    matcher = config.matcher
+    for start, end, phrase in matcher.finditer(lowered):
+        for group in matcher.phrase_groups[phrase]:
+            yield start, end, group, weights[group]
+
+
+def _exclamation_marks(text, config):
+    weight = config.rule_weights["exclamation"]
+    for match in EXCLAMATION_PATTERN.finditer(text):
+        yield match.start(), match.end(), "exclamation", weight * (match.end() - match.start())
+
+
+def _caps_marks(text, config):
+    # Runs of consecutive caps words (the rule engine's definition: longer than
+    # two characters and all upper case) become one mark; a run ends with its
+    # sentence or at the first other word
+    weight = config.rule_weights["caps_word"]
+    run_start = run_end = None
+    count = 0
+    for match in CAPS_PATTERN.finditer(text):
+        word = match.group()
+        if not word.isupper():
+            continue
+        if run_start is not None and not text[run_end:match.start()].isspace():
+            yield run_start, run_end, "caps", weight * count
+            run_start, count = None, 0
+        if run_start is None:
+            run_start = match.start()
+        run_end = match.end()
+        count += 1
+        if word[-1] in ".!?":
+            yield run_start, run_end, "caps", weight * count
+            run_start, count = None, 0
+    if run_start is not None:
+        yield run_start, run_end, "caps", weight * count
+
+
+# ─────────────────────────────────────────────
+# Sentence scoring
+# ─────────────────────────────────────────────
+
+def _finish(heap, index, start, end, score, marks, top):
+    if score <= 0:
+        return
+    item = (score, -index, start, end, marks)
+    if len(heap) < top:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heapreplace(heap, item)
+
+
+def suspicious_spans(text, top=TOP_SPANS, config=None):
+    # The `top` highest-scoring sentences of a cleaned text (TextFeatures.text),
+    # best first, as {"sentence", "start", "end", "text", "score", "marks",
+    # "reasons"}; marks are (start, end, kind) relative to the sentence. One
+    # walk over the sentence offsets and the merged evidence, so the cost stays
+    # linear in the text (plus log(top) per scored sentence).
+    # A sentence runs up to the next one's start, so it keeps its terminators
+    # ("!!!" belongs to the sentence it ends).
+    starts = [match.start() for match in SENTENCE_PATTERN.finditer(text)]
+    if not starts:
+        return []
+    config = config or current_config()
+    evidence = heapq.merge(_phrase_marks(text, config), _exclamation_marks(text, config), _caps_marks(text, config))
+    heap = []
+    index, score, marks = 0, 0.0, []
+    next_start = starts[1] if len(starts) > 1 else len(text)
+    for start, end, kind, weight in evidence:
+        while start >= next_start:
+            _finish(heap, index, starts[index], next_start, score, marks, top)
+            index += 1
+            score, marks = 0.0, []
+            next_start = starts[index + 1] if index + 1 < len(starts) else len(text)
+        if start < starts[index]:
+            # Before the first sentence (leading punctuation)
+            continue
+        score += weight
+        marks.append((start, end, kind))
+    _finish(heap, index, starts[index], next_start, score, marks, top)
+
+    spans = []
+    for score, negative_index, start, end, marks in sorted(heap, reverse=True):
+        spans.append({
+            "sentence": -negative_index,
+            "start": start,
+            "end": end,
+            "text": text[start:end].rstrip(),
+            "score": round(score, 3),
+            "marks": [(s - start, min(e, end) - start, kind) for s, e, kind in marks],
+            "reasons": _reasons(text, marks),
+        })
+    return spans
+
+
+def _reasons(text, marks):
+    # 'fake phrase "hoax"; 3 exclamation marks; 2 caps words'
+    phrases = {"fake": [], "real": []}
+    exclamations = caps = 0
+    for start, end, kind in marks:
+        if kind in phrases:
+            phrases[kind].append(f'"{text[start:end]}"')
+        elif kind == "exclamation":
+            exclamations += end - start
+        else:
+            caps += len(text[start:end].split())
+    reasons = []
+    if phrases["fake"]:
+        reasons.append("fake phrase " + ", ".join(dict.fromkeys(phrases["fake"])))
+    if exclamations:
+        reasons.append(f"{exclamations} exclamation mark{'s' if exclamations > 1 else ''}")
+    if caps:
+        reasons.append(f"{caps} caps word{'s' if caps > 1 else ''}")
+    if phrases["real"]:
+        reasons.append("sourcing " + ", ".join(dict.fromkeys(phrases["real"])))
+    return "; ".join(reasons)
+
+
+def highlight_segments(sentence, marks):
+    # Splits a span's text into (piece, kind or None) at mark boundaries; where
+    # marks overlap the kind first in SPAN_KINDS shows
+    edges = sorted([(s, 1, kind) for s, _, kind in marks] + [(e, -1, kind) for _, e, kind in marks])
+    active = dict.fromkeys(SPAN_KINDS, 0)
+    segments, position = [], 0
+    for at, step, kind in edges + [(len(sentence), 0, None)]:
+        if at > position:
+            shown = next((k for k in SPAN_KINDS if active[k]), None)
+            if segments and segments[-1][1] == shown:
+                segments[-1] = (segments[-1][0] + sentence[position:at], shown)
+            else:
+                segments.append((sentence[position:at], shown))
+            position = at
+        if kind is not None:
+            active[kind] += step
+    return segments
@@ -0,0 +1,92 @@
+import re
+
+URL_PATTERN = re.compile(r'http\S+|www\S+')
+# One match per sentence that has any non-space text between terminators
+SENTENCE_PATTERN = re.compile(r'[^.!?\s][^.!?]*')
+
+SCRIPT_RANGES = {
+    "latin": [(0x0041, 0x005A), (0x0061, 0x007A), (0x00C0, 0x024F)],
+    "arabic": [(0x0600, 0x06FF), (0x0750, 0x077F), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF)],
+    "devanagari": [(0x0900, 0x097F)],
+    "bengali": [(0x0980, 0x09FF)],
+    "gurmukhi": [(0x0A00, 0x0A7F)],
+    "cyrillic": [(0x0400, 0x04FF)],
+    "greek": [(0x0370, 0x03FF)],
+    "hebrew": [(0x0590, 0x05FF)],
+    "han": [(0x4E00, 0x9FFF)],
+}
+URDU_MIN_CHARS = 10
+
+
+def _script_table():
+    # Maps every character of a script onto the script's first character, which
+    # belongs to that script itself, so after one str.translate each script's
+    # size is a single str.count
+    table, markers = {}, {}
+    for script, ranges in SCRIPT_RANGES.items():
+        markers[script] = chr(ranges[0][0])
+        for low, high in ranges:
+            table.update(dict.fromkeys(range(low, high + 1), markers[script]))
+    return table, markers
+
+
+SCRIPT_TABLE, SCRIPT_MARKERS = _script_table()
+
+
+class TextFeatures:
+    # Everything the pipeline needs to know about a text, computed once
+    __slots__ = ("text", "word_count", "sentence_count", "caps_words", "exclamations", "urls", "scripts")
+
+    def __init__(self, text, word_count, sentence_count, caps_words, exclamations, urls, scripts):
+        self.text = text
+        self.word_count = word_count
+        self.sentence_count = sentence_count
+        self.caps_words = caps_words
+        self.exclamations = exclamations
+        self.urls = urls
+        self.scripts = scripts
+
+    @property
+    def language(self):
+        return "urdu" if self.scripts["arabic"] > URDU_MIN_CHARS else "english"
+
+    def __repr__(self):
+        return (f"TextFeatures(words={self.word_count}, sentences={self.sentence_count}, "
+                f"caps_words={self.caps_words}, exclamations={self.exclamations}, urls={self.urls}, "
+                f"scripts={ {k: v for k, v in self.scripts.items() if v} })")
+
+
+def script_histogram(text):
+    mapped = text.translate(SCRIPT_TABLE)
+    return {script: mapped.count(marker) for script, marker in SCRIPT_MARKERS.items()}
+
+
+def analyze_text(text):
+    # Normalizes text (URLs dropped, whitespace collapsed) and collects its
+    # features while the pieces are at hand: the word list used for the
+    # normalized text also gives the word and caps-word counts.
+    text, urls = URL_PATTERN.subn('', text)
+    words = text.split()
+    cleaned = " ".join(words)
+    return TextFeatures(
+        text=cleaned,
+        word_count=len(words),
+        sentence_count=sum(1 for _ in SENTENCE_PATTERN.finditer(cleaned)),
+        caps_words=sum(1 for w in words if len(w) > 2 and w.isupper()),
+        exclamations=cleaned.count('!'),
+        urls=urls,
+        scripts=script_histogram(cleaned),
+    )
+
+
+def preprocess_text(text):
+    return " ".join(URL_PATTERN.sub('', text).split())
+
+
+def detect_language(text):
+    return "urdu" if script_histogram(text)["arabic"] > URDU_MIN_CHARS else "english"
+
+
+def get_word_stats(text):
+    features = analyze_text(text)
+    return features.word_count, features.sentence_count
@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ._shared import process_wide
+from .backends import INFERENCE_BACKENDS
+from .client import get_inference_client
+from .config import current_config
+from .limiter import RequestShed
+from .metrics import endpoint_label, metrics
+from .models import try_model
+
+# Hosted models are unloaded after a while without traffic; 0 turns the warmer off
+WARMUP_INTERVAL = float(os.environ.get("WARMUP_INTERVAL", "600"))
+WARMUP_TIMEOUT = float(os.environ.get("WARMUP_TIMEOUT", "120"))   # a ping may wait this long for a model to load
+WARMUP_TEXT = "Warm-up request."
+
+
+class ModelWarmer:
+    # Pings every hosted model when started and then each `interval` seconds,
+    # skipping models real traffic has used in the last half interval (so none
+    # sits idle for more than 1.5 intervals). A ping
+    # that finds the model loading waits for it like any other request, so
+    # the model is loaded before the first user needs it.
+
+    def __init__(self, urls, interval=WARMUP_INTERVAL, timeout=WARMUP_TIMEOUT):
+        # urls: a list, or a callable returning the current list (so the
+        # warmer follows model changes in a reloaded config)
+        if not callable(urls):
+            urls = list(urls)
+            self.urls = lambda: urls
+        else:
+            self.urls = urls
+        self.interval = interval
+        self.timeout = timeout
+        self.rounds = 0
+        self.last = {}    # url -> {"at", "ok", "seconds"}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(self.urls())), thread_name_prefix="model-warmer")
+        self.thread = threading.Thread(target=self._run, name="model-warmer", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.warm_once()
+            self.stopped.wait(self.interval)
+
+    def ping(self, url):
+        started = time.monotonic()
+        try:
+            ok = try_model(url, WARMUP_TEXT, self.timeout, self.stopped, session="warmup") is not None
+        except RequestShed:
+            ok = False
+        metrics.inc("warmup_pings_total", endpoint=endpoint_label(url), outcome="ok" if ok else "failed")
+        with self.lock:
+            self.last[url] = {"at": time.time(), "ok": ok, "seconds": round(time.monotonic() - started, 2)}
+        return ok
+
+    def warm_once(self):
+        # Returns the number of models pinged
+        client = get_inference_client()
+        due = [url for url in self.urls() if client.idle_for(url) >= self.interval / 2]
+        list(self.executor.map(self.ping, due))
+        with self.lock:
+            self.rounds += 1
+        return len(due)
+
+    def snapshot(self):
+        with self.lock:
+            return {"interval": self.interval, "rounds": self.rounds, "last": dict(self.last)}
+
+
+@process_wide
+def get_model_warmer():
+    # Started on first call; None when disabled or no hosted models are in use
+    if WARMUP_INTERVAL <= 0 or "huggingface" not in INFERENCE_BACKENDS:
+        return None
+    return ModelWarmer(lambda: [url for url, _ in current_config().models]).start()
@@ -0,0 +1,71 @@
+import re
+
+WINDOW_WORDS = 320       # words per window, roughly the 512-token limit of the BERT-style models
+WINDOW_OVERLAP = 1       # sentences repeated at the start of the next window
+WINDOW_BATCH_SIZE = 8    # windows sent per Inference API call
+WINDOW_SECONDS = 0.4     # estimated model time per window, used to cap the window count
+WINDOW_BUDGET = 8.0      # seconds of model time one document may spend on windows
+WINDOW_AGGREGATIONS = {
+    "max_fake": "🚩 Most suspicious window",
+    "mean": "⚖️ Mean of windows",
+    "length_weighted": "📏 Length-weighted mean",
+}
+WINDOW_AGGREGATION = "max_fake"
+
+SENTENCE_END = re.compile(r'(?<=[.!?۔؟])\s+')
+
+
+def split_sentences(text):
+    return [s for s in SENTENCE_END.split(text) if s.strip()]
+
+
+def make_windows(text, max_words=WINDOW_WORDS, overlap=WINDOW_OVERLAP, budget=WINDOW_BUDGET):
+    # Packs whole sentences into windows of at most max_words words, repeating the
+    # last `overlap` sentences of each window at the start of the next. Sentences
+    # longer than a window are cut on word boundaries. Returns [(text, words)].
+    sentences = []
+    for sentence in split_sentences(text):
+        words = sentence.split()
+        for i in range(0, len(words), max_words):
+            sentences.append(words[i:i + max_words])
+
+    windows = []
+    current = []
+    size = 0
+    for words in sentences:
+        if current and size + len(words) > max_words:
+            windows.append(current)
+            current = current[-overlap:] if overlap and len(current) > overlap else []
+            size = sum(len(w) for w in current)
+            if current and size + len(words) > max_words:
+                current, size = [], 0
+        current.append(words)
+        size += len(words)
+    if current:
+        windows.append(current)
+
+    windows = [(" ".join(" ".join(s) for s in window), sum(len(s) for s in window)) for window in windows]
+    max_windows = max(1, int(budget / WINDOW_SECONDS))
+    if len(windows) > max_windows:
+        # Keep an even spread over the whole document, including both ends
+        if max_windows == 1:
+            picks = [0]
+        else:
+            picks = sorted({round(i * (len(windows) - 1) / (max_windows - 1)) for i in range(max_windows)})
+        windows = [windows[i] for i in picks]
+    return windows or [(text, len(text.split()))]
+
+
+def aggregate_windows(scores, word_counts, mode=WINDOW_AGGREGATION):
+    # scores: [(fake_score, real_score)] per window -> (label, confidence)
+    if mode == "max_fake":
+        fake_score, real_score = max(scores, key=lambda score: score[0])
+    else:
+        weights = word_counts if mode == "length_weighted" else [1] * len(scores)
+        total = sum(weights) or 1
+        fake_score = sum(w * f for w, (f, _) in zip(weights, scores)) / total
+        real_score = sum(w * r for w, (_, r) in zip(weights, scores)) / total
+    if fake_score > real_score:
+        return "FAKE", fake_score
+    else:
+        return "REAL", real_score